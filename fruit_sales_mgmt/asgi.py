@@ -1,8 +1,13 @@
 """ASGIアプリケーションの設定ファイル"""
+
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from mgmt.handlers import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fruit_sales_mgmt.settings")
 
-application = get_asgi_application()
+# get_asgi_applicationと同じ初期化で、ストリーミング対応のハンドラーを使う
+django.setup(set_prefix=False)
+application = ASGIHandler()
@@ -12,6 +12,22 @@ class SalesInline(admin.TabularInline):
     verbose_name = "販売情報"
     verbose_name_plural = "販売情報"
 
+    def get_queryset(self, request):
+        """
+        果物をJOINして取得(行ごとの果物の追加クエリを防ぐ)
+
+        Parameters
+        ----------
+        request: WSGIRequest
+            リクエスト
+
+        Returns
+        -------
+        queryset: QuerySet
+            果物をJOINしたSalesのクエリセット
+        """
+        return super().get_queryset(request).select_related("fruit")
+
 
 class FruitAdmin(admin.ModelAdmin):
     """管理サイトでのFruitモデル表示設定"""
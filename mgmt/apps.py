@@ -7,3 +7,7 @@ class MgmtConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "mgmt"
+
+    def ready(self):
+        """シグナルを登録"""
+        from mgmt import signals  # noqa: F401
@@ -0,0 +1,105 @@
+"""
+認証バックエンド定義ファイル
+
+- 認証ユーザーのキャッシュ
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+from mgmt.cache import get_user_cache_key
+from mgmt.models import CachedUser
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    リクエストごとの認証ユーザーの取得をキャッシュする認証バックエンドを定義
+    ※キャッシュ(ファイル)にはパスワードハッシュを含めず、認証の検証に必要な
+      フィールド, セッション認証ハッシュ, 権限のみを保存する
+    ※ユーザーの保存, 削除, ログアウト時にキャッシュを削除する(signals.py)
+    """
+
+    user_cache_timeout = 60 * 5
+
+    def get_user_cache_data(self, user):
+        """
+        認証ユーザーからキャッシュするデータを作成
+
+        Parameters
+        ----------
+        user: User
+            DBから取得した認証ユーザー
+
+        Returns
+        -------
+        user_data: dict
+            パスワードハッシュを除くフィールド, セッション認証ハッシュ, 権限
+            ※権限は管理サイトを使うスタッフのみ(それ以外は参照時にDBから取得)
+        """
+        return {
+            "fields": {
+                field.attname: getattr(user, field.attname)
+                for field in CachedUser._meta.concrete_fields
+                if field.attname != "password"
+            },
+            "session_auth_hash": user.get_session_auth_hash(),
+            "perms": self.get_all_permissions(user) if user.is_staff else None,
+        }
+
+    def get_cached_user(self, user_data):
+        """
+        キャッシュしたデータから認証ユーザーを復元
+        ※パスワードハッシュは遅延読み込み(参照, 保存時のみDBアクセス)
+
+        Parameters
+        ----------
+        user_data: dict
+            キャッシュしたデータ
+
+        Returns
+        -------
+        user: CachedUser
+            認証ユーザー
+        """
+        fields = user_data["fields"]
+        user = CachedUser.from_db(
+            router.db_for_read(CachedUser),
+            list(fields),
+            list(fields.values()),
+        )
+        user.session_auth_hash = user_data["session_auth_hash"]
+
+        if user_data["perms"] is not None:
+            user._perm_cache = user_data["perms"]
+
+        return user
+
+    def get_user(self, user_id):
+        """
+        セッションのユーザーIDから認証ユーザーを取得
+        キャッシュに無い場合はDBから取得してキャッシュする
+
+        Parameters
+        ----------
+        user_id: int
+            ユーザーID
+
+        Returns
+        -------
+        user: CachedUser
+            認証ユーザー ※存在しない, 無効なユーザーの場合はNone
+        """
+        cache_key = get_user_cache_key(user_id)
+        user_data = cache.get(cache_key)
+
+        if user_data is None:
+            user = super().get_user(user_id)
+
+            if user is None:
+                return None
+
+            user_data = self.get_user_cache_data(user)
+            cache.set(cache_key, user_data, self.user_cache_timeout)
+
+        user = self.get_cached_user(user_data)
+        return user if self.user_can_authenticate(user) else None
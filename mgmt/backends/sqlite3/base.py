@@ -0,0 +1,50 @@
+"""
+DBバックエンド定義ファイル
+
+- SQLite(トランザクションの開始方法を指定可能)
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    OPTIONSのtransaction_mode(DEFERRED, IMMEDIATE, EXCLUSIVE)で
+    トランザクションの開始方法を指定できるSQLiteのバックエンドを定義
+    ※IMMEDIATEの場合は開始時に書き込みロックを取得するため、
+      読み込みから書き込みへのロック昇格で"database is locked"にならない
+    """
+
+    transaction_modes = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+    def get_connection_params(self):
+        """
+        sqlite3.connectの引数を生成(transaction_modeは除く)
+
+        Returns
+        -------
+        kwargs: dict
+            sqlite3.connectの引数
+        """
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop("transaction_mode", None)
+
+        if (
+            transaction_mode is not None
+            and transaction_mode.upper() not in self.transaction_modes
+        ):
+            raise ImproperlyConfigured(
+                "settings.DATABASES is improperly configured. "
+                f"Invalid transaction_mode: {transaction_mode!r}"
+            )
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        """トランザクションをtransaction_modeで開始"""
+        options = self.settings_dict["OPTIONS"]
+        transaction_mode = options.get("transaction_mode")
+
+        if transaction_mode is None:
+            self.cursor().execute("BEGIN")
+        else:
+            self.cursor().execute(f"BEGIN {transaction_mode.upper()}")
@@ -0,0 +1,130 @@
+"""
+キャッシュ定義ファイル
+
+- 販売データの更新日時(キャッシュのバージョン)
+- 販売統計情報のキャッシュキー
+- 認証ユーザーのキャッシュキー
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+SALES_LAST_MODIFIED_KEY = "mgmt:sales:last_modified"
+USER_KEY_FORMAT = "mgmt:user_data:{}"
+
+
+def get_sales_last_modified():
+    """
+    販売データ(Sales, Fruit)の最終更新日時を取得
+    ※キャッシュに無い場合は現在日時を最終更新日時として登録
+
+    Returns
+    -------
+    last_modified: datetime
+        販売データの最終更新日時
+    """
+    last_modified = cache.get(SALES_LAST_MODIFIED_KEY)
+
+    if last_modified is None:
+        cache.add(SALES_LAST_MODIFIED_KEY, timezone.now(), None)
+        last_modified = cache.get(SALES_LAST_MODIFIED_KEY, timezone.now())
+    return last_modified
+
+
+async def aget_sales_last_modified():
+    """
+    販売データ(Sales, Fruit)の最終更新日時を取得(非同期ビュー用)
+    ※キャッシュに無い場合は現在日時を最終更新日時として登録
+
+    Returns
+    -------
+    last_modified: datetime
+        販売データの最終更新日時
+    """
+    last_modified = await cache.aget(SALES_LAST_MODIFIED_KEY)
+
+    if last_modified is None:
+        await cache.aadd(SALES_LAST_MODIFIED_KEY, timezone.now(), None)
+        last_modified = await cache.aget(
+            SALES_LAST_MODIFIED_KEY, timezone.now()
+        )
+    return last_modified
+
+
+def touch_sales_last_modified():
+    """
+    販売データの最終更新日時を現在日時に更新(キャッシュを無効化)
+    コミット前に別リクエストが古いデータをキャッシュしないよう、
+    コミット後にも再度更新する
+    """
+    cache.set(SALES_LAST_MODIFIED_KEY, timezone.now(), None)
+    transaction.on_commit(
+        lambda: cache.set(SALES_LAST_MODIFIED_KEY, timezone.now(), None)
+    )
+
+
+def get_statistics_cache_key(last_modified=None):
+    """
+    販売統計情報のキャッシュキーを取得
+    当日(TIME_ZONE基準)と販売データの最終更新日時ごとに別のキーとなる
+
+    Parameters
+    ----------
+    last_modified: datetime
+        販売データの最終更新日時 ※既定値はキャッシュから取得
+
+    Returns
+    -------
+    cache_key: str
+        販売統計情報のキャッシュキー
+    """
+    if last_modified is None:
+        last_modified = get_sales_last_modified()
+
+    return (
+        f"mgmt:statistics:{timezone.localdate().isoformat()}:"
+        f"{last_modified.timestamp()}"
+    )
+
+
+def get_user_cache_key(user_id):
+    """
+    認証ユーザーのキャッシュキーを取得
+
+    Parameters
+    ----------
+    user_id: int
+        ユーザーID
+
+    Returns
+    -------
+    cache_key: str
+        認証ユーザーのキャッシュキー
+    """
+    return USER_KEY_FORMAT.format(user_id)
+
+
+def delete_user_cache(user_id):
+    """
+    認証ユーザーのキャッシュを削除
+    (次のリクエストでDBから再取得する)
+
+    Parameters
+    ----------
+    user_id: int
+        ユーザーID
+    """
+    cache.delete(get_user_cache_key(user_id))
+
+
+def delete_user_caches(user_ids):
+    """
+    複数の認証ユーザーのキャッシュを削除
+    (次のリクエストでDBから再取得する)
+
+    Parameters
+    ----------
+    user_ids: Iterable[int]
+        ユーザーIDのリスト
+    """
+    cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
@@ -3,19 +3,66 @@
 
 - 果物マスタ管理(登録, 編集)
 - 販売情報管理(CSVインポート, 登録, 編集)
+- 販売統計情報API(絞り込み条件)
 """
+import codecs
 import collections
 import csv
 import datetime
+import gzip
 import io
+import itertools
 import logging
 import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 from django import forms
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import FileExtensionValidator
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
 
-from mgmt.models import Fruit, Sales
+from mgmt import metrics
+from mgmt.cache import touch_sales_last_modified
+from mgmt.models import (
+    Fruit,
+    Sales,
+    get_import_hash,
+    update_sales_summaries,
+)
+
+
+# CSVデータの行のエラー
+# line: 行番号(0始まり), record: CSVリーダーのデータ(1行),
+# message: ログに出力するエラーの内容, error_message: エラーメッセージ,
+# error_type: 集計用のエラーの種類
+RowError = collections.namedtuple(
+    "RowError",
+    ["line", "record", "message", "error_message", "error_type"],
+)
+
+
+# CSVデータの行から生成する販売情報(Salesを生成せずに重複判定, 保存, 集計する)
+SalesRow = collections.namedtuple(
+    "SalesRow",
+    ["fruit_id", "quantity", "total", "sale_date"],
+)
+
+
+# CSVデータの行のフォーマット結果(Sales生成の為の引数)
+# ※namedtupleは__slots__=()のため、行ごとに属性の辞書を持たない
+FormatCsv = collections.namedtuple(
+    "FormatCsv",
+    ["fruit", "quantity", "total", "sale_date"],
+)
+
+# CSVデータの販売日時の形式(YYYY-MM-DD HH:MM), タイムゾーン
+SALE_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}")
+SALE_DATE_TZ = datetime.timezone(datetime.timedelta(hours=9))
 
 
 class FruitForm(forms.ModelForm):
@@ -26,140 +73,807 @@ class FruitForm(forms.ModelForm):
         model = Fruit
 
 
+class SalesCSVRowValidator:
+    """
+    CSVデータの行のフォーマット(バリデーション)を定義
+    ※インポートごとに1回生成し、全ての行で使い回す
+    """
+
+    __slots__ = ("fruit_map",)
+
+    # フォーマットのエラーメッセージ ※集計用のエラーの種類にもそのまま使う
+    error_messages = {
+        "invalid_quantity": "個数に数値以外が入力されています",
+        "invalid_total": "売り上げに数値以外が入力されています",
+        "negative_quantity": "個数にマイナスの数値が入力されています",
+        "negative_total": "売り上げにマイナスの数値が入力されています",
+        "invalid_sale_date": "販売日時が YYYY-MM-DD HH:MM 形式になっていません",
+    }
+
+    def __init__(self, fruit_map):
+        """
+        果物の辞書を設定
+
+        Parameters
+        ----------
+        fruit_map: dict
+            {果物名: Fruit}の辞書 ※同名の果物が複数ある場合はNone
+        """
+        self.fruit_map = fruit_map
+
+    def get_fruit(self, name):
+        """
+        果物名に対応するFruitを取得(インポート中はDBを参照しない)
+
+        Parameters
+        ----------
+        name: str
+            果物名
+
+        Returns
+        -------
+        fruit: Fruit
+            果物名に対応するFruit
+        """
+        if name not in self.fruit_map:
+            raise Fruit.DoesNotExist(f"Fruit matching name={name!r} not found")
+
+        if self.fruit_map[name] is None:
+            raise Fruit.MultipleObjectsReturned(
+                f"Multiple fruits matching name={name!r} found"
+            )
+        return self.fruit_map[name]
+
+    def parse_sale_date(self, value):
+        """
+        YYYY-MM-DD HH:MM形式の販売日時をdatetimeに変換
+        ※ASCIIの場合は位置で切り出して変換し、それ以外(全角数字など)と
+          範囲外の日時はfromisoformatに任せる(エラーメッセージを変えない)
+
+        Parameters
+        ----------
+        value: str
+            販売日時(YYYY-MM-DD HH:MM)
+
+        Returns
+        -------
+        sale_date: datetime
+            販売日時(日本時間)
+        """
+        if value.isascii():
+            try:
+                return datetime.datetime(
+                    int(value[0:4]),
+                    int(value[5:7]),
+                    int(value[8:10]),
+                    int(value[11:13]),
+                    int(value[14:16]),
+                    tzinfo=SALE_DATE_TZ,
+                )
+            except ValueError:
+                pass
+
+        return datetime.datetime.fromisoformat(value).replace(
+            tzinfo=SALE_DATE_TZ
+        )
+
+    def validate(self, record):
+        """
+        CSVリーダーのデータを1行ずつフォーマット(バリデーション)
+
+        Parameters
+        ----------
+        record: list
+            CSVリーダーのデータ(1行)
+
+        Returns
+        -------
+        format_csv: FormatCsv
+            Sales生成の為の引数
+        """
+        quantity = record[1]
+        total = record[2]
+
+        if not quantity.isdigit():
+            raise ValueError(self.error_messages["invalid_quantity"])
+
+        if not total.isdigit():
+            raise ValueError(self.error_messages["invalid_total"])
+
+        quantity = int(quantity)
+        total = int(total)
+
+        if quantity < 0:
+            raise ValueError(self.error_messages["negative_quantity"])
+
+        if total < 0:
+            raise ValueError(self.error_messages["negative_total"])
+
+        if not SALE_DATE_PATTERN.fullmatch(record[3]):
+            raise ValueError(self.error_messages["invalid_sale_date"])
+
+        return FormatCsv(
+            self.get_fruit(record[0]),
+            quantity,
+            total,
+            self.parse_sale_date(record[3]),
+        )
+
+
 class SalesCSVForm(forms.Form):
     """販売情報管理(CSVインポート)のフォームを定義"""
 
+    batch_size = 1000
+    parse_chunk_size = 4 * 1024 * 1024
+    row_log_limit = 10
+    error_limit = 20
+    raw_fields = ("fruit", "quantity", "total", "sale_date", "import_hash")
+    error_types = frozenset(SalesCSVRowValidator.error_messages.values())
+    error_report_header = [
+        "行番号",
+        "エラー内容",
+        "果物名",
+        "個数",
+        "売り上げ",
+        "販売日時",
+    ]
+
     csv = forms.FileField(
         label="CSV一括登録",
-        validators=[FileExtensionValidator(["csv"])],
+        validators=[FileExtensionValidator(["csv", "gz", "zip"])],
+        widget=forms.ClearableFileInput(attrs={"accept": ".csv,.gz,.zip"}),
     )
 
+    def get_zip_csv_infos(self, archive):
+        """
+        ZIPファイルに含まれるCSVファイルを格納順に取得
+        ※ディレクトリ, macOSのリソースフォーク(__MACOSX/, ._*)は除く
+
+        Parameters
+        ----------
+        archive: ZipFile
+            ZIPファイル
+
+        Returns
+        -------
+        infos: list
+            CSVファイルのZipInfoリスト
+        """
+        return [
+            info
+            for info in archive.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(".csv")
+            and not info.filename.startswith("__MACOSX/")
+            and not info.filename.rsplit("/", 1)[-1].startswith("._")
+        ]
+
+    def clean_csv(self):
+        """
+        圧縮したCSVデータの形式を検証(展開はしない)
+            .gz: gzipで圧縮したCSVファイル(.csv.gz)
+            .zip: CSVファイルを1つ以上含むZIPファイル
+
+        Returns
+        -------
+        csv_data: UploadedFile
+            アップロードしたCSVデータ
+        """
+        csv_data = self.cleaned_data["csv"]
+        name = csv_data.name.lower()
+
+        if name.endswith(".gz"):
+            csv_data.seek(0)
+            magic_number = csv_data.read(2)
+            csv_data.seek(0)
+
+            if not name.endswith(".csv.gz") or magic_number != b"\x1f\x8b":
+                raise ValidationError(
+                    "gzipで圧縮したCSVファイル(.csv.gz)を指定してください。"
+                )
+        elif name.endswith(".zip"):
+            try:
+                with zipfile.ZipFile(csv_data) as archive:
+                    has_csv = bool(self.get_zip_csv_infos(archive))
+            except zipfile.BadZipFile:
+                has_csv = False
+
+            csv_data.seek(0)
+
+            if not has_csv:
+                raise ValidationError(
+                    "CSVファイルを含むZIPファイルを指定してください。"
+                )
+        return csv_data
+
+    def iter_csv_files(self, csv_data):
+        """
+        アップロードしたCSVデータを展開しながら読み込むファイルを生成
+        ※展開後のデータ全体をメモリ, ディスクに書き出さない
+        ※ZIPファイルに複数のCSVファイルがある場合は、格納順に連結して扱う
+
+        Parameters
+        ----------
+        csv_data : UploadedFile
+            アップロードしたCSVデータ(.csv, .csv.gz, .zip)
+
+        Yields
+        ------
+        csv_file: file
+            CSVデータ(バイト列)を読み込むファイル
+        """
+        csv_data.seek(0)
+        name = csv_data.name.lower()
+
+        if name.endswith(".gz"):
+            with gzip.GzipFile(fileobj=csv_data) as csv_file:
+                yield csv_file
+        elif name.endswith(".zip"):
+            with zipfile.ZipFile(csv_data) as archive:
+                for info in self.get_zip_csv_infos(archive):
+                    with archive.open(info) as csv_file:
+                        yield csv_file
+        else:
+            yield csv_data
+
     def load_csv(self, csv_data):
         """
         アップロードしたCSVデータからCSVリーダーを生成(データ読み込み)
+        ※ファイル全体を読み込まず、チャンク単位で1行ずつ展開, デコードする
 
         Parameters
         ----------
-        csv_data : InMemoryUploadedFile
-            アップロードしたCSVデータ
+        csv_data : UploadedFile
+            アップロードしたCSVデータ(.csv, .csv.gz, .zip)
 
         Returns
         -------
-        csv_reader: reader
-            CSVリーダー
+        csv_reader: iterator
+            CSVリーダー(複数のCSVファイルの場合は連結したもの)
         """
-        csv_text = csv_data.read().decode("utf-8")
-        csv_file = io.StringIO(csv_text)
-        return csv.reader(csv_file)
+        return itertools.chain.from_iterable(
+            csv.reader(codecs.iterdecode(csv_file, "utf-8"))
+            for csv_file in self.iter_csv_files(csv_data)
+        )
 
-    def validate_and_format_csv(self, record):
+    def get_fruit_map(self):
         """
-        CSVリーダーのデータを1行ずつフォーマット(バリデーション)
+        果物名からFruitを引くための辞書を1クエリで取得
+        ※同名の果物が複数ある場合は、検索時にエラーとするためNoneを設定
+
+        Returns
+        -------
+        fruit_map: dict
+            {果物名: Fruit}の辞書
+        """
+        fruit_map = {}
+
+        for fruit in Fruit.objects.all():
+            fruit_map[fruit.name] = None if fruit.name in fruit_map else fruit
+        return fruit_map
+
+    def get_error_message(self, i, error):
+        """
+        CSVデータの行のエラーをエラーメッセージに変換
 
         Parameters
         ----------
-        record: list
-            CSVリーダーのデータ(1行)
+        i: int
+            CSVデータの行番号(0始まり)
+        error: Exception
+            行のフォーマット(バリデーション)で発生したエラー
 
         Returns
         -------
-        FormatCsv: FormatCsv
-            Sales生成の為の引数
+        error_message: str
+            エラーメッセージ
         """
-        DATE_REGEX = r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$"
+        if isinstance(error, ObjectDoesNotExist):
+            return f"CSVデータ{i + 1}行目の果物が見つかりませんでした。"
 
-        if not record[1].isdigit():
-            raise ValueError("個数に数値以外が入力されています")
+        if isinstance(error, ValueError):
+            return f"CSVデータ{i + 1}行目の{error}"
 
-        if not record[2].isdigit():
-            raise ValueError("売り上げに数値以外が入力されています")
+        return f"CSVデータ{i + 1}行目でエラーが発生しました。"
 
-        if int(record[1]) < 0:
-            raise ValueError("個数にマイナスの数値が入力されています")
+    def get_error_type(self, error):
+        """
+        CSVデータの行のエラーを集計用のエラーの種類に変換
+        ※行番号, 行の値を含まない決まった種類(フォーマットのエラーメッセージ,
+          果物が見つからない, その他)に分類し、種類の数は入力に関わらず一定
 
-        if int(record[2]) < 0:
-            raise ValueError("売り上げにマイナスの数値が入力されています")
+        Parameters
+        ----------
+        error: Exception
+            行のフォーマット(バリデーション)で発生したエラー
 
-        if not re.fullmatch(DATE_REGEX, record[3]):
-            raise ValueError("販売日時が YYYY-MM-DD HH:MM 形式になっていません")
+        Returns
+        -------
+        error_type: str
+            エラーの種類
+        """
+        if isinstance(error, ObjectDoesNotExist):
+            return "果物が見つかりませんでした"
 
-        jst = datetime.timezone(datetime.timedelta(hours=9))
-        FormatCsv = collections.namedtuple(
-            "FormatCsv",
-            ["fruit", "quantity", "total", "sale_date"],
-        )
-        return FormatCsv(
-            Fruit.objects.get(name=record[0]),
-            int(record[1]),
-            int(record[2]),
-            datetime.datetime.fromisoformat(
-                record[3],
-            ).replace(tzinfo=jst),
+        error_type = str(error)
+
+        if isinstance(error, ValueError) and error_type in self.error_types:
+            return error_type
+
+        return "その他のエラー"
+
+    def get_row_error(self, i, record, error):
+        """
+        CSVデータの行のエラーを生成
+
+        Parameters
+        ----------
+        i: int
+            CSVデータの行番号(0始まり)
+        record: list
+            CSVリーダーのデータ(1行)
+        error: Exception
+            行のフォーマット(バリデーション)で発生したエラー
+
+        Returns
+        -------
+        row_error: RowError
+            CSVデータの行のエラー
+        """
+        return RowError(
+            i,
+            record,
+            str(error),
+            self.get_error_message(i, error),
+            self.get_error_type(error),
         )
 
-    def get_sales_list(self, csv_reader):
+    def add_row_error(self, row_error):
+        """
+        CSVデータの行のエラーを種類ごとに集計し、エラーレポートに書き込む
+        ※ログはrow_log_limit行目まで、フォームのエラーはerror_limit行目まで
+          とし、件数に関わらずメモリ使用量, 画面のサイズを一定に保つ
+
+        Parameters
+        ----------
+        row_error: RowError
+            CSVデータの行のエラー
+        """
+        self.rows_failed += 1
+        self.error_counts[row_error.error_type] += 1
+
+        if self.rows_failed <= self.row_log_limit:
+            logging.warning(row_error.message)
+
+        if self.rows_failed <= self.error_limit:
+            self.add_error("csv", row_error.error_message)
+
+        if self.error_writer is not None:
+            self.error_writer.writerow(
+                [row_error.line + 1, row_error.error_type, *row_error.record]
+            )
+
+    def iter_sales(self, csv_reader):
         """
-        Salesのリストを取得
+        CSVリーダーから1行ずつ販売情報を生成
 
         Parameters
         ----------
         csv_reader: reader
             CSVリーダー
 
-        Returns
-        -------
-        sales_list: list
-            Salesリスト
+        Yields
+        ------
+        sales_row: SalesRow
+            販売情報(未保存)
         """
-        sales_list = []
+        self.row_validator = SalesCSVRowValidator(self.get_fruit_map())
+        validate = self.row_validator.validate
+        self.rows_processed = 0
+        self.rows_failed = 0
+        self.error_counts = collections.Counter()
 
         for i, record in enumerate(csv_reader):
+            self.rows_processed += 1
+
             try:
-                format_csv = self.validate_and_format_csv(record)
+                format_csv = validate(record)
 
-                sales = Sales(
-                    fruit=format_csv.fruit,
-                    quantity=format_csv.quantity,
-                    total=format_csv.total,
-                    sale_date=format_csv.sale_date,
+                yield SalesRow(
+                    format_csv.fruit.pk,
+                    format_csv.quantity,
+                    format_csv.total,
+                    format_csv.sale_date,
                 )
-                sales_list.append(sales)
-            except ObjectDoesNotExist as e:
-                logging.warning(e)
+            except Exception as e:
+                self.add_row_error(self.get_row_error(i, record, e))
 
-                self.add_error(
-                    "csv",
-                    f"CSVデータ{i + 1}行目の果物が見つかりませんでした。",
-                )
-            except ValueError as e:
-                logging.warning(e)
+    def iter_batches(self, sales_iter):
+        """
+        販売情報をbatch_size行ずつ、重複判定用ハッシュの辞書にまとめる
+        ※バッチ内で重複する行は最初の1行のみ残す
+
+        Parameters
+        ----------
+        sales_iter: iterator
+            販売情報(SalesRow)のイテレーター
+
+        Yields
+        ------
+        batch: tuple
+            (バッチの行数, {重複判定用ハッシュ: 販売情報(SalesRow)}の辞書)
+        """
+        while sales_rows := list(
+            itertools.islice(sales_iter, self.batch_size)
+        ):
+            unique_sales = {}
+
+            for sales_row in sales_rows:
+                unique_sales.setdefault(get_import_hash(sales_row), sales_row)
+
+            yield len(sales_rows), unique_sales
+
+    def iter_csv_chunks(self, csv_data):
+        """
+        CSVデータを行の途中で切れないparse_chunk_sizeバイト程度の塊に分割
+        ※セル内に改行を含むCSVデータには対応しない
+        ※圧縮したCSVデータは展開しながら分割する
+
+        Parameters
+        ----------
+        csv_data : UploadedFile
+            アップロードしたCSVデータ(.csv, .csv.gz, .zip)
+
+        Yields
+        ------
+        chunk: tuple
+            (塊の先頭行の行番号[0始まり], 塊のバイト列)
+        """
+        first_line = 0
+
+        for csv_file in self.iter_csv_files(csv_data):
+            while chunk := csv_file.read(self.parse_chunk_size):
+                if not chunk.endswith(b"\n"):
+                    chunk += csv_file.readline()
 
-                self.add_error(
-                    "csv",
-                    f"CSVデータ{i + 1}行目の{e}",
+                # 末尾に改行が無いファイルの最終行も、次のファイルの行番号に数える
+                if not chunk.endswith(b"\n"):
+                    chunk += b"\n"
+
+                yield first_line, chunk
+                first_line += chunk.count(b"\n")
+
+    def iter_sales_parallel(self, csv_data, processes):
+        """
+        CSVデータを塊ごとに複数プロセスでフォーマット(バリデーション)し、
+        元の行順にバッチを生成
+        ※重複判定用ハッシュの生成, バッチの作成もプロセスで行い、
+          親プロセスには塊ごとのバッチとエラーの行のみを返す
+        ※DBへの保存は呼び出し側で直列に行う
+
+        Parameters
+        ----------
+        csv_data : InMemoryUploadedFile
+            アップロードしたCSVデータ
+        processes: int
+            フォーマットに使うプロセス数
+
+        Yields
+        ------
+        batch: tuple
+            (バッチの行数, {重複判定用ハッシュ: 販売情報(SalesRow)}の辞書)
+        """
+        fruit_map = self.get_fruit_map()
+        self.rows_processed = 0
+        self.rows_failed = 0
+        self.error_counts = collections.Counter()
+        chunks = self.iter_csv_chunks(csv_data)
+        futures = collections.deque()
+
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=init_csv_parser,
+            initargs=(fruit_map, self.batch_size),
+        ) as executor:
+            for first_line, chunk in itertools.islice(chunks, processes * 2):
+                futures.append(
+                    executor.submit(parse_csv_chunk, chunk, first_line)
                 )
-            except Exception as e:
-                logging.warning(e)
 
-                self.add_error(
-                    "csv",
-                    f"CSVデータ{i + 1}行目でエラーが発生しました。",
+            while futures:
+                rows_count, batches, row_errors = futures.popleft().result()
+
+                for first_line, chunk in itertools.islice(chunks, 1):
+                    futures.append(
+                        executor.submit(parse_csv_chunk, chunk, first_line)
+                    )
+
+                self.rows_processed += rows_count
+
+                for row_error in row_errors:
+                    self.add_row_error(row_error)
+
+                yield from batches
+
+    def iter_query_param_chunks(self, model, values):
+        """
+        IN句に渡す値を、DBの1クエリのパラメータ数の上限
+        (SQLiteは999件)を超えないよう分割
+        ※上限の無いDB(PostgreSQL)は分割しない
+
+        Parameters
+        ----------
+        model: type
+            検索するモデル
+        values: list
+            IN句に渡す値(昇順)
+
+        Yields
+        ------
+        chunk: list
+            分割した値
+        """
+        features = connections[router.db_for_read(model)].features
+        chunk_size = features.max_query_params or max(len(values), 1)
+
+        for start in range(0, len(values), chunk_size):
+            yield values[start : start + chunk_size]
+
+    def exclude_duplicate_sales(self, rows_count, unique_sales):
+        """
+        バッチから登録済みの行を除外
+        ※前のバッチは保存済みのため、登録済みの行の判定で検出される
+        ※呼び出し側のトランザクション内で実行すること
+          重複判定用ハッシュは果物を含むため、バッチの果物を行ロックしてから
+          判定し、同じ行を同時にインポートしても片方だけが保存, 集計する
+
+        Parameters
+        ----------
+        rows_count: int
+            バッチの行数(バッチ内で重複する行を含む)
+        unique_sales: dict
+            バッチの{重複判定用ハッシュ: 販売情報(SalesRow)}の辞書(未保存)
+
+        Returns
+        -------
+        new_sales: dict
+            重複を除いた{重複判定用ハッシュ: 販売情報(SalesRow)}の辞書
+        """
+        fruit_ids = sorted(
+            {sales_row.fruit_id for sales_row in unique_sales.values()}
+        )
+
+        for fruit_ids_chunk in self.iter_query_param_chunks(Fruit, fruit_ids):
+            list(
+                Fruit.objects.select_for_update()
+                .filter(pk__in=fruit_ids_chunk)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+
+        existing_hashes = set()
+
+        for import_hashes in self.iter_query_param_chunks(
+            Sales, sorted(unique_sales)
+        ):
+            existing_hashes.update(
+                Sales.objects.filter(
+                    import_hash__in=import_hashes
+                ).values_list("import_hash", flat=True)
+            )
+        new_sales = {
+            import_hash: sales_row
+            for import_hash, sales_row in unique_sales.items()
+            if import_hash not in existing_hashes
+        }
+        self.rows_skipped += rows_count - len(new_sales)
+        return new_sales
+
+    def insert_sales_orm(self, new_sales):
+        """
+        販売情報からSalesを生成し、bulk_createで一括保存(IMPORT_ENGINE=orm)
+
+        Parameters
+        ----------
+        new_sales: dict
+            {重複判定用ハッシュ: 販売情報(SalesRow)}の辞書
+        """
+        Sales.objects.bulk_create(
+            [
+                Sales(
+                    fruit_id=sales_row.fruit_id,
+                    quantity=sales_row.quantity,
+                    total=sales_row.total,
+                    sale_date=sales_row.sale_date,
+                    import_hash=import_hash,
                 )
-        return sales_list
+                for import_hash, sales_row in new_sales.items()
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
 
-    def save_csv(self, csv_data):
+    def insert_sales_raw(self, new_sales):
         """
-        アップロードしたCSVデータをDBに一括保存
+        Salesを生成せずに、DBカーソルのexecutemanyで一括保存
+        (IMPORT_ENGINE=raw)
+        ※INSERT文, 競合の無視(ignore_conflicts), 販売日時の変換は
+          bulk_createと同じくconnection.opsとフィールドで生成する
+        ※Salesの全ての列を指定するため、既定値は使わない
+
+        Parameters
+        ----------
+        new_sales: dict
+            {重複判定用ハッシュ: 販売情報(SalesRow)}の辞書
+        """
+        connection = connections[router.db_for_write(Sales)]
+        ops = connection.ops
+        fields = [Sales._meta.get_field(name) for name in self.raw_fields]
+        sale_date_field = Sales._meta.get_field("sale_date")
+        sql = "{} {} ({}) VALUES ({}) {}".format(
+            ops.insert_statement(on_conflict=OnConflict.IGNORE),
+            ops.quote_name(Sales._meta.db_table),
+            ", ".join(ops.quote_name(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+            ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None),
+        ).rstrip()
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                sql,
+                [
+                    (
+                        sales_row.fruit_id,
+                        sales_row.quantity,
+                        sales_row.total,
+                        sale_date_field.get_db_prep_save(
+                            sales_row.sale_date, connection
+                        ),
+                        import_hash,
+                    )
+                    for import_hash, sales_row in new_sales.items()
+                ],
+            )
+
+    def save_csv(self, csv_data, progress=None, error_report=None):
+        """
+        アップロードしたCSVデータをbatch_size件ずつDBに一括保存
+        ※bulk_createはsaveを呼ばないため、販売集計も同一トランザクションで更新
+        ※IMPORT_PARSE_PROCESSESが2以上の場合は、フォーマットを複数プロセスで実行
+        ※IMPORT_ENGINEがrawの場合は、Salesを生成せずにexecutemanyで保存
+        ※登録済みの行は保存しないため、同じCSVデータの再インポートは何もしない
+        ※error_reportを指定した場合は、エラーの行を全てCSVで書き込む
 
         Parameters
         ----------
         csv_data : InMemoryUploadedFile
             アップロードしたCSVデータ
+        progress: callable
+            バッチ保存ごとに(処理行数, エラー行数, 重複行数)を受け取る関数
+        error_report: file
+            エラーレポート(行番号, エラー内容, 元の行)の書き込み先
+            ※テキストモード(newline="")で開いたファイル
         """
-        csv_reader = self.load_csv(csv_data)
-        sales_list = self.get_sales_list(csv_reader)
+        processes = settings.IMPORT_PARSE_PROCESSES
+        self.rows_skipped = 0
+        self.error_writer = None
+
+        if error_report is not None:
+            self.error_writer = csv.writer(error_report)
+            self.error_writer.writerow(self.error_report_header)
+        start = time.perf_counter()
+
+        if processes > 1:
+            batches = self.iter_sales_parallel(csv_data, processes)
+        else:
+            batches = self.iter_batches(
+                self.iter_sales(self.load_csv(csv_data))
+            )
+
+        if settings.IMPORT_ENGINE == "raw":
+            insert_sales = self.insert_sales_raw
+        else:
+            insert_sales = self.insert_sales_orm
+
+        for rows_count, unique_sales in batches:
+            with transaction.atomic():
+                new_sales = self.exclude_duplicate_sales(
+                    rows_count, unique_sales
+                )
+
+                if new_sales:
+                    insert_sales(new_sales)
+                    update_sales_summaries(new_sales.values())
+                    touch_sales_last_modified()
+
+            metrics.csv_rows_imported_total.inc(amount=len(new_sales))
 
-        Sales.objects.bulk_create(sales_list)
+            if progress is not None:
+                progress(
+                    self.rows_processed, self.rows_failed, self.rows_skipped
+                )
+
+        if self.rows_failed > self.row_log_limit:
+            logging.warning(
+                "CSVデータのエラー%d行のうち、%d行のログを省略しました",
+                self.rows_failed,
+                self.rows_failed - self.row_log_limit,
+            )
+
+        if self.rows_failed > self.error_limit:
+            self.add_error(
+                "csv",
+                f"他{self.rows_failed - self.error_limit}行のエラーは"
+                "エラーレポートで確認してください。",
+            )
+
+        metrics.csv_rows_failed_total.inc(amount=self.rows_failed)
+        metrics.csv_import_duration_seconds.inc(
+            amount=time.perf_counter() - start
+        )
+
+
+csv_parser = None
+
+
+def init_csv_parser(fruit_map, batch_size):
+    """
+    CSVデータをフォーマットするプロセスの初期化
+
+    Parameters
+    ----------
+    fruit_map: dict
+        {果物名: Fruit}の辞書
+    batch_size: int
+        バッチの行数
+    """
+    global csv_parser
+    csv_parser = SalesCSVForm()
+    csv_parser.batch_size = batch_size
+    csv_parser.row_validator = SalesCSVRowValidator(fruit_map)
+
+
+def parse_csv_chunk(chunk, first_line):
+    """
+    CSVデータの塊を1行ずつフォーマット(バリデーション)し、
+    batch_size行ずつのバッチにまとめる
+    ※ProcessPoolExecutorのプロセスで実行
+
+    Parameters
+    ----------
+    chunk: bytes
+        行の途中で切れていないCSVデータの塊
+    first_line: int
+        塊の先頭行の行番号(0始まり)
+
+    Returns
+    -------
+    result: tuple
+        (塊の行数, バッチリスト, エラーの行リスト)
+            バッチ: (バッチの行数, {重複判定用ハッシュ: SalesRow}の辞書)
+            エラーの行: RowError
+    """
+    validate = csv_parser.row_validator.validate
+    row_errors = []
+    csv_reader = csv.reader(io.StringIO(chunk.decode("utf-8"), newline=""))
+
+    def iter_sales_rows():
+        for i, record in enumerate(csv_reader, first_line):
+            try:
+                format_csv = validate(record)
+            except Exception as e:
+                row_errors.append(csv_parser.get_row_error(i, record, e))
+                continue
+
+            yield SalesRow(
+                format_csv.fruit.pk,
+                format_csv.quantity,
+                format_csv.total,
+                format_csv.sale_date,
+            )
+
+    batches = list(csv_parser.iter_batches(iter_sales_rows()))
+    return csv_reader.line_num, batches, row_errors
 
 
 class SalesForm(forms.ModelForm):
@@ -168,3 +882,116 @@ class SalesForm(forms.ModelForm):
     class Meta:
         fields = ("fruit", "quantity", "sale_date")
         model = Sales
+
+
+class SalesFilterForm(forms.Form):
+    """
+    販売情報の絞り込み条件(期間, 果物)のフォームを定義
+    ※クエリパラメータ名のfrom, toは予約語のため__init__でフィールドを追加
+    """
+
+    default_days = 30
+    # 期間の下限, 上限(TIME_ZONE基準の日時の範囲, UTCに変換しても扱える日付)
+    min_date = datetime.date(1, 1, 2)
+    max_date = datetime.date(9999, 12, 30)
+
+    fruit = forms.ModelMultipleChoiceField(
+        queryset=Fruit.objects.all(),
+        required=False,
+    )
+
+    def __init__(self, *args, **kwargs):
+        """期間(from, to)のフィールドを追加"""
+        super().__init__(*args, **kwargs)
+        self.fields["from"] = forms.DateField(required=False)
+        self.fields["to"] = forms.DateField(required=False)
+
+    def clean(self):
+        """
+        期間の既定値(当日を含む過去default_days日間)を設定し、
+        範囲(min_date~max_date), 前後関係を検証
+        ※get_datetime_rangeで日時に変換してもオーバーフローしない期間に限る
+
+        Returns
+        -------
+        cleaned_data: dict
+            検証済みの絞り込み条件
+        """
+        cleaned_data = super().clean()
+
+        for name in ("from", "to"):
+            value = cleaned_data.get(name)
+
+            if value is not None and not (
+                self.min_date <= value <= self.max_date
+            ):
+                raise forms.ValidationError(
+                    f"{name}は{self.min_date}から{self.max_date}までの"
+                    "日付を指定してください"
+                )
+
+        date_to = cleaned_data.get("to") or timezone.localdate()
+        date_from = cleaned_data.get("from") or date_to - datetime.timedelta(
+            days=min(self.default_days - 1, (date_to - self.min_date).days)
+        )
+
+        if date_from > date_to:
+            raise forms.ValidationError("fromはto以前の日付を指定してください")
+
+        cleaned_data["from"] = date_from
+        cleaned_data["to"] = date_to
+        return cleaned_data
+
+    def get_datetime_range(self):
+        """
+        期間をTIME_ZONE基準の日時の範囲に変換
+
+        Returns
+        -------
+        datetime_range: tuple
+            (fromの0時, toの翌日0時)
+        """
+        start = datetime.datetime.combine(
+            self.cleaned_data["from"], datetime.time.min
+        )
+        end = datetime.datetime.combine(
+            self.cleaned_data["to"] + datetime.timedelta(days=1),
+            datetime.time.min,
+        )
+        return timezone.make_aware(start), timezone.make_aware(end)
+
+
+class StatisticsQueryForm(SalesFilterForm):
+    """販売統計情報APIの絞り込み条件(期間, 果物, 集計単位)のフォームを定義"""
+
+    max_hourly_days = 31
+
+    granularity = forms.ChoiceField(
+        choices=[
+            ("hour", "時間"),
+            ("day", "日"),
+            ("week", "週"),
+            ("month", "月"),
+        ],
+        required=False,
+    )
+
+    def clean(self):
+        """
+        集計単位の既定値(day)を設定し、時間単位の期間の上限を検証
+
+        Returns
+        -------
+        cleaned_data: dict
+            検証済みの絞り込み条件
+        """
+        cleaned_data = super().clean()
+        cleaned_data["granularity"] = cleaned_data.get("granularity") or "day"
+        days = (cleaned_data["to"] - cleaned_data["from"]).days + 1
+        is_hourly = cleaned_data["granularity"] == "hour"
+
+        if is_hourly and days > self.max_hourly_days:
+            raise forms.ValidationError(
+                f"時間単位の集計期間は{self.max_hourly_days}日以内にしてください"
+            )
+        return cleaned_data
@@ -0,0 +1,91 @@
+"""
+ハンドラー定義ファイル
+
+- ストリーミングレスポンスをリクエストのスレッドで生成するASGIハンドラー
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """
+    ストリーミングレスポンス(CSVエクスポートなど)の内容を、ビューと同じ
+    リクエストのスレッドで1塊ずつ生成するASGIハンドラーを定義
+    ※Django 4.1のASGIHandlerはイベントループ内で同期イテレーターを回すため、
+      内容の生成中にDBを参照するとSynchronousOnlyOperationになる
+    """
+
+    def get_response_headers(self, response):
+        """
+        レスポンスのヘッダー, Cookieをバイト列のヘッダーリストに変換
+
+        Parameters
+        ----------
+        response: HttpResponseBase
+            レスポンス
+
+        Returns
+        -------
+        response_headers: list
+            (ヘッダー名, 値)のリスト
+        """
+        response_headers = []
+
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+
+            if isinstance(value, str):
+                value = value.encode("latin1")
+
+            response_headers.append((bytes(header), bytes(value)))
+
+        for cookie in response.cookies.values():
+            response_headers.append(
+                (
+                    b"Set-Cookie",
+                    cookie.output(header="").encode("ascii").strip(),
+                )
+            )
+        return response_headers
+
+    async def send_response(self, response, send):
+        """
+        レスポンスを送信
+        ストリーミングレスポンスは、内容の塊をsync_to_async(スレッド固定)で
+        リクエストのスレッドから取得して送信する
+
+        Parameters
+        ----------
+        response: HttpResponseBase
+            レスポンス
+        send: callable
+            ASGIの送信関数
+        """
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": self.get_response_headers(response),
+            }
+        )
+        parts = iter(response)
+        get_next_part = sync_to_async(next, thread_sensitive=True)
+
+        while (part := await get_next_part(parts, None)) is not None:
+            for chunk, _ in self.chunk_bytes(part):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                    }
+                )
+
+        await send({"type": "http.response.body"})
+        await sync_to_async(response.close, thread_sensitive=True)()
@@ -0,0 +1,234 @@
+"""
+ジョブ定義ファイル
+
+- CSVインポートジョブ(登録, 取得, 実行)
+"""
+import concurrent.futures
+import datetime
+import logging
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from mgmt.forms import SalesCSVForm
+from mgmt.models import ImportJob
+
+executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="import-job",
+)
+
+
+def enqueue_import_job(csv_data):
+    """
+    アップロードしたCSVデータを保存してCSVインポートジョブを登録
+    IMPORT_JOB_RUNNERの設定に応じてジョブを実行する
+        worker: run_import_workerコマンドが実行(登録のみ, 既定値)
+        thread: プロセス内のスレッドで実行
+            ※実行前にプロセスが再起動するとジョブは待機中のまま残る
+        eager: 登録したリクエスト内で実行(テスト用)
+
+    Parameters
+    ----------
+    csv_data : UploadedFile
+        アップロードしたCSVデータ
+
+    Returns
+    -------
+    import_job: ImportJob
+        登録したCSVインポートジョブ
+    """
+    import_job = ImportJob.objects.create(
+        csv_file=csv_data,
+        filename=csv_data.name,
+    )
+    runner = settings.IMPORT_JOB_RUNNER
+
+    if runner == "eager":
+        if claim_import_job(import_job):
+            run_import_job(import_job)
+    elif runner == "thread":
+        executor.submit(run_claimed_import_job_in_thread, import_job.pk)
+    return import_job
+
+
+def claim_import_job(import_job):
+    """
+    待機中のCSVインポートジョブを処理中に更新(他のワーカーと取り合わない)
+
+    Parameters
+    ----------
+    import_job: ImportJob
+        CSVインポートジョブ
+
+    Returns
+    -------
+    claimed: bool
+        処理中に更新できた場合はTrue
+    """
+    started_at = timezone.now()
+    claimed = ImportJob.objects.filter(
+        pk=import_job.pk,
+        status=ImportJob.Status.PENDING,
+    ).update(
+        status=ImportJob.Status.RUNNING,
+        started_at=started_at,
+        heartbeat_at=started_at,
+    )
+
+    if claimed:
+        import_job.status = ImportJob.Status.RUNNING
+        import_job.started_at = started_at
+        import_job.heartbeat_at = started_at
+    return bool(claimed)
+
+
+def requeue_stale_import_jobs():
+    """
+    処理中のままIMPORT_JOB_STALE_SECONDS秒以上応答(進捗の更新)がない
+    CSVインポートジョブを待機中に戻す
+    ※ワーカーの停止, 再起動で中断したジョブを再実行するため
+    ※保存済みの行は重複判定で除外されるため、最初から再実行する
+
+    Returns
+    -------
+    requeued: int
+        待機中に戻したジョブの数
+    """
+    stale_before = timezone.now() - datetime.timedelta(
+        seconds=settings.IMPORT_JOB_STALE_SECONDS
+    )
+    requeued = (
+        ImportJob.objects.filter(status=ImportJob.Status.RUNNING)
+        .filter(
+            Q(heartbeat_at__lt=stale_before)
+            | Q(heartbeat_at__isnull=True, started_at__lt=stale_before)
+        )
+        .update(
+            status=ImportJob.Status.PENDING,
+            started_at=None,
+            heartbeat_at=None,
+            rows_processed=0,
+            rows_failed=0,
+            rows_skipped=0,
+        )
+    )
+
+    if requeued:
+        logging.warning(
+            "中断したCSVインポートジョブ%d件を待機中に戻しました", requeued
+        )
+    return requeued
+
+
+def claim_next_import_job():
+    """
+    最も古い待機中のCSVインポートジョブを取得して処理中に更新
+    ※先に中断したジョブを待機中に戻す
+
+    Returns
+    -------
+    import_job: ImportJob
+        処理中に更新したCSVインポートジョブ ※待機中のジョブがない場合はNone
+    """
+    requeue_stale_import_jobs()
+    pending_jobs = ImportJob.objects.filter(
+        status=ImportJob.Status.PENDING,
+    ).order_by("created_at", "pk")
+
+    for import_job in pending_jobs[:10]:
+        if claim_import_job(import_job):
+            return import_job
+    return None
+
+
+def run_import_job(import_job):
+    """
+    処理中のCSVインポートジョブを実行
+    バッチ保存ごとに処理行数, エラー行数, 重複行数, 最終応答日時を更新する
+    エラーの行は一時ファイルに書き込み、エラーレポートとして保存する
+
+    Parameters
+    ----------
+    import_job: ImportJob
+        処理中に更新したCSVインポートジョブ
+    """
+
+    def update_progress(rows_processed, rows_failed, rows_skipped):
+        ImportJob.objects.filter(pk=import_job.pk).update(
+            rows_processed=rows_processed,
+            rows_failed=rows_failed,
+            rows_skipped=rows_skipped,
+            heartbeat_at=timezone.now(),
+        )
+
+    csv_data = import_job.csv_file
+    form = SalesCSVForm({}, {"csv": csv_data})
+
+    with tempfile.TemporaryFile(
+        "w+", encoding="utf-8", newline=""
+    ) as error_report:
+        try:
+            with csv_data.open("rb"):
+                if form.is_valid():
+                    form.save_csv(
+                        csv_data,
+                        progress=update_progress,
+                        error_report=error_report,
+                    )
+                    import_job.status = ImportJob.Status.DONE
+                else:
+                    import_job.status = ImportJob.Status.FAILED
+        except Exception as e:
+            logging.exception(e)
+            form.add_error(None, "CSVインポート中にエラーが発生しました。")
+            import_job.status = ImportJob.Status.FAILED
+
+        if getattr(form, "rows_failed", 0):
+            error_report.seek(0)
+            import_job.error_report.save(
+                "{}_errors.csv".format(
+                    re.sub(
+                        r"(\.csv)?(\.gz|\.zip)?$",
+                        "",
+                        import_job.filename,
+                        flags=re.IGNORECASE,
+                    )
+                ),
+                File(error_report),
+                save=False,
+            )
+
+    import_job.rows_processed = getattr(form, "rows_processed", 0)
+    import_job.rows_failed = getattr(form, "rows_failed", 0)
+    import_job.rows_skipped = getattr(form, "rows_skipped", 0)
+    import_job.error_counts = dict(getattr(form, "error_counts", {}))
+    import_job.error_messages = "\n".join(
+        message for messages in form.errors.values() for message in messages
+    )
+    import_job.finished_at = timezone.now()
+    import_job.csv_file.delete(save=False)
+    import_job.save()
+
+
+def run_claimed_import_job_in_thread(import_job_pk):
+    """
+    スレッドでCSVインポートジョブを取得, 実行し、DB接続を閉じる
+
+    Parameters
+    ----------
+    import_job_pk: int
+        CSVインポートジョブのID
+    """
+    try:
+        import_job = ImportJob.objects.get(pk=import_job_pk)
+
+        if claim_import_job(import_job):
+            run_import_job(import_job)
+    finally:
+        connections.close_all()
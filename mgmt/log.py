@@ -0,0 +1,165 @@
+"""
+ログ定義ファイル
+
+- バックグラウンドスレッドでファイルに書き込むハンドラー(サイズ, 日時でローテーション)
+- JSON形式のフォーマッター
+"""
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+
+class QueueFileHandler(logging.Handler):
+    """
+    ログをキューに入れ、バックグラウンドスレッド(QueueListener)で
+    ローテーションするファイルに書き込むハンドラーを定義
+    ※リクエストを処理するスレッドではディスクに書き込まない
+    ※フォーマットは当ハンドラーのフォーマッターで行う
+    ※QueueHandlerを継承すると、Python 3.12以降のdictConfigがキュー, 書き込み先を
+      設定しようとして独自の引数で生成できないため、Handlerを継承する
+    """
+
+    def __init__(
+        self,
+        filename,
+        max_bytes=0,
+        backup_count=0,
+        when=None,
+        encoding="utf-8",
+    ):
+        """
+        書き込み先のハンドラーを生成し、書き込みスレッドを開始
+
+        Parameters
+        ----------
+        filename: str
+            ログファイルのパス
+        max_bytes: int
+            ローテーションするファイルサイズ(バイト) ※0の場合はしない
+        backup_count: int
+            残すローテーション済みのファイル数
+        when: str
+            日時でローテーションする場合の単位(ex: midnight)
+            ※指定した場合はmax_bytesを使わない
+        encoding: str
+            ログファイルの文字コード
+        """
+        if when:
+            self.file_handler = logging.handlers.TimedRotatingFileHandler(
+                filename,
+                when=when,
+                backupCount=backup_count,
+                encoding=encoding,
+                delay=True,
+            )
+        else:
+            self.file_handler = logging.handlers.RotatingFileHandler(
+                filename,
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding=encoding,
+                delay=True,
+            )
+
+        super().__init__()
+        self.queue = queue.SimpleQueue()
+        self.start()
+
+    def start(self):
+        """書き込みスレッドを開始"""
+        self.pid = os.getpid()
+        self.listener = logging.handlers.QueueListener(
+            self.queue, self.file_handler
+        )
+        self.listener.start()
+
+    def prepare(self, record):
+        """
+        ログをフォーマットし、キューに入れるログを生成
+        ※QueueHandler.prepareと同じく、フォーマット済みのメッセージに置き換え、
+          書き込みスレッドに渡せない引数, 例外情報を取り除く
+
+        Parameters
+        ----------
+        record: LogRecord
+            ログ
+
+        Returns
+        -------
+        record: LogRecord
+            フォーマット済みのログ(複製)
+        """
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def emit(self, record):
+        """
+        ログをキューに入れる
+        ※フォーク後の子プロセスでは書き込みスレッドが無いため、再度開始する
+
+        Parameters
+        ----------
+        record: LogRecord
+            ログ
+        """
+        if self.pid != os.getpid():
+            self.queue = queue.SimpleQueue()
+            self.start()
+
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        """キューに残ったログを書き込み、書き込みスレッドを停止"""
+        if self.pid == os.getpid() and self.listener._thread is not None:
+            self.listener.stop()
+
+        self.file_handler.close()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """ログを1行のJSONに変換するフォーマッターを定義"""
+
+    def format(self, record):
+        """
+        ログをJSONに変換
+
+        Parameters
+        ----------
+        record: LogRecord
+            ログ
+
+        Returns
+        -------
+        text: str
+            {time, level, logger, message, pathname, lineno, exc_info}の
+            JSON文字列 ※exc_infoは例外がある場合のみ
+        """
+        data = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pathname": record.pathname,
+            "lineno": record.lineno,
+        }
+
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
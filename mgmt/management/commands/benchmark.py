@@ -0,0 +1,418 @@
+"""
+管理コマンド定義ファイル
+
+- 画面, CSVインポートのベンチマーク
+"""
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from mgmt.forms import SalesCSVForm
+from mgmt.models import Fruit, Sales
+
+
+class Command(BaseCommand):
+    """
+    販売情報の件数ごとに画面, CSVインポートの性能を計測するコマンドを定義
+    ※一時ファイルのテスト用DBを作成して計測し、終了後に削除する
+    """
+
+    help = "販売情報の件数ごとに画面とCSVインポートの性能を計測します"
+
+    metrics = ("wall_time", "queries", "peak_memory")
+    exact_metrics = ("queries",)
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        parser.add_argument(
+            "--sizes",
+            default=[10000, 100000, 1000000],
+            nargs="+",
+            type=int,
+            help="計測する販売情報の件数(複数指定可)",
+        )
+        parser.add_argument(
+            "--repeat",
+            default=3,
+            type=int,
+            help="処理時間の計測回数(中央値を記録)",
+        )
+        parser.add_argument(
+            "--import-rows",
+            default=10000,
+            type=int,
+            help="CSVインポートで計測する行数",
+        )
+        parser.add_argument(
+            "--output",
+            help="計測結果を書き出すJSONファイル",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="比較する計測結果のJSONファイル",
+        )
+        parser.add_argument(
+            "--threshold",
+            default=0.2,
+            type=float,
+            help="劣化とみなす処理時間, メモリ使用量の増加率",
+        )
+
+    def measure(self, func, repeat):
+        """
+        処理時間(中央値), クエリ数, ピークメモリ使用量を計測
+        ※リクエスト開始時にconnection.queriesが消去されるため、
+          クエリ数はexecute_wrapperで数える
+        ※tracemalloc自体が遅いため、メモリは処理時間と別に計測する
+
+        Parameters
+        ----------
+        func: callable
+            計測する処理
+        repeat: int
+            処理時間の計測回数
+
+        Returns
+        -------
+        result: dict
+            {wall_time: 秒, queries: クエリ数, peak_memory: バイト}
+        """
+        wall_times = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        for _ in range(repeat):
+            cache.clear()
+            queries = []
+
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                func()
+                wall_times.append(time.perf_counter() - start)
+
+        cache.clear()
+        tracemalloc.start()
+
+        try:
+            func()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "wall_time": statistics.median(wall_times),
+            "queries": len(queries),
+            "peak_memory": peak_memory,
+        }
+
+    def get_targets(self, import_rows):
+        """
+        計測対象の処理を生成
+
+        Parameters
+        ----------
+        import_rows: int
+            CSVインポートで計測する行数
+
+        Returns
+        -------
+        targets: dict
+            {計測対象名: 処理}
+        """
+        client = Client()
+        client.force_login(User.objects.get(username="benchmark"))
+        fruit_names = list(Fruit.objects.values_list("name", flat=True))
+        start = datetime.datetime(2000, 1, 1)
+        csv_content = "\n".join(
+            "{},{},{},{:%Y-%m-%d %H:%M}".format(
+                fruit_names[i % len(fruit_names)],
+                1,
+                100,
+                start + datetime.timedelta(minutes=i),
+            )
+            for i in range(import_rows)
+        ).encode("utf-8")
+        # 半数の行が存在しない果物のCSV(行ごとのエラーログの負荷を計測)
+        noisy_csv_content = "\n".join(
+            "{},{},{},{:%Y-%m-%d %H:%M}".format(
+                fruit_names[i % len(fruit_names)] if i % 2 else "不明",
+                1,
+                100,
+                start + datetime.timedelta(minutes=i),
+            )
+            for i in range(import_rows)
+        ).encode("utf-8")
+
+        def get(path):
+            def request():
+                response = client.get(path)
+
+                if response.status_code != 200:
+                    raise CommandError(
+                        f"{path}: ステータスコード{response.status_code}"
+                    )
+
+            return request
+
+        def import_csv(
+            content, engine="orm", filename="benchmark.csv", processes=1
+        ):
+            def request():
+                csv_data = SimpleUploadedFile(filename, content)
+                form = SalesCSVForm({}, {"csv": csv_data})
+
+                with transaction.atomic(), override_settings(
+                    IMPORT_ENGINE=engine, IMPORT_PARSE_PROCESSES=processes
+                ):
+                    if form.is_valid():
+                        form.save_csv(csv_data)
+                    transaction.set_rollback(True)
+
+            return request
+
+        return {
+            "sales_list": get("/sales/"),
+            "statistics": get("/statistics/"),
+            "fruit_list": get("/fruit/"),
+            "csv_import": import_csv(csv_content),
+            "csv_import_noisy": import_csv(noisy_csv_content),
+            "csv_import_raw": import_csv(csv_content, engine="raw"),
+            "csv_import_gzip": import_csv(
+                gzip.compress(csv_content), filename="benchmark.csv.gz"
+            ),
+            "csv_import_parallel": import_csv(csv_content, processes=2),
+        }
+
+    def iter_results(self, options):
+        """
+        計測対象ごとに計測
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+
+        Yields
+        ------
+        result: tuple
+            (計測対象名, 計測結果)
+            ※CSVインポートは計測結果に処理速度(rows_per_second: 行/秒)を追加
+        """
+        targets = self.get_targets(options["import_rows"])
+
+        for name, func in targets.items():
+            result = self.measure(func, options["repeat"])
+
+            if name.startswith("csv_import"):
+                result["rows_per_second"] = (
+                    options["import_rows"] / result["wall_time"]
+                )
+
+            yield name, result
+
+    def format_result(self, result):
+        """
+        計測結果を表示用の文字列に変換
+
+        Parameters
+        ----------
+        result: dict
+            計測結果
+
+        Returns
+        -------
+        text: str
+            表示用の文字列
+        """
+        text = (
+            f"{result['wall_time'] * 1000:.1f}ms, "
+            f"{result['queries']}クエリ, "
+            f"{result['peak_memory'] / 1024 / 1024:.1f}MiB"
+        )
+
+        if "rows_per_second" in result:
+            text += f", {result['rows_per_second']:.0f}行/秒"
+        return text
+
+    def run_benchmarks(self, options):
+        """
+        販売情報を件数まで追加しながら、計測対象ごとに計測
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+
+        Returns
+        -------
+        results: dict
+            {件数: {計測対象名: 計測結果}}
+        """
+        User.objects.create_user(username="benchmark", password="benchmark")
+        results = {}
+
+        for size in sorted(options["sizes"]):
+            call_command(
+                "seed_sales",
+                fruits=0 if Fruit.objects.exists() else 20,
+                sales=max(size - Sales.objects.count(), 0),
+                seed=size,
+                stdout=io.StringIO(),
+            )
+            results[str(size)] = {}
+
+            for name, result in self.iter_results(options):
+                results[str(size)][name] = result
+                self.stdout.write(
+                    f"{size}件 {name}: {self.format_result(result)}"
+                )
+        return results
+
+    def compare(self, results, baseline, threshold):
+        """
+        計測結果をベースラインと比較し、劣化した項目を抽出
+            処理時間, メモリ使用量: threshold以上の増加率
+            exact_metrics(クエリ数など): 1件以上の増加
+
+        Parameters
+        ----------
+        results: dict
+            {件数: {計測対象名: 計測結果}}
+        baseline: dict
+            比較する計測結果(JSON)
+        threshold: float
+            劣化とみなす増加率
+
+        Returns
+        -------
+        regressions: list
+            劣化した項目の説明
+        """
+        regressions = []
+
+        for size, targets in results.items():
+            for name, result in targets.items():
+                base = baseline["results"].get(size, {}).get(name)
+
+                if base is None:
+                    continue
+
+                for metric in self.metrics:
+                    limit = base[metric]
+
+                    if metric not in self.exact_metrics:
+                        limit *= 1 + threshold
+
+                    if result[metric] > limit:
+                        regressions.append(
+                            f"{size}件 {name} {metric}: "
+                            f"{base[metric]} -> {result[metric]}"
+                        )
+        return regressions
+
+    @contextlib.contextmanager
+    def test_database(self):
+        """
+        一時ファイルのテスト用DBを作成し、終了後に削除
+        ※キャッシュはプロセス内のメモリ, CSVインポートジョブは即時実行にする
+        """
+        test_settings = connection.settings_dict["TEST"]
+        test_name = test_settings.get("NAME")
+        setup_test_environment()
+
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                }
+            },
+            IMPORT_JOB_RUNNER="eager",
+            MEDIA_ROOT=tmp_dir,
+        ):
+            if connection.vendor == "sqlite":
+                test_settings["NAME"] = os.path.join(tmp_dir, "db.sqlite3")
+
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True
+            )
+
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = test_name
+                teardown_test_environment()
+
+    def handle(self, *args, **options):
+        """
+        テスト用DBで計測し、結果の書き出し, ベースラインとの比較を実行
+        劣化した項目がある場合はエラーで終了する
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        with self.test_database():
+            results = self.run_benchmarks(options)
+
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "database_profile": settings.DATABASE_PROFILE,
+            },
+            "results": results,
+        }
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+
+            regressions = self.compare(results, baseline, options["threshold"])
+
+            if regressions:
+                raise CommandError(
+                    "ベースラインから劣化しました\n" + "\n".join(regressions)
+                )
+
+            self.stdout.write("ベースラインからの劣化はありません")
@@ -0,0 +1,274 @@
+"""
+管理コマンド定義ファイル
+
+- ダッシュボードのポーリングのASGI, WSGI比較ベンチマーク
+"""
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client
+
+from mgmt.management.commands import benchmark
+from mgmt.management.commands.benchmark_concurrency import percentile
+from mgmt.models import ImportJob
+
+
+class Command(benchmark.Command):
+    """
+    多数のポーリング(販売統計情報API, CSVインポートジョブの状態取得)を
+    ASGIとWSGIで処理した場合の待ち時間とスループットを計測するコマンドを定義
+    ※サーバーを起動せず、プロセス内でアプリケーションを直接呼び出す
+        ASGI: 1つのイベントループで全てのポーリングを同時に処理
+        WSGI: --workers個のワーカースレッドで処理(空きが無い場合は待つ)
+    """
+
+    help = (
+        "ダッシュボードのポーリングをASGIとWSGIで処理した場合の"
+        "待ち時間とスループットを計測します"
+    )
+
+    metrics = ("p95", "errors")
+    exact_metrics = ("errors",)
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--pollers",
+            default=50,
+            type=int,
+            help="同時にポーリングするクライアント数",
+        )
+        parser.add_argument(
+            "--polls",
+            default=20,
+            type=int,
+            help="クライアントごとのリクエスト数",
+        )
+        parser.add_argument(
+            "--workers",
+            default=4,
+            type=int,
+            help="WSGIのワーカースレッド数",
+        )
+
+    def get_headers(self, response, header_name):
+        """
+        次のポーリングで送る条件付きGETのヘッダーを取得
+
+        Parameters
+        ----------
+        response: HttpResponse
+            前回のレスポンス
+        header_name: str
+            If-None-Matchのヘッダー名
+            (Client: HTTP_IF_NONE_MATCH, AsyncClient: If-None-Match)
+
+        Returns
+        -------
+        headers: dict
+            If-None-Matchのヘッダー ※ETagが無い場合は空
+        """
+        if response.has_header("ETag"):
+            return {header_name: response["ETag"]}
+        return {}
+
+    def summarize(self, latencies, errors, wall_time):
+        """
+        待ち時間リストから計測結果を集計
+
+        Parameters
+        ----------
+        latencies: list
+            待ち時間(秒)のリスト
+        errors: int
+            エラー件数
+        wall_time: float
+            全てのポーリングの処理秒数
+
+        Returns
+        -------
+        result: dict
+            {p50, p95, max: 秒, throughput: 件/秒, errors: エラー件数}
+        """
+        return {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": percentile(latencies, 1),
+            "throughput": len(latencies) / wall_time if wall_time else 0,
+            "errors": errors,
+        }
+
+    def run_wsgi(self, options, path, session_cookie):
+        """
+        WSGIでポーリングを処理
+        ※ワーカースレッドの空き待ちも待ち時間に含める
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+        path: str
+            ポーリングするURLパス
+        session_cookie: str
+            ログイン済みのセッションID
+
+        Returns
+        -------
+        result: dict
+            計測結果
+        """
+        workers = threading.BoundedSemaphore(options["workers"])
+        latencies, errors = [], []
+
+        def poll():
+            client = Client()
+            client.cookies["sessionid"] = session_cookie
+            headers = {}
+
+            try:
+                for _ in range(options["polls"]):
+                    start = time.perf_counter()
+
+                    with workers:
+                        response = client.get(path, **headers)
+
+                    if response.status_code in (200, 304):
+                        latencies.append(time.perf_counter() - start)
+                        headers = self.get_headers(
+                            response, "HTTP_IF_NONE_MATCH"
+                        )
+                    else:
+                        errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=poll) for _ in range(options["pollers"])
+        ]
+        start = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        wall_time = time.perf_counter() - start
+        return self.summarize(latencies, len(errors), wall_time)
+
+    def run_asgi(self, options, path, session_cookie):
+        """
+        ASGIでポーリングを処理
+        ※ASGIではリクエストごとのスレッドでDBに接続するため、
+          CONN_MAX_AGE=0(リクエスト終了時に切断)で計測する
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+        path: str
+            ポーリングするURLパス
+        session_cookie: str
+            ログイン済みのセッションID
+
+        Returns
+        -------
+        result: dict
+            計測結果
+        """
+        latencies, errors = [], []
+
+        async def poll():
+            client = AsyncClient()
+            client.cookies["sessionid"] = session_cookie
+            headers = {}
+
+            for _ in range(options["polls"]):
+                start = time.perf_counter()
+                response = await client.get(path, **headers)
+
+                if response.status_code in (200, 304):
+                    latencies.append(time.perf_counter() - start)
+                    headers = self.get_headers(response, "If-None-Match")
+                else:
+                    errors.append(response.status_code)
+
+        async def main():
+            await asyncio.gather(*(poll() for _ in range(options["pollers"])))
+
+        # ASGIサーバーと同様に、DB接続を持たないスレッドでイベントループを動かす
+        thread = threading.Thread(target=asyncio.run, args=(main(),))
+        conn_max_age = connection.settings_dict["CONN_MAX_AGE"]
+        connection.settings_dict["CONN_MAX_AGE"] = 0
+        start = time.perf_counter()
+
+        try:
+            thread.start()
+            thread.join()
+        finally:
+            wall_time = time.perf_counter() - start
+            connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+        return self.summarize(latencies, len(errors), wall_time)
+
+    def iter_results(self, options):
+        """
+        ポーリング先ごとにWSGI, ASGIで計測
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+
+        Yields
+        ------
+        result: tuple
+            (計測対象名, 計測結果)
+        """
+        client = Client()
+        client.force_login(User.objects.get(username="benchmark"))
+        session_cookie = client.cookies["sessionid"].value
+        import_job = ImportJob.objects.create(
+            filename="benchmark.csv",
+            status=ImportJob.Status.RUNNING,
+        )
+        paths = {
+            "statistics_api": "/api/statistics/?granularity=day",
+            "import_job": f"/sales/import/{import_job.pk}/",
+        }
+
+        for name, path in paths.items():
+            yield f"{name}_wsgi", self.run_wsgi(options, path, session_cookie)
+            yield f"{name}_asgi", self.run_asgi(options, path, session_cookie)
+
+    def format_result(self, result):
+        """
+        計測結果を表示用の文字列に変換
+
+        Parameters
+        ----------
+        result: dict
+            計測結果
+
+        Returns
+        -------
+        text: str
+            表示用の文字列
+        """
+        return (
+            f"p50 {result['p50'] * 1000:.1f}ms, "
+            f"p95 {result['p95'] * 1000:.1f}ms, "
+            f"最大 {result['max'] * 1000:.1f}ms / "
+            f"{result['throughput']:.0f}件/秒 / "
+            f"エラー {result['errors']}件"
+        )
@@ -0,0 +1,255 @@
+"""
+管理コマンド定義ファイル
+
+- CSVインポート中の読み込み, 書き込みの同時実行ベンチマーク
+"""
+import datetime
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import Client
+
+from mgmt.forms import SalesCSVForm
+from mgmt.management.commands import benchmark
+from mgmt.models import Fruit, Sales
+
+
+def percentile(values, q):
+    """
+    値リストのパーセンタイルを取得
+
+    Parameters
+    ----------
+    values: list
+        値リスト
+    q: float
+        0から1の割合
+
+    Returns
+    -------
+    value: float
+        パーセンタイルの値 ※値が無い場合は0
+    """
+    if not values:
+        return 0
+
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class Command(benchmark.Command):
+    """
+    一括インポート中に販売情報一覧の表示, 販売情報の登録の待ち時間と
+    エラー件数を計測するコマンドを定義
+    ※DATABASE_PROFILEを切り替えて実行し、結果を比較する
+    """
+
+    help = (
+        "CSVインポート中の販売情報一覧の表示, 販売情報の登録の"
+        "待ち時間とエラー件数を計測します"
+    )
+
+    metrics = ("read_p95", "write_p95", "errors")
+    exact_metrics = ("errors",)
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--readers",
+            default=4,
+            type=int,
+            help="販売情報一覧を表示し続けるスレッド数",
+        )
+        parser.add_argument(
+            "--writers",
+            default=1,
+            type=int,
+            help="販売情報を登録し続けるスレッド数",
+        )
+        parser.add_argument(
+            "--idle-seconds",
+            default=1.0,
+            type=float,
+            help="インポートしない状態で計測する秒数",
+        )
+
+    def run_client(self, action, stop, latencies, errors):
+        """
+        停止するまで処理を繰り返し、待ち時間とエラー件数を記録
+        ※スレッドで実行し、終了時にスレッドのDB接続を閉じる
+
+        Parameters
+        ----------
+        action: callable
+            繰り返す処理(成功した場合はTrueを返す)
+        stop: Event
+            停止イベント
+        latencies: list
+            待ち時間(秒)を追加するリスト
+        errors: list
+            エラーを追加するリスト
+        """
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+
+                try:
+                    succeeded = action()
+                except DatabaseError as e:
+                    errors.append(str(e))
+                    continue
+
+                if succeeded:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors.append("unexpected response")
+        finally:
+            connection.close()
+
+    def run_concurrently(self, options, func):
+        """
+        読み込み, 書き込みのスレッドを動かしながら処理を実行
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+        func: callable
+            スレッドと同時に実行する処理 ※DBエラーはエラー件数に含める
+
+        Returns
+        -------
+        result: dict
+            {read_p50, read_p95, read_max, write_p95: 秒,
+             errors: エラー件数, wall_time: 処理の秒数}
+        """
+        user = User.objects.get(username="benchmark")
+        fruit = Fruit.objects.first()
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+
+        def read(client):
+            return lambda: client.get("/sales/").status_code == 200
+
+        def write():
+            Sales.objects.create(
+                fruit=fruit,
+                quantity=1,
+                total=fruit.price,
+                sale_date=datetime.datetime.now(datetime.timezone.utc),
+            )
+            return True
+
+        actions = []
+
+        for _ in range(options["readers"]):
+            client = Client()
+            client.force_login(user)
+            actions.append((read(client), reads))
+
+        actions += [(write, writes)] * options["writers"]
+        threads = [
+            threading.Thread(
+                target=self.run_client,
+                args=(action, stop, latencies, errors),
+            )
+            for action, latencies in actions
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+
+        try:
+            func()
+        except DatabaseError as e:
+            errors.append(str(e))
+        finally:
+            wall_time = time.perf_counter() - start
+            stop.set()
+
+            for thread in threads:
+                thread.join()
+
+        return {
+            "read_p50": percentile(reads, 0.5),
+            "read_p95": percentile(reads, 0.95),
+            "read_max": percentile(reads, 1),
+            "write_p95": percentile(writes, 0.95),
+            "errors": len(errors),
+            "wall_time": wall_time,
+        }
+
+    def iter_results(self, options):
+        """
+        インポートしない状態と、一括インポート中の状態で計測
+        ※インポートした販売情報は保存したままにする
+
+        Parameters
+        ----------
+        options: dict
+            コマンドオプション
+
+        Yields
+        ------
+        result: tuple
+            (計測対象名, 計測結果)
+        """
+        fruit_names = list(Fruit.objects.values_list("name", flat=True))
+        start = datetime.datetime(2000, 1, 1) + datetime.timedelta(
+            minutes=Sales.objects.count()
+        )
+        csv_content = "\n".join(
+            "{},1,100,{:%Y-%m-%d %H:%M}".format(
+                fruit_names[i % len(fruit_names)],
+                start + datetime.timedelta(minutes=i),
+            )
+            for i in range(options["import_rows"])
+        ).encode("utf-8")
+
+        def import_csv():
+            csv_data = SimpleUploadedFile("benchmark.csv", csv_content)
+            form = SalesCSVForm({}, {"csv": csv_data})
+
+            if form.is_valid():
+                form.save_csv(csv_data)
+
+        yield "idle", self.run_concurrently(
+            options, lambda: time.sleep(options["idle_seconds"])
+        )
+        yield "during_import", self.run_concurrently(options, import_csv)
+
+    def format_result(self, result):
+        """
+        計測結果を表示用の文字列に変換
+
+        Parameters
+        ----------
+        result: dict
+            計測結果
+
+        Returns
+        -------
+        text: str
+            表示用の文字列
+        """
+        return (
+            f"読み込み p50 {result['read_p50'] * 1000:.1f}ms, "
+            f"p95 {result['read_p95'] * 1000:.1f}ms, "
+            f"最大 {result['read_max'] * 1000:.1f}ms / "
+            f"書き込み p95 {result['write_p95'] * 1000:.1f}ms / "
+            f"エラー {result['errors']}件 / "
+            f"{result['wall_time']:.1f}秒"
+        )
@@ -0,0 +1,108 @@
+"""
+管理コマンド定義ファイル
+
+- CSVデータの行のフォーマット(バリデーション)のマイクロベンチマーク
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from mgmt.forms import SalesCSVRowValidator
+from mgmt.models import Fruit
+
+
+class Command(BaseCommand):
+    """
+    CSVデータの行の種類ごとに、1行あたりのフォーマット(バリデーション)の
+    処理時間を計測するコマンドを定義
+    ※DBは使わず、未保存のFruitで計測する
+    """
+
+    help = "CSVデータの行のフォーマット(バリデーション)の1行あたりの処理時間を計測します"
+
+    records = {
+        "valid": ["リンゴ", "3", "300", "2016-02-01 10:35"],
+        "unknown_fruit": ["メロン", "3", "300", "2016-02-01 10:35"],
+        "invalid_quantity": ["リンゴ", "TEST", "300", "2016-02-01 10:35"],
+        "invalid_sale_date": ["リンゴ", "3", "300", "2016/02/01 10:35"],
+    }
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        parser.add_argument(
+            "--rows",
+            default=100000,
+            type=int,
+            help="1回の計測でフォーマットする行数",
+        )
+        parser.add_argument(
+            "--repeat",
+            default=5,
+            type=int,
+            help="計測回数(中央値を記録)",
+        )
+
+    def measure(self, validator, record, rows, repeat):
+        """
+        同じ行をrows回フォーマットし、1行あたりの処理時間(中央値)を計測
+        ※エラーの行は例外の捕捉までを含める
+
+        Parameters
+        ----------
+        validator: SalesCSVRowValidator
+            CSVデータの行のフォーマット
+        record: list
+            CSVリーダーのデータ(1行)
+        rows: int
+            1回の計測でフォーマットする行数
+        repeat: int
+            計測回数
+
+        Returns
+        -------
+        seconds: float
+            1行あたりの処理時間(秒)
+        """
+        validate = validator.validate
+        wall_times = []
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+
+            for _ in range(rows):
+                try:
+                    validate(record)
+                except Exception:
+                    pass
+
+            wall_times.append((time.perf_counter() - start) / rows)
+        return statistics.median(wall_times)
+
+    def handle(self, *args, **options):
+        """
+        行の種類ごとに計測し、1行あたりの処理時間を表示
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        validator = SalesCSVRowValidator(
+            {"リンゴ": Fruit(pk=1, name="リンゴ", price=100)}
+        )
+
+        for name, record in self.records.items():
+            seconds = self.measure(
+                validator, record, options["rows"], options["repeat"]
+            )
+            self.stdout.write(f"{name}: {seconds * 1000000:.2f}µs/行")
@@ -0,0 +1,37 @@
+"""
+管理コマンド定義ファイル
+
+- 販売集計の再生成
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mgmt.cache import touch_sales_last_modified
+from mgmt.models import DailySalesSummary, MonthlySalesSummary
+
+
+class Command(BaseCommand):
+    """販売集計(日別, 月別)を全てのSalesから再生成するコマンドを定義"""
+
+    help = "販売集計(日別, 月別)を全てのSalesから再生成します"
+
+    def handle(self, *args, **options):
+        """
+        販売集計を再生成し、販売統計情報のキャッシュを無効化
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        with transaction.atomic():
+            for summary_model in (DailySalesSummary, MonthlySalesSummary):
+                summary_model.rebuild()
+                self.stdout.write(
+                    f"{summary_model.__name__}: "
+                    f"{summary_model.objects.count()}件"
+                )
+
+            touch_sales_last_modified()
@@ -0,0 +1,105 @@
+"""
+管理コマンド定義ファイル
+
+- SQLiteのレプリカの更新(プライマリの複製)
+"""
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from mgmt.cache import touch_sales_last_modified
+
+
+class Command(BaseCommand):
+    """
+    SQLiteのプライマリをバックアップAPIでレプリカのファイルに複製する
+    コマンドを定義
+    ※PostgreSQLなどはDBのレプリケーションで複製するため対象外
+    """
+
+    help = "SQLiteのプライマリをレプリカ(REPLICA_DATABASE_URL)に複製します"
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="複製する間隔(秒) ※指定しない場合は1回のみ複製",
+        )
+
+    def copy_database(self, target_path):
+        """
+        プライマリの内容をファイルに複製
+        ※バックアップAPIはコミット済みの一貫した内容を複製し、
+          複製中も他の接続の読み込みをブロックしない
+
+        Parameters
+        ----------
+        target_path: str
+            複製先のファイルパス
+        """
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(target_path)
+
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    def refresh(self, target_path):
+        """
+        レプリカを複製し、販売統計情報のキャッシュを無効化
+        (複製前のレプリカから集計したキャッシュを使わないようにする)
+
+        Parameters
+        ----------
+        target_path: str
+            レプリカのファイルパス
+        """
+        start = time.perf_counter()
+        self.copy_database(target_path)
+        touch_sales_last_modified()
+        self.stdout.write(
+            f"レプリカを更新しました: {target_path} "
+            f"({time.perf_counter() - start:.2f}秒)"
+        )
+
+    def handle(self, *args, **options):
+        """
+        レプリカを複製(intervalを指定した場合は間隔ごとに繰り返す)
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        alias = settings.REPLICA_DATABASE_ALIAS
+
+        if alias == DEFAULT_DB_ALIAS:
+            raise CommandError("REPLICA_DATABASE_URLが設定されていません")
+
+        if (
+            connections[DEFAULT_DB_ALIAS].vendor != "sqlite"
+            or connections[alias].vendor != "sqlite"
+        ):
+            raise CommandError("SQLiteのレプリカのみ更新できます")
+
+        target_path = connections[alias].settings_dict["NAME"]
+        self.refresh(target_path)
+
+        while options["interval"]:
+            time.sleep(options["interval"])
+            self.refresh(target_path)
@@ -0,0 +1,68 @@
+"""
+管理コマンド定義ファイル
+
+- CSVインポートジョブのワーカー
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mgmt.jobs import claim_next_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    """待機中のCSVインポートジョブをDBから取得して実行するコマンドを定義"""
+
+    help = "待機中のCSVインポートジョブをDBから取得して実行します"
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="待機中のジョブがなくなったら終了します",
+        )
+        parser.add_argument(
+            "--interval",
+            default=1.0,
+            type=float,
+            help="待機中のジョブがない場合のポーリング間隔(秒)",
+        )
+
+    def handle(self, *args, **options):
+        """
+        待機中のCSVインポートジョブを順に実行
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        while True:
+            close_old_connections()
+            import_job = claim_next_import_job()
+
+            if import_job is None:
+                if options["once"]:
+                    return
+
+                time.sleep(options["interval"])
+                continue
+
+            run_import_job(import_job)
+            self.stdout.write(
+                f"{import_job.filename}: {import_job.get_status_display()} "
+                f"({import_job.rows_processed}行, "
+                f"エラー{import_job.rows_failed}行, "
+                f"重複{import_job.rows_skipped}行)"
+            )
@@ -0,0 +1,206 @@
+"""
+管理コマンド定義ファイル
+
+- 検証用の果物, 販売情報の生成
+"""
+import datetime
+import itertools
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from mgmt.cache import touch_sales_last_modified
+from mgmt.models import Fruit, Sales, update_sales_summaries
+
+FRUIT_NAMES = [
+    "リンゴ",
+    "ミカン",
+    "バナナ",
+    "ブドウ",
+    "イチゴ",
+    "モモ",
+    "ナシ",
+    "カキ",
+    "キウイ",
+    "メロン",
+    "スイカ",
+    "レモン",
+    "マンゴー",
+    "サクランボ",
+    "ブルーベリー",
+    "パイナップル",
+]
+
+# 販売時刻の分布(営業時間の9時から21時, 昼と夕方が多い)
+HOUR_WEIGHTS = {
+    9: 2,
+    10: 4,
+    11: 6,
+    12: 10,
+    13: 8,
+    14: 5,
+    15: 5,
+    16: 6,
+    17: 9,
+    18: 10,
+    19: 8,
+    20: 4,
+    21: 2,
+}
+
+
+class Command(BaseCommand):
+    """検証用の果物, 販売情報を一括生成するコマンドを定義"""
+
+    help = "ベンチマーク用に果物と販売情報を一括生成します"
+
+    def add_arguments(self, parser):
+        """
+        コマンドオプションを定義
+
+        Parameters
+        ----------
+        parser: CommandParser
+            引数パーサー
+        """
+        parser.add_argument(
+            "--fruits",
+            default=20,
+            type=int,
+            help="追加する果物の件数(0の場合は登録済みの果物のみを使用)",
+        )
+        parser.add_argument(
+            "--sales",
+            default=10000,
+            type=int,
+            help="追加する販売情報の件数",
+        )
+        parser.add_argument(
+            "--days",
+            default=365,
+            type=int,
+            help="販売日時を分布させる当日までの日数",
+        )
+        parser.add_argument(
+            "--batch-size",
+            default=5000,
+            type=int,
+            help="一括保存の件数",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="乱数のシード(指定した場合は同じデータを生成)",
+        )
+
+    def create_fruits(self, rng, count):
+        """
+        果物を一括生成(単価は対数正規分布, 10円単位)
+
+        Parameters
+        ----------
+        rng: Random
+            乱数生成器
+        count: int
+            追加する果物の件数
+        """
+        offset = Fruit.objects.count()
+        fruits = []
+
+        for i in range(offset, offset + count):
+            name = FRUIT_NAMES[i % len(FRUIT_NAMES)]
+            suffix = i // len(FRUIT_NAMES)
+            price = round(rng.lognormvariate(5.5, 0.6), -1)
+            fruits.append(
+                Fruit(
+                    name=f"{name}{suffix + 1}" if suffix else name,
+                    price=min(max(int(price), 10), 5000),
+                )
+            )
+        Fruit.objects.bulk_create(fruits)
+
+    def iter_sales(self, rng, fruits, count, days):
+        """
+        販売情報を1件ずつ生成
+            果物: 人気順の重み(1/順位)で選択
+            個数: 1個が最も多い指数分布(上限20個)
+            販売日時: 過去days日間, 時刻はHOUR_WEIGHTSで選択
+
+        Parameters
+        ----------
+        rng: Random
+            乱数生成器
+        fruits: list
+            Fruitリスト
+        count: int
+            生成する販売情報の件数
+        days: int
+            販売日時を分布させる当日までの日数
+
+        Yields
+        ------
+        sales: Sales
+            Sales(未保存)
+        """
+        fruit_weights = list(
+            itertools.accumulate(
+                1 / rank for rank in range(1, len(fruits) + 1)
+            )
+        )
+        hours = list(HOUR_WEIGHTS)
+        hour_weights = list(itertools.accumulate(HOUR_WEIGHTS.values()))
+        today = timezone.localdate()
+
+        for _ in range(count):
+            fruit = rng.choices(fruits, cum_weights=fruit_weights)[0]
+            quantity = min(1 + int(rng.expovariate(0.7)), 20)
+            sale_date = datetime.datetime.combine(
+                today - datetime.timedelta(days=rng.randrange(days)),
+                datetime.time(
+                    rng.choices(hours, cum_weights=hour_weights)[0],
+                    rng.randrange(60),
+                ),
+            )
+            yield Sales(
+                fruit=fruit,
+                quantity=quantity,
+                total=fruit.price * quantity,
+                sale_date=timezone.make_aware(sale_date),
+            )
+
+    def handle(self, *args, **options):
+        """
+        果物, 販売情報をbatch_size件ずつDBに一括保存
+        ※販売集計も同一トランザクションで更新
+
+        Parameters
+        ----------
+        args: tuple
+            位置引数
+        options: dict
+            コマンドオプション
+        """
+        rng = random.Random(options["seed"])
+        self.create_fruits(rng, options["fruits"])
+        fruits = list(Fruit.objects.filter(is_deleted=False).order_by("pk"))
+
+        if not fruits and options["sales"] > 0:
+            raise CommandError("販売情報を生成する果物が登録されていません")
+
+        sales_iter = self.iter_sales(
+            rng, fruits, options["sales"], options["days"]
+        )
+
+        while sales_list := list(
+            itertools.islice(sales_iter, options["batch_size"])
+        ):
+            with transaction.atomic():
+                Sales.objects.bulk_create(sales_list)
+                update_sales_summaries(sales_list)
+                touch_sales_last_modified()
+
+        self.stdout.write(
+            f"果物: {len(fruits)}件, 販売情報: {Sales.objects.count()}件"
+        )
@@ -0,0 +1,263 @@
+"""
+メトリクス定義ファイル
+
+- カウンター, ヒストグラム(Prometheusのテキスト形式で出力)
+- リクエスト, CSVインポートのメトリクス
+"""
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REGISTRY = []
+
+
+def format_labels(label_names, label_values, extra=""):
+    """
+    ラベルをPrometheusのテキスト形式に変換
+
+    Parameters
+    ----------
+    label_names: tuple
+        ラベル名
+    label_values: tuple
+        ラベルの値
+    extra: str
+        追加するラベル(ex: le="0.1")
+
+    Returns
+    -------
+    labels: str
+        {name="value",...}形式の文字列 ※ラベルが無い場合は空文字
+    """
+    labels = [
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in zip(label_names, label_values)
+    ]
+
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Metric:
+    """メトリクスの共通定義(名前, 説明, ラベルごとの値)"""
+
+    type = ""
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        メトリクスを生成し、レジストリに登録
+
+        Parameters
+        ----------
+        name: str
+            メトリクス名
+        documentation: str
+            メトリクスの説明
+        label_names: tuple
+            ラベル名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self):
+        """
+        Prometheusのテキスト形式に変換
+
+        Returns
+        -------
+        lines: list
+            HELP, TYPE, 値の行リスト
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+        with self.lock:
+            values = sorted(self.values.items())
+
+        for label_values, value in values:
+            lines.extend(self.render_value(label_values, value))
+        return lines
+
+    def clear(self):
+        """値を全て削除"""
+        with self.lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    """増加のみのカウンターを定義"""
+
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        """
+        カウンターを増加
+
+        Parameters
+        ----------
+        label_values: tuple
+            ラベルの値
+        amount: float
+            増加量
+        """
+        with self.lock:
+            value = self.values.get(label_values, 0)
+            self.values[label_values] = value + amount
+
+    def render_value(self, label_values, value):
+        """
+        ラベルごとの値をPrometheusのテキスト形式に変換
+
+        Returns
+        -------
+        lines: list
+            値の行リスト
+        """
+        labels = format_labels(self.label_names, label_values)
+        return [f"{self.name}{labels} {value}"]
+
+
+class Histogram(Metric):
+    """値の分布(バケットごとの累積件数, 合計, 件数)を定義"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=()):
+        """
+        ヒストグラムを生成し、レジストリに登録
+
+        Parameters
+        ----------
+        name: str
+            メトリクス名
+        documentation: str
+            メトリクスの説明
+        label_names: tuple
+            ラベル名
+        buckets: tuple
+            バケットの上限(昇順)
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        """
+        値を記録(該当するバケットのみ加算し、出力時に累積する)
+
+        Parameters
+        ----------
+        value: float
+            記録する値
+        label_values: tuple
+            ラベルの値
+        """
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self.lock:
+            counts = self.values.get(label_values)
+
+            if counts is None:
+                counts = self.values[label_values] = [0] * (
+                    len(self.buckets) + 3
+                )
+
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render_value(self, label_values, value):
+        """
+        ラベルごとの値をPrometheusのテキスト形式に変換
+
+        Returns
+        -------
+        lines: list
+            バケット, 合計, 件数の行リスト
+        """
+        lines = []
+        cumulative = 0
+
+        for bucket, count in zip(self.buckets + ("+Inf",), value):
+            cumulative += count
+            labels = format_labels(
+                self.label_names, label_values, f'le="{bucket}"'
+            )
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {value[-2]}")
+        lines.append(f"{self.name}_count{labels} {value[-1]}")
+        return lines
+
+
+def render_metrics():
+    """
+    登録済みの全てのメトリクスをPrometheusのテキスト形式に変換
+
+    Returns
+    -------
+    text: str
+        Prometheusのテキスト形式の文字列
+    """
+    return "".join(
+        line + "\n" for metric in REGISTRY for line in metric.render()
+    )
+
+
+http_requests_total = Counter(
+    "mgmt_http_requests_total",
+    "Total HTTP requests.",
+    ("view", "method", "status"),
+)
+http_request_duration_seconds = Histogram(
+    "mgmt_http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ("view", "method"),
+    LATENCY_BUCKETS,
+)
+http_db_queries = Histogram(
+    "mgmt_http_db_queries",
+    "DB queries executed per HTTP request.",
+    ("view", "method"),
+    QUERY_COUNT_BUCKETS,
+)
+http_db_duration_seconds = Histogram(
+    "mgmt_http_db_duration_seconds",
+    "DB time per HTTP request in seconds.",
+    ("view", "method"),
+    LATENCY_BUCKETS,
+)
+http_response_size_bytes = Histogram(
+    "mgmt_http_response_size_bytes",
+    "HTTP response body size in bytes (non-streaming responses).",
+    ("view", "method"),
+    SIZE_BUCKETS,
+)
+csv_rows_imported_total = Counter(
+    "mgmt_csv_rows_imported_total",
+    "CSV rows saved as sales.",
+)
+csv_rows_failed_total = Counter(
+    "mgmt_csv_rows_failed_total",
+    "CSV rows rejected by validation.",
+)
+csv_import_duration_seconds = Counter(
+    "mgmt_csv_import_duration_seconds_total",
+    "Time spent importing CSV data in seconds.",
+)
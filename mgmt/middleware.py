@@ -0,0 +1,393 @@
+"""
+ミドルウェア定義ファイル
+
+- リクエストのメトリクス計測
+- 自分の書き込み直後の読み込みのプライマリへの固定
+"""
+import asyncio
+import contextvars
+import time
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import FileResponse
+
+from mgmt import metrics
+from mgmt.routers import replica_state
+
+# リクエストごとの[クエリ数, DB処理時間(秒)]
+# ※非同期ビューのクエリはsync_to_asyncのスレッドで実行されるため、
+#   スレッドごとのDB接続ではなくコンテキスト変数で集計する
+db_stats = contextvars.ContextVar("db_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    リクエスト処理中のクエリ数, DB処理時間を記録するexecute_wrapper
+
+    Parameters
+    ----------
+    execute: callable
+        クエリを実行する関数
+    sql: str
+        SQL
+    params: list
+        SQLのパラメータ
+    many: bool
+        executemanyの場合はTrue
+    context: dict
+        接続, カーソル
+
+    Returns
+    -------
+    result: object
+        クエリの実行結果
+    """
+    stats = db_stats.get()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    ビューごとの処理時間, クエリ数, DB処理時間, レスポンスサイズを計測する
+    ミドルウェアを定義(同期, 非同期のどちらのビューでも動作)
+    ※クエリはDB接続時に登録するrecord_queryで計測する
+    ※ストリーミングレスポンスは本文の生成がミドルウェアの後のため、
+      レスポンスサイズとその間のクエリは計測しない
+    ※methodsにないHTTPメソッドはラベルを"other"にまとめる
+      (任意のメソッドで時系列が増え続けないように)
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    methods = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+    def __init__(self, get_response):
+        """
+        ミドルウェアを初期化
+
+        Parameters
+        ----------
+        get_response: callable
+            次のミドルウェア(ビュー)
+        """
+        self.get_response = get_response
+
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        リクエストを処理し、メトリクスを記録
+        ※ASGIの場合はコルーチンを返す
+
+        Parameters
+        ----------
+        request: HttpRequest
+            リクエスト
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        token = db_stats.set([0, 0.0])
+        start = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = db_stats.get()
+            db_stats.reset(token)
+
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        """
+        リクエストを非同期で処理し、メトリクスを記録
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            リクエスト
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        token = db_stats.set([0, 0.0])
+        start = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = db_stats.get()
+            db_stats.reset(token)
+
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def record(self, request, response, duration, stats):
+        """
+        リクエストのメトリクスを記録
+
+        Parameters
+        ----------
+        request: HttpRequest
+            リクエスト
+        response: HttpResponse
+            レスポンス
+        duration: float
+            処理時間(秒)
+        stats: list
+            [クエリ数, DB処理時間(秒)]
+        """
+        resolver_match = request.resolver_match
+        view = resolver_match.view_name if resolver_match else "unmatched"
+        method = request.method if request.method in self.methods else "other"
+        labels = (view, method)
+
+        metrics.http_requests_total.inc(*labels, response.status_code)
+        metrics.http_request_duration_seconds.observe(duration, *labels)
+        metrics.http_db_queries.observe(stats[0], *labels)
+        metrics.http_db_duration_seconds.observe(stats[1], *labels)
+
+        if not response.streaming:
+            metrics.http_response_size_bytes.observe(
+                len(response.content), *labels
+            )
+
+
+class ReplicaStateContent:
+    """
+    ストリーミングレスポンスの内容を包み、レスポンスのclose時に
+    リクエストのレプリカの利用状態を元に戻すイテレーターを定義
+    ※StreamingHttpResponseは内容のclose()をレスポンスのclose時に呼ぶ
+    ※一度も反復せずにcloseした場合も戻すため、ジェネレーターは使わない
+    """
+
+    def __init__(self, streaming_content):
+        """
+        イテレーターを初期化
+
+        Parameters
+        ----------
+        streaming_content: Iterator
+            ストリーミングレスポンスの内容
+        """
+        self.streaming_content = streaming_content
+
+    def __iter__(self):
+        """
+        イテレーターを取得
+
+        Returns
+        -------
+        iterator: ReplicaStateContent
+            自身
+        """
+        return self
+
+    def __next__(self):
+        """
+        内容の次の塊を取得
+
+        Returns
+        -------
+        part: bytes
+            内容の塊
+        """
+        return next(self.streaming_content)
+
+    def close(self):
+        """
+        リクエストのレプリカの利用状態を元に戻す
+        ※ASGIのcloseはコンテキストを複製したスレッドで実行され、tokenで
+          元に戻せないため、リクエスト外の状態(None)を設定する
+        """
+        replica_state.set(None)
+
+
+class ReplicaPinMiddleware:
+    """
+    販売情報, 果物を書き込んだユーザーの以降のリクエストの読み込みを
+    REPLICA_PIN_SECONDSの間プライマリに固定するミドルウェアを定義
+    (レプリカの反映遅れで自分の書き込みが見えなくなるのを防ぐ)
+    ※GET, HEAD, OPTIONS以外のリクエストは全てプライマリから読み込む
+    ※レプリカを使わない場合は何もしない
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    cookie_name = "replica_pin"
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        """
+        ミドルウェアを初期化
+
+        Parameters
+        ----------
+        get_response: callable
+            次のミドルウェア(ビュー)
+        """
+        self.get_response = get_response
+
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        リクエストのレプリカの利用状態を設定して処理
+        ※ASGIの場合はコルーチンを返す
+
+        Parameters
+        ----------
+        request: HttpRequest
+            リクエスト
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        if settings.REPLICA_DATABASE_ALIAS == DEFAULT_DB_ALIAS:
+            return self.get_response(request)
+
+        state = self.get_state(request)
+        token = replica_state.set(state)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            replica_state.reset(token)
+            raise
+
+        return self.finish(response, state, token)
+
+    async def __acall__(self, request):
+        """
+        リクエストのレプリカの利用状態を設定して非同期で処理
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            リクエスト
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        if settings.REPLICA_DATABASE_ALIAS == DEFAULT_DB_ALIAS:
+            return await self.get_response(request)
+
+        state = self.get_state(request)
+        token = replica_state.set(state)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            replica_state.reset(token)
+            raise
+
+        return self.finish(response, state, token)
+
+    def get_state(self, request):
+        """
+        リクエストのレプリカの利用状態を生成
+
+        Parameters
+        ----------
+        request: HttpRequest
+            リクエスト
+
+        Returns
+        -------
+        state: dict
+            {use_primary: プライマリから読み込む場合はTrue, written: False}
+        """
+        return {
+            "use_primary": request.method not in self.safe_methods
+            or self.cookie_name in request.COOKIES,
+            "written": False,
+        }
+
+    def finish(self, response, state, token):
+        """
+        リクエストのレプリカの利用状態を元に戻し、固定用のCookieを設定
+        ※ストリーミングレスポンス(CSVエクスポートなど)は、返した後に内容を
+          生成する(遅延評価のクエリを実行する)ため、内容を
+          ReplicaStateContentで包み、レスポンスのclose時まで状態を残す
+        ※FileResponseはファイルを送るだけでクエリを実行しないため、
+          wsgi.file_wrapperを使えるよう内容を包まずに元に戻す
+
+        Parameters
+        ----------
+        response: HttpResponse
+            レスポンス
+        state: dict
+            リクエストのレプリカの利用状態
+        token: Token
+            リクエストのレプリカの利用状態を設定したトークン
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = ReplicaStateContent(
+                response.streaming_content
+            )
+        else:
+            replica_state.reset(token)
+
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        """
+        書き込んだ場合は、以降のリクエストをプライマリに固定するCookieを設定
+
+        Parameters
+        ----------
+        response: HttpResponse
+            レスポンス
+        state: dict
+            リクエストのレプリカの利用状態
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        if state["written"]:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
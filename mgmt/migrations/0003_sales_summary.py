@@ -0,0 +1,138 @@
+# Generated by Django 4.1.6 on 2026-10-17 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.utils import timezone
+
+
+def build_sales_summaries(apps, schema_editor):
+    """既存のSalesから日別, 月別の販売集計を生成"""
+    Sales = apps.get_model("mgmt", "Sales")
+
+    for model_name, trunc in (
+        ("DailySalesSummary", TruncDay),
+        ("MonthlySalesSummary", TruncMonth),
+    ):
+        summary_model = apps.get_model("mgmt", model_name)
+        rows = (
+            Sales.objects.annotate(period_datetime=trunc("sale_date"))
+            .values("fruit_id", "period_datetime")
+            .annotate(
+                sum_total=Sum("total"),
+                sum_quantity=Sum("quantity"),
+                sales_count=Count("id"),
+            )
+            .order_by()
+        )
+        summary_model.objects.bulk_create(
+            [
+                summary_model(
+                    fruit_id=row["fruit_id"],
+                    period=timezone.localtime(row["period_datetime"]).date(),
+                    total=row["sum_total"],
+                    quantity=row["sum_quantity"],
+                    count=row["sales_count"],
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mgmt", "0002_sales"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlySalesSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total",
+                    models.BigIntegerField(default=0, verbose_name="合計金額"),
+                ),
+                (
+                    "quantity",
+                    models.BigIntegerField(default=0, verbose_name="個数"),
+                ),
+                (
+                    "count",
+                    models.BigIntegerField(default=0, verbose_name="件数"),
+                ),
+                ("period", models.DateField(verbose_name="販売月(月初)")),
+                (
+                    "fruit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="mgmt.fruit",
+                        verbose_name="果物",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailySalesSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total",
+                    models.BigIntegerField(default=0, verbose_name="合計金額"),
+                ),
+                (
+                    "quantity",
+                    models.BigIntegerField(default=0, verbose_name="個数"),
+                ),
+                (
+                    "count",
+                    models.BigIntegerField(default=0, verbose_name="件数"),
+                ),
+                ("period", models.DateField(verbose_name="販売日")),
+                (
+                    "fruit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="mgmt.fruit",
+                        verbose_name="果物",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="monthlysalessummary",
+            constraint=models.UniqueConstraint(
+                fields=("fruit", "period"),
+                name="monthly_sales_summary_fruit_period_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailysalessummary",
+            constraint=models.UniqueConstraint(
+                fields=("fruit", "period"),
+                name="daily_sales_summary_fruit_period_unique",
+            ),
+        ),
+        migrations.RunPython(
+            build_sales_summaries,
+            migrations.RunPython.noop,
+        ),
+    ]
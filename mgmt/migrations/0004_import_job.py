@@ -0,0 +1,90 @@
+# Generated by Django 4.1.6 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mgmt", "0003_sales_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "csv_file",
+                    models.FileField(
+                        blank=True,
+                        upload_to="imports/",
+                        verbose_name="CSVファイル",
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        max_length=255, verbose_name="ファイル名"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待機中"),
+                            ("running", "処理中"),
+                            ("done", "完了"),
+                            ("failed", "失敗"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="状態",
+                    ),
+                ),
+                (
+                    "rows_processed",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="処理行数"
+                    ),
+                ),
+                (
+                    "rows_failed",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="エラー行数"
+                    ),
+                ),
+                (
+                    "error_messages",
+                    models.TextField(
+                        blank=True, verbose_name="エラーメッセージ"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="登録日時"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="開始日時"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="終了日時"
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.1.6 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mgmt", "0004_import_job"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="fruit",
+            name="name",
+            field=models.CharField(
+                db_index=True, max_length=20, verbose_name="名前"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailysalessummary",
+            index=models.Index(
+                fields=["period"], name="daily_summary_period_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fruit",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["-updated_at"],
+                name="fruit_active_updated_at_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="monthlysalessummary",
+            index=models.Index(
+                fields=["period"], name="monthly_summary_period_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sales",
+            index=models.Index(
+                fields=["-sale_date", "-id"],
+                name="sales_sale_date_id_desc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sales",
+            index=models.Index(
+                fields=["fruit", "sale_date"], name="sales_fruit_sale_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.1.6 on 2026-10-17 17:50
+
+import datetime
+import hashlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def get_import_hash(sales):
+    """
+    CSVインポートの重複判定用ハッシュを生成
+    ※mgmt.models.get_import_hashの0006時点の複製(マイグレーションは固定)
+    """
+    sale_date = sales.sale_date.astimezone(datetime.timezone.utc)
+    key = ",".join(
+        [
+            str(sales.fruit_id),
+            str(sales.quantity),
+            str(sales.total),
+            sale_date.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+        ]
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def fill_import_hashes(apps, schema_editor):
+    """
+    CSVインポートした既存のSalesに重複判定用ハッシュを設定
+    ※インポートの記録はないため、CSVデータの販売日時の形式(分単位)に合う
+      秒以下が0の行をインポートした行とし、それ以外(画面から登録した行)はNULLのまま
+    ※pk順にBATCH_SIZE件ずつ処理し、重複する行は最初の1件のみに設定
+      (前のバッチは保存済みのため、設定済みのハッシュとの照合で検出される)
+    """
+    Sales = apps.get_model("mgmt", "Sales")
+    last_pk = 0
+
+    while sales_list := list(
+        Sales.objects.filter(pk__gt=last_pk).order_by("pk")[:BATCH_SIZE]
+    ):
+        last_pk = sales_list[-1].pk
+        imported_sales = {}
+
+        for sales in sales_list:
+            if sales.sale_date.second or sales.sale_date.microsecond:
+                continue
+
+            imported_sales.setdefault(get_import_hash(sales), sales)
+
+        existing_hashes = set(
+            Sales.objects.filter(import_hash__in=imported_sales).values_list(
+                "import_hash", flat=True
+            )
+        )
+        update_list = []
+
+        for import_hash, sales in imported_sales.items():
+            if import_hash not in existing_hashes:
+                sales.import_hash = import_hash
+                update_list.append(sales)
+
+        Sales.objects.bulk_update(update_list, ["import_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mgmt", "0005_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="rows_skipped",
+            field=models.PositiveBigIntegerField(
+                default=0, verbose_name="重複行数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sales",
+            name="import_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=32,
+                null=True,
+                unique=True,
+                verbose_name="インポート重複判定用ハッシュ",
+            ),
+        ),
+        migrations.RunPython(
+            fill_import_hashes,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.6 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mgmt", "0006_import_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="error_counts",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="エラーの種類ごとの行数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="error_report",
+            field=models.FileField(
+                blank=True, upload_to="import_errors/", verbose_name="エラーレポート"
+            ),
+        ),
+    ]
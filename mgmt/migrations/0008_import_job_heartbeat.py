@@ -0,0 +1,20 @@
+# Generated by Django 4.1.6 on 2026-10-17 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mgmt", "0007_import_error_report"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="最終応答日時"
+            ),
+        ),
+    ]
@@ -3,8 +3,18 @@
 
 - Fruitモデル
 - Salesモデル
+- 日別販売集計モデル
+- 月別販売集計モデル
+- CSVインポートジョブモデル
+- キャッシュした認証ユーザーのプロキシモデル
 """
-from django.db import models
+import datetime
+import hashlib
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth
 from django.utils import timezone
 
 
@@ -12,6 +22,7 @@ class Fruit(models.Model):
     """Fruitモデルを定義"""
 
     name = models.CharField(
+        db_index=True,
         max_length=20,
         verbose_name="名前",
     )
@@ -31,6 +42,15 @@ class Fruit(models.Model):
         verbose_name="削除",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                condition=Q(is_deleted=False),
+                fields=["-updated_at"],
+                name="fruit_active_updated_at_idx",
+            ),
+        ]
+
     def __str__(self):
         """
         管理サイトのレコードを判別するための名前を定義
@@ -63,6 +83,26 @@ class Sales(models.Model):
         default=timezone.now,
         verbose_name="販売日時",
     )
+    import_hash = models.CharField(
+        blank=True,
+        editable=False,
+        max_length=32,
+        null=True,
+        unique=True,
+        verbose_name="インポート重複判定用ハッシュ",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-sale_date", "-id"],
+                name="sales_sale_date_id_desc_idx",
+            ),
+            models.Index(
+                fields=["fruit", "sale_date"],
+                name="sales_fruit_sale_date_idx",
+            ),
+        ]
 
     def __str__(self):
         """
@@ -74,3 +114,372 @@ class Sales(models.Model):
             管理サイトでレコードを判別するための名前
         """
         return timezone.localtime(self.sale_date).strftime("%Y-%m-%d %H:%M")
+
+    def save(self, *args, **kwargs):
+        """
+        保存と同一トランザクションで販売集計を更新
+        編集の場合は、編集前の値を集計から差し引いてから加算する
+        """
+        with transaction.atomic():
+            if self.pk is not None:
+                previous_sales = (
+                    Sales.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .first()
+                )
+
+                if previous_sales is not None:
+                    update_sales_summaries([previous_sales], sign=-1)
+
+            super().save(*args, **kwargs)
+            update_sales_summaries([self])
+
+
+def get_import_hash(sales):
+    """
+    CSVインポートの重複判定用に(果物, 個数, 合計金額, 販売日時)のハッシュを生成
+
+    Parameters
+    ----------
+    sales: Sales
+        Sales ※同じ属性(fruit_id, quantity, total, sale_date)を持つ
+        SalesRowも可
+
+    Returns
+    -------
+    import_hash: str
+        blake2b(16バイト)の16進文字列
+    """
+    sale_date = sales.sale_date.astimezone(datetime.timezone.utc)
+    key = ",".join(
+        [
+            str(sales.fruit_id),
+            str(sales.quantity),
+            str(sales.total),
+            sale_date.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+        ]
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+class SalesSummary(models.Model):
+    """
+    販売集計モデルの共通定義(果物, 期間ごとの合計)
+    集計期間はサブクラスのクラス属性で定義する
+        trunc: Salesの販売日時を集計期間に切り捨てるDB関数
+        get_period: 販売日(TIME_ZONE基準)から集計期間(date)を取得する関数
+    """
+
+    fruit = models.ForeignKey(
+        Fruit,
+        on_delete=models.CASCADE,
+        verbose_name="果物",
+    )
+    total = models.BigIntegerField(
+        default=0,
+        verbose_name="合計金額",
+    )
+    quantity = models.BigIntegerField(
+        default=0,
+        verbose_name="個数",
+    )
+    count = models.BigIntegerField(
+        default=0,
+        verbose_name="件数",
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        集計期間ごとの増減分を加算
+        件数が0になった集計は削除する
+
+        Parameters
+        ----------
+        deltas: dict
+            {(果物ID, 集計期間): (合計金額, 個数, 件数)}の増減分
+        """
+        for (fruit_id, period), (total, quantity, count) in deltas.items():
+            summary = cls.objects.filter(fruit_id=fruit_id, period=period)
+            updated = summary.update(
+                total=F("total") + total,
+                quantity=F("quantity") + quantity,
+                count=F("count") + count,
+            )
+
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            fruit_id=fruit_id,
+                            period=period,
+                            total=total,
+                            quantity=quantity,
+                            count=count,
+                        )
+                except IntegrityError:
+                    summary.update(
+                        total=F("total") + total,
+                        quantity=F("quantity") + quantity,
+                        count=F("count") + count,
+                    )
+
+            if count < 0:
+                summary.filter(count__lte=0).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        全てのSalesから販売集計を再生成
+        ※呼び出し側のトランザクション内で実行すること
+        """
+        cls.objects.all().delete()
+        rows = (
+            Sales.objects.annotate(period_datetime=cls.trunc("sale_date"))
+            .values("fruit_id", "period_datetime")
+            .annotate(
+                sum_total=Sum("total"),
+                sum_quantity=Sum("quantity"),
+                sales_count=Count("id"),
+            )
+            .order_by()
+        )
+        cls.objects.bulk_create(
+            [
+                cls(
+                    fruit_id=row["fruit_id"],
+                    period=timezone.localtime(row["period_datetime"]).date(),
+                    total=row["sum_total"],
+                    quantity=row["sum_quantity"],
+                    count=row["sales_count"],
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class DailySalesSummary(SalesSummary):
+    """日別販売集計モデルを定義"""
+
+    trunc = TruncDay
+    get_period = staticmethod(lambda local_date: local_date)
+
+    period = models.DateField(
+        verbose_name="販売日",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fruit", "period"],
+                name="daily_sales_summary_fruit_period_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period"],
+                name="daily_summary_period_idx",
+            ),
+        ]
+
+
+class MonthlySalesSummary(SalesSummary):
+    """月別販売集計モデルを定義"""
+
+    trunc = TruncMonth
+    get_period = staticmethod(lambda local_date: local_date.replace(day=1))
+
+    period = models.DateField(
+        verbose_name="販売月(月初)",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fruit", "period"],
+                name="monthly_sales_summary_fruit_period_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period"],
+                name="monthly_summary_period_idx",
+            ),
+        ]
+
+
+def update_sales_summaries(sales_list, sign=1):
+    """
+    Salesの増減分を日別, 月別の販売集計に反映
+    ※呼び出し側のトランザクション内で実行すること
+
+    Parameters
+    ----------
+    sales_list: iterable
+        Salesリスト ※同じ属性を持つSalesRowのリストも可
+    sign: int
+        1: 加算(登録), -1: 減算(削除)
+    """
+    local_deltas = {}
+
+    for sales in sales_list:
+        key = (sales.fruit_id, timezone.localdate(sales.sale_date))
+        total, quantity, count = local_deltas.get(key, (0, 0, 0))
+        local_deltas[key] = (
+            total + sign * sales.total,
+            quantity + sign * sales.quantity,
+            count + sign,
+        )
+
+    for summary_model in (DailySalesSummary, MonthlySalesSummary):
+        deltas = {}
+
+        for (fruit_id, local_date), values in local_deltas.items():
+            key = (fruit_id, summary_model.get_period(local_date))
+            deltas[key] = tuple(
+                a + b for a, b in zip(deltas.get(key, (0, 0, 0)), values)
+            )
+        summary_model.apply_deltas(deltas)
+
+
+class ImportJob(models.Model):
+    """CSVインポートジョブモデルを定義"""
+
+    class Status(models.TextChoices):
+        """ジョブの状態"""
+
+        PENDING = "pending", "待機中"
+        RUNNING = "running", "処理中"
+        DONE = "done", "完了"
+        FAILED = "failed", "失敗"
+
+    csv_file = models.FileField(
+        blank=True,
+        upload_to="imports/",
+        verbose_name="CSVファイル",
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name="ファイル名",
+    )
+    status = models.CharField(
+        choices=Status.choices,
+        default=Status.PENDING,
+        max_length=10,
+        verbose_name="状態",
+    )
+    rows_processed = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="処理行数",
+    )
+    rows_failed = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="エラー行数",
+    )
+    rows_skipped = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="重複行数",
+    )
+    error_messages = models.TextField(
+        blank=True,
+        verbose_name="エラーメッセージ",
+    )
+    error_counts = models.JSONField(
+        blank=True,
+        default=dict,
+        verbose_name="エラーの種類ごとの行数",
+    )
+    error_report = models.FileField(
+        blank=True,
+        upload_to="import_errors/",
+        verbose_name="エラーレポート",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="登録日時",
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="開始日時",
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="終了日時",
+    )
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="最終応答日時",
+    )
+
+    def __str__(self):
+        """
+        管理サイトのレコードを判別するための名前を定義
+
+        Returns
+        -------
+        record_name: str
+            管理サイトでレコードを判別するための名前
+        """
+        return self.filename
+
+    @property
+    def is_active(self):
+        """
+        ジョブが待機中または処理中か
+
+        Returns
+        -------
+        is_active: bool
+            待機中または処理中の場合はTrue
+        """
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
+
+    @property
+    def throughput(self):
+        """
+        処理速度(行/秒)を取得
+
+        Returns
+        -------
+        throughput: float
+            処理速度(行/秒) ※未開始の場合は0
+        """
+        if self.started_at is None:
+            return 0
+
+        finished_at = self.finished_at or timezone.now()
+        elapsed_seconds = (finished_at - self.started_at).total_seconds()
+        return round(self.rows_processed / max(elapsed_seconds, 0.001), 1)
+
+
+class CachedUser(User):
+    """
+    キャッシュから復元した認証ユーザーのプロキシモデルを定義
+    ※パスワードハッシュはキャッシュせず遅延読み込みとし、セッションの検証には
+      キャッシュしたセッション認証ハッシュを使う(backends/auth.py)
+    """
+
+    class Meta:
+        proxy = True
+
+    def get_session_auth_hash(self):
+        """
+        セッション認証ハッシュを取得
+        パスワードハッシュが未読み込みの場合は、キャッシュした値を返す
+
+        Returns
+        -------
+        session_auth_hash: str
+            セッション認証ハッシュ
+        """
+        if "password" in self.get_deferred_fields():
+            return self.session_auth_hash
+
+        return super().get_session_auth_hash()
@@ -0,0 +1,105 @@
+"""
+DBルーター定義ファイル
+
+- 販売情報, 販売集計の読み込みのレプリカへの振り分け
+- 自分の書き込み直後の読み込みのプライマリへの固定
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# リクエストごとのレプリカの利用状態
+# {use_primary: プライマリから読み込む場合はTrue, written: 書き込んだ場合はTrue}
+# ※リクエスト外(管理コマンド, CSVインポートジョブ)はNoneで、全てプライマリを使う
+replica_state = contextvars.ContextVar("replica_state", default=None)
+
+
+class ReplicaRouter:
+    """
+    販売情報一覧, 販売統計情報, CSVエクスポートの読み込みをレプリカに
+    振り分けるDBルーターを定義
+    ※書き込みは常にプライマリ(default)
+    ※REPLICA_DATABASE_ALIASがdefaultの場合は全てプライマリ
+    """
+
+    replica_models = {
+        "mgmt.fruit",
+        "mgmt.sales",
+        "mgmt.dailysalessummary",
+        "mgmt.monthlysalessummary",
+    }
+
+    def db_for_read(self, model, **hints):
+        """
+        読み込みのDBを選択
+            レプリカ: リクエスト中の販売情報, 販売集計, 果物の読み込み
+            プライマリ: 上記以外, 書き込み後, 書き込み直後のリクエスト
+
+        Parameters
+        ----------
+        model: type
+            モデル
+
+        Returns
+        -------
+        alias: str
+            DBのエイリアス ※Noneの場合は他のルーター, 既定値に任せる
+        """
+        state = replica_state.get()
+
+        if (
+            state is None
+            or state["use_primary"]
+            or state["written"]
+            or model._meta.label_lower not in self.replica_models
+        ):
+            return DEFAULT_DB_ALIAS
+        return settings.REPLICA_DATABASE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        """
+        書き込みのDB(プライマリ)を選択し、書き込んだことを記録
+
+        Parameters
+        ----------
+        model: type
+            モデル
+
+        Returns
+        -------
+        alias: str
+            DBのエイリアス
+        """
+        state = replica_state.get()
+
+        if (
+            state is not None
+            and model._meta.label_lower in self.replica_models
+        ):
+            state["written"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        プライマリ, レプリカのオブジェクト間のリレーションを許可
+
+        Returns
+        -------
+        allowed: bool
+            同じデータのDB間の場合はTrue
+        """
+        aliases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE_ALIAS}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        マイグレーションはプライマリのみに許可
+        ※レプリカはプライマリの複製のため、マイグレーションしない
+
+        Returns
+        -------
+        allowed: bool
+            プライマリの場合はTrue
+        """
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,46 @@
+"""
+テストランナー定義ファイル
+
+- テスト中のキャッシュをプロセス内のメモリ(LocMemCache)に切り替える
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    キャッシュをLocMemCacheに切り替えてテストを実行するテストランナーを定義
+    ※既定のFileBasedCache(BASE_DIR/cache)は起動中のサーバーと共有されるため、
+      テストの生成物を書き込まず, 読み込まない
+    """
+
+    test_caches = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+    def setup_test_environment(self, **kwargs):
+        """
+        テスト環境の初期設定で、キャッシュの設定を上書き
+
+        Parameters
+        ----------
+        kwargs: dict
+            キーワード引数
+        """
+        super().setup_test_environment(**kwargs)
+        self.cache_settings = override_settings(CACHES=self.test_caches)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        """
+        テスト環境の後処理で、キャッシュの設定を元に戻す
+
+        Parameters
+        ----------
+        kwargs: dict
+            キーワード引数
+        """
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
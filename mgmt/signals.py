@@ -0,0 +1,201 @@
+"""
+シグナル定義ファイル
+
+- 販売集計の更新(Sales削除)
+- 販売統計情報のキャッシュ無効化(Sales, Fruitの登録, 編集, 削除)
+- SQLiteのPRAGMA設定(DB接続)
+- リクエストのクエリ計測(DB接続)
+- 認証ユーザーのキャッシュ削除(ユーザーの保存, 削除, ログアウト)
+- 認証ユーザーのキャッシュ削除(グループ, 権限の変更)
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.auth.signals import user_logged_out
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from mgmt.cache import (
+    delete_user_cache,
+    delete_user_caches,
+    touch_sales_last_modified,
+)
+from mgmt.middleware import record_query
+from mgmt.models import Fruit, Sales, update_sales_summaries
+
+
+@receiver(post_delete, sender=Sales)
+def subtract_deleted_sales(sender, instance, **kwargs):
+    """
+    削除したSalesを販売集計から差し引く
+    ※QuerySet.delete()の場合も削除と同一トランザクション内で呼ばれる
+
+    Parameters
+    ----------
+    sender: type
+        Salesモデル
+    instance: Sales
+        削除したSales
+    """
+    update_sales_summaries([instance], sign=-1)
+
+
+@receiver(post_save, sender=Fruit)
+@receiver(post_delete, sender=Fruit)
+@receiver(post_save, sender=Sales)
+@receiver(post_delete, sender=Sales)
+def invalidate_statistics_cache(sender, **kwargs):
+    """
+    販売データの更新時に販売統計情報のキャッシュを無効化
+    ※bulk_create(CSVインポート)はシグナルを送らないため、保存側で無効化
+
+    Parameters
+    ----------
+    sender: type
+        Salesモデル, Fruitモデル
+    """
+    touch_sales_last_modified()
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    SQLiteへの接続時にSQLITE_PRAGMASのPRAGMAを設定
+
+    Parameters
+    ----------
+    sender: type
+        DBバックエンドのDatabaseWrapper
+    connection: DatabaseWrapper
+        作成したDB接続
+    """
+    if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def add_query_recorder(sender, connection, **kwargs):
+    """
+    DB接続時にリクエストのクエリを計測するexecute_wrapperを登録
+    ※再接続時は同じDB接続オブジェクトのため、重複して登録しない
+
+    Parameters
+    ----------
+    sender: type
+        DBバックエンドのDatabaseWrapper
+    connection: DatabaseWrapper
+        作成したDB接続
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    ユーザーの保存(パスワード変更, 無効化など), 削除時に
+    認証ユーザーのキャッシュを削除
+
+    Parameters
+    ----------
+    sender: type
+        Userモデル
+    instance: User
+        保存, 削除したユーザー
+    """
+    delete_user_cache(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user_cache(sender, request, user, **kwargs):
+    """
+    ログアウト時に認証ユーザーのキャッシュを削除
+
+    Parameters
+    ----------
+    sender: type
+        Userモデル
+    request: HttpRequest
+        ログアウトのリクエスト
+    user: User
+        ログアウトしたユーザー ※未ログインの場合はNone
+    """
+    if user is not None:
+        delete_user_cache(user.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_user_permissions_cache(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    ユーザーのグループ, 権限, グループの権限の変更時に
+    影響するユーザーの認証ユーザーのキャッシュ(権限)を削除
+    ※clearはpk_setが無いため、削除前(pre_clear)に対象を取得する
+
+    Parameters
+    ----------
+    sender: type
+        中間モデル
+    instance: Model
+        変更したUser, Group, Permission
+    action: str
+        変更の種類
+    reverse: bool
+        逆参照側(Group.user_set, Permission.group_setなど)からの変更か
+    pk_set: set
+        追加, 削除した関連先のID ※clearの場合はNone
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    user_model = get_user_model()
+
+    if sender is Group.permissions.through:
+        if not reverse:
+            groups = [instance]
+        elif pk_set is None:
+            groups = instance.group_set.all()
+        else:
+            groups = Group.objects.filter(pk__in=pk_set)
+
+        user_ids = user_model.objects.filter(groups__in=groups).values_list(
+            "pk", flat=True
+        )
+    elif not reverse:
+        user_ids = [instance.pk]
+    elif pk_set is None:
+        user_ids = instance.user_set.values_list("pk", flat=True)
+    else:
+        user_ids = pk_set
+
+    delete_user_caches(user_ids)
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_group_users_cache(sender, instance, **kwargs):
+    """
+    グループの削除時に所属ユーザーの認証ユーザーのキャッシュ(権限)を削除
+    ※所属(中間モデル)の削除ではm2m_changedが送られないため
+
+    Parameters
+    ----------
+    sender: type
+        Groupモデル
+    instance: Group
+        削除するグループ
+    """
+    delete_user_caches(instance.user_set.values_list("pk", flat=True))
@@ -0,0 +1,219 @@
+"""
+テストコードファイル
+
+- 非同期ビュー(ASGI)
+- ストリーミングレスポンス(ASGI)
+"""
+
+import asyncio
+import datetime
+from unittest import mock
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+
+from mgmt import metrics
+from mgmt.forms import SalesCSVForm
+from mgmt.handlers import ASGIHandler
+from mgmt.models import Fruit, ImportJob, Sales
+from mgmt.views import sales_view, statistics_view
+
+
+class AsyncViewTest(TestCase):
+    """ASGIでの非同期ビューのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.async_client.force_login(self.user)
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        self.sales = Sales.objects.create(
+            fruit=self.fruit,
+            quantity=2,
+            total=200,
+            sale_date=datetime.datetime(2023, 3, 1, 10, 0, tzinfo=jst),
+        )
+        self.import_job = ImportJob.objects.create(filename="test.csv")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+        ImportJob.objects.all().delete()
+
+    def test_views_are_async(self):
+        """販売情報一覧, 販売統計情報, ポーリング用のビューが非同期かテスト"""
+        for view_class in (
+            sales_view.SalesListView,
+            sales_view.ImportJobStatusView,
+            statistics_view.StatisticsListView,
+            statistics_view.StatisticsAPIView,
+        ):
+            with self.subTest(view_class=view_class.__name__):
+                self.assertTrue(view_class.view_is_async)
+
+    async def test_redirect_expected_page_when_logged_out(self):
+        """未ログインの場合、ログインページにリダイレクトされるかテスト"""
+        sales_path = reverse("mgmt:sales")
+        response = await AsyncClient().get(sales_path)
+        self.assertRedirects(
+            response,
+            reverse("mgmt:login") + "?next=" + sales_path,
+            fetch_redirect_response=False,
+        )
+
+    async def test_sales_list(self):
+        """販売情報一覧が表示されるかテスト"""
+        response = await self.async_client.get(reverse("mgmt:sales"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["sales_list"], [self.sales])
+
+    async def test_statistics(self):
+        """販売統計情報が表示されるかテスト"""
+        response = await self.async_client.get(reverse("mgmt:statistics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["all_period_total"], 200)
+
+    async def test_statistics_api_conditional_get(self):
+        """販売統計情報APIが条件付きGETで304を返すかテスト"""
+        api_path = reverse("mgmt:statistics_api")
+        params = {"from": "2023-03-01", "to": "2023-03-31"}
+        response = await self.async_client.get(api_path, params)
+        self.assertEqual(response.json()["total"], 200)
+        response = await self.async_client.get(
+            api_path, params, **{"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_import_job_status(self):
+        """CSVインポートジョブの状態が取得できるかテスト"""
+        response = await self.async_client.get(
+            reverse("mgmt:import_job", kwargs={"pk": self.import_job.pk})
+        )
+        self.assertEqual(response.json()["status"], "pending")
+
+    async def test_import_job_not_found(self):
+        """存在しないCSVインポートジョブの場合、404になるかテスト"""
+        response = await self.async_client.get(
+            reverse("mgmt:import_job", kwargs={"pk": self.import_job.pk + 1})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_csv_form_is_validated_outside_event_loop(self):
+        """CSVデータのフォームの作成, 検証がイベントループの外で行われるかテスト"""
+        running_loops = []
+        clean_csv = SalesCSVForm.clean_csv
+
+        def record_running_loop(form):
+            try:
+                running_loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                running_loops.append(None)
+            return clean_csv(form)
+
+        # Django 4.1のAsyncClientはmultipartのPOSTを送れないため、
+        # RequestFactoryのリクエストで非同期ビューを直接呼び出す
+        request = RequestFactory().post(
+            reverse("mgmt:sales"),
+            {"csv": SimpleUploadedFile("test.csv.gz", b"not gzip")},
+        )
+        request.user = self.user
+
+        with mock.patch.object(SalesCSVForm, "clean_csv", record_running_loop):
+            response = await sales_view.SalesListView.as_view()(request)
+
+        self.assertTrue(response.context_data["form"].errors)
+        self.assertEqual(running_loops, [None])
+
+    async def test_metrics_record_async_queries(self):
+        """非同期ビューのクエリ数がメトリクスに記録されるかテスト"""
+        metrics.http_db_queries.clear()
+        await self.async_client.get(reverse("mgmt:sales"))
+        counts = metrics.http_db_queries.values[("mgmt:sales", "GET")]
+        self.assertEqual(counts[-1], 1)
+        self.assertEqual(counts[-2], 3)
+
+
+class ASGIStreamingTest(TransactionTestCase):
+    """
+    ASGIでのストリーミングレスポンスのテスト
+    ※ASGIHandlerはリクエストごとのスレッドでDBに接続するため、
+      トランザクションで囲まないTransactionTestCaseを使う
+    """
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(user)
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        Sales.objects.create(
+            fruit=self.fruit,
+            quantity=2,
+            total=200,
+            sale_date=datetime.datetime(
+                2023, 3, 1, 1, 0, tzinfo=datetime.timezone.utc
+            ),
+        )
+
+    async def get(self, path, query_string):
+        """ASGIHandlerにGETリクエストを送り、ステータスコードと本文を取得"""
+        session_id = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        communicator = ApplicationCommunicator(
+            ASGIHandler(),
+            {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "query_string": query_string,
+                "headers": [
+                    (b"host", b"testserver"),
+                    (
+                        b"cookie",
+                        f"{settings.SESSION_COOKIE_NAME}={session_id}".encode(),
+                    ),
+                ],
+            },
+        )
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output(timeout=10)
+        body = b""
+
+        while True:
+            message = await communicator.receive_output(timeout=10)
+            body += message.get("body", b"")
+
+            if not message.get("more_body"):
+                break
+
+        await communicator.wait(timeout=10)
+        return start["status"], body
+
+    async def test_export_streams_csv(self):
+        """CSVエクスポートがASGIでストリーミングされるかテスト"""
+        status, body = await self.get(
+            reverse("mgmt:sales_export"), b"from=2023-03-01&to=2023-03-31"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            body.decode("utf-8"), "リンゴ,2,200,2023-03-01 10:00\r\n"
+        )
@@ -0,0 +1,177 @@
+"""
+テストコードファイル
+
+- 検証用データの生成
+- ベンチマーク(ベースラインとの比較)
+"""
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.test import TestCase
+
+from mgmt.management.commands import (
+    benchmark,
+    benchmark_concurrency,
+    benchmark_csv_rows,
+)
+from mgmt.models import DailySalesSummary, Fruit, MonthlySalesSummary, Sales
+
+
+class SeedSalesTest(TestCase):
+    """検証用データの生成のテスト"""
+
+    def test_seed_fruits_and_sales(self):
+        """指定した件数の果物と販売情報が生成されるかテスト"""
+        call_command(
+            "seed_sales",
+            fruits=20,
+            sales=500,
+            batch_size=200,
+            seed=1,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(Fruit.objects.count(), 20)
+        self.assertEqual(
+            Fruit.objects.values("name").distinct().count(),
+            20,
+        )
+        self.assertEqual(Sales.objects.count(), 500)
+
+    def test_seed_sales_updates_summaries(self):
+        """生成した販売情報が販売集計に反映されるかテスト"""
+        call_command("seed_sales", sales=300, seed=1, stdout=io.StringIO())
+        total = Sales.objects.aggregate(Sum("total"))["total__sum"]
+
+        for summary_model in (DailySalesSummary, MonthlySalesSummary):
+            self.assertEqual(
+                summary_model.objects.aggregate(Sum("total"))["total__sum"],
+                total,
+            )
+
+    def test_seed_is_reproducible(self):
+        """同じシードの場合、同じ販売情報が生成されるかテスト"""
+        sales_lists = []
+
+        for _ in range(2):
+            Sales.objects.all().delete()
+            Fruit.objects.all().delete()
+            call_command(
+                "seed_sales", fruits=5, sales=50, seed=1, stdout=io.StringIO()
+            )
+            sales_lists.append(
+                list(
+                    Sales.objects.order_by("pk").values_list(
+                        "fruit__name", "quantity", "total", "sale_date"
+                    )
+                )
+            )
+        self.assertEqual(sales_lists[0], sales_lists[1])
+
+    def test_seed_sales_without_fruits_raises_error(self):
+        """果物が無い場合、エラーになるかテスト"""
+        with self.assertRaises(CommandError):
+            call_command(
+                "seed_sales", fruits=0, sales=10, stdout=io.StringIO()
+            )
+
+
+class BenchmarkCSVRowsTest(TestCase):
+    """CSVデータの行のフォーマットのマイクロベンチマークのテスト"""
+
+    def test_reports_per_row_cost(self):
+        """行の種類ごとに1行あたりの処理時間が表示されるかテスト"""
+        stdout = io.StringIO()
+        call_command("benchmark_csv_rows", rows=10, repeat=1, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(
+            [line.split(":")[0] for line in lines],
+            list(benchmark_csv_rows.Command.records),
+        )
+        self.assertTrue(all(line.endswith("µs/行") for line in lines))
+
+
+class BenchmarkCompareTest(TestCase):
+    """ベンチマーク結果とベースラインの比較のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.command = benchmark.Command()
+        self.baseline = {
+            "results": {
+                "10000": {
+                    "sales_list": {
+                        "wall_time": 0.1,
+                        "queries": 4,
+                        "peak_memory": 1000,
+                    },
+                },
+            },
+        }
+
+    def get_results(self, **metrics):
+        """ベースラインの計測結果をmetricsで上書きした計測結果を生成"""
+        result = dict(self.baseline["results"]["10000"]["sales_list"])
+        result.update(metrics)
+        return {"10000": {"sales_list": result}}
+
+    def test_within_threshold_is_not_regression(self):
+        """増加率がthreshold以内の場合、劣化とみなさないかテスト"""
+        results = self.get_results(wall_time=0.119, peak_memory=1199)
+        self.assertEqual(
+            self.command.compare(results, self.baseline, 0.2),
+            [],
+        )
+
+    def test_slower_wall_time_is_regression(self):
+        """処理時間がthresholdを超えて増加した場合、劣化とみなすかテスト"""
+        results = self.get_results(wall_time=0.13)
+        self.assertEqual(
+            self.command.compare(results, self.baseline, 0.2),
+            ["10000件 sales_list wall_time: 0.1 -> 0.13"],
+        )
+
+    def test_additional_query_is_regression(self):
+        """クエリ数が1件でも増加した場合、劣化とみなすかテスト"""
+        results = self.get_results(queries=5)
+        self.assertEqual(
+            self.command.compare(results, self.baseline, 0.2),
+            ["10000件 sales_list queries: 4 -> 5"],
+        )
+
+    def test_missing_baseline_is_skipped(self):
+        """ベースラインに無い件数は比較しないかテスト"""
+        results = {"100000": self.get_results()["10000"]}
+        self.assertEqual(
+            self.command.compare(results, self.baseline, 0.2),
+            [],
+        )
+
+    def test_exact_metrics_ignore_threshold(self):
+        """exact_metricsは増加率に関わらず、増加した場合に劣化とみなすかテスト"""
+        command = benchmark_concurrency.Command()
+        baseline = {
+            "results": {
+                "10000": {
+                    "during_import": {
+                        "read_p95": 0.1,
+                        "write_p95": 0.1,
+                        "errors": 0,
+                    },
+                },
+            },
+        }
+        results = {
+            "10000": {
+                "during_import": {
+                    "read_p95": 0.11,
+                    "write_p95": 0.1,
+                    "errors": 1,
+                },
+            },
+        }
+        self.assertEqual(
+            command.compare(results, baseline, 0.2),
+            ["10000件 during_import errors: 0 -> 1"],
+        )
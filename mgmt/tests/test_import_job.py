@@ -0,0 +1,272 @@
+"""
+テストコードファイル
+
+- CSVインポートジョブ(登録, ワーカー実行, 状態取得, エラーレポート)
+"""
+import csv
+import datetime
+import gzip
+import io
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from mgmt.forms import SalesCSVForm
+from mgmt.jobs import requeue_stale_import_jobs
+from mgmt.models import Fruit, ImportJob, Sales
+from mgmt.views import sales_view
+
+
+@override_settings(IMPORT_JOB_RUNNER="worker")
+class ImportJobTest(TestCase):
+    """CSVインポートジョブのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # テストのトランザクション内でワーカーがDB接続を閉じないようにする
+        # (テストクライアントがリクエストの前後で閉じないのと同様)
+        close_patcher = mock.patch(
+            "mgmt.management.commands.run_import_worker.close_old_connections"
+        )
+        close_patcher.start()
+        self.addCleanup(close_patcher.stop)
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        self.sales_path = reverse("mgmt:sales")
+        file_content = (
+            "リンゴ,3,300,2016-02-01 10:35\n"
+            "メロン,5,250,2016-02-02 10:30\n"
+            "リンゴ,1,100,2016-02-03 10:30"
+        ).encode("utf-8")
+        self.csv_data = SimpleUploadedFile(
+            "test.csv", file_content, "text/csv"
+        )
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        ImportJob.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_upload_queues_job_without_importing(self):
+        """アップロード時はジョブが待機中で登録され、インポートはされないかテスト"""
+        response = self.client.post(self.sales_path, {"csv": self.csv_data})
+        import_job = ImportJob.objects.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(import_job.status, ImportJob.Status.PENDING)
+        self.assertEqual(import_job.filename, "test.csv")
+        self.assertFalse(Sales.objects.exists())
+
+    def test_upload_shows_job_status(self):
+        """アップロードしたジョブの状態が一覧に表示されるかテスト"""
+        response = self.client.post(self.sales_path, {"csv": self.csv_data})
+        self.assertContains(response, "待機中")
+
+    def test_worker_runs_pending_job(self):
+        """ワーカーが待機中のジョブを実行し、処理結果を記録するかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertEqual(import_job.status, ImportJob.Status.DONE)
+        self.assertEqual(import_job.rows_processed, 3)
+        self.assertEqual(import_job.rows_failed, 1)
+        self.assertEqual(
+            import_job.error_messages,
+            "CSVデータ2行目の果物が見つかりませんでした。",
+        )
+        self.assertEqual(Sales.objects.count(), 2)
+        self.assertFalse(import_job.csv_file)
+
+    def test_worker_requeues_stale_running_job(self):
+        """応答が途絶えた処理中のジョブを、ワーカーが再実行するかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        stale_at = timezone.now() - datetime.timedelta(
+            seconds=settings.IMPORT_JOB_STALE_SECONDS + 1
+        )
+        ImportJob.objects.update(
+            status=ImportJob.Status.RUNNING,
+            started_at=stale_at,
+            heartbeat_at=stale_at,
+            rows_processed=1,
+        )
+
+        with self.assertLogs(level="WARNING"):
+            call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertEqual(import_job.status, ImportJob.Status.DONE)
+        self.assertEqual(import_job.rows_processed, 3)
+        self.assertEqual(Sales.objects.count(), 2)
+
+    def test_worker_does_not_requeue_active_job(self):
+        """応答中の処理中のジョブは、ワーカーが再実行しないかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        ImportJob.objects.update(
+            status=ImportJob.Status.RUNNING,
+            started_at=timezone.now(),
+            heartbeat_at=timezone.now(),
+        )
+        self.assertEqual(requeue_stale_import_jobs(), 0)
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        self.assertEqual(
+            ImportJob.objects.get().status, ImportJob.Status.RUNNING
+        )
+        self.assertFalse(Sales.objects.exists())
+
+    def test_status_view_returns_json(self):
+        """ジョブの状態がJSONで取得できるかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        response = self.client.get(
+            reverse("mgmt:import_job", kwargs={"pk": import_job.pk})
+        )
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(response.json()["rows_processed"], 3)
+        self.assertFalse(response.json()["is_active"])
+
+    def test_status_view_uses_expected_view(self):
+        """URLパスとビューがマッピングされているかテスト"""
+        view = resolve(reverse("mgmt:import_job", kwargs={"pk": 1}))
+        self.assertEqual(view.func.view_class, sales_view.ImportJobStatusView)
+
+    def test_worker_saves_error_report(self):
+        """エラーの行がエラーレポートと種類ごとの行数に記録されるかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertEqual(
+            import_job.error_counts, {"果物が見つかりませんでした": 1}
+        )
+
+        with import_job.error_report.open("r") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], SalesCSVForm.error_report_header)
+        self.assertEqual(
+            rows[1:],
+            [
+                [
+                    "2",
+                    "果物が見つかりませんでした",
+                    "メロン",
+                    "5",
+                    "250",
+                    "2016-02-02 10:30",
+                ]
+            ],
+        )
+
+    def test_error_messages_are_limited(self):
+        """エラーメッセージがerror_limit行までに抑えられるかテスト"""
+        rows = SalesCSVForm.error_limit * 3
+        file_content = "\n".join(
+            f"メロン,5,250,2016-02-02 {minute // 60:02}:{minute % 60:02}"
+            for minute in range(rows)
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile("test.csv", file_content, "text/csv")
+        self.client.post(self.sales_path, {"csv": csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        error_messages = import_job.error_messages.splitlines()
+        self.assertEqual(len(error_messages), SalesCSVForm.error_limit + 1)
+        self.assertEqual(
+            error_messages[-1],
+            f"他{rows - SalesCSVForm.error_limit}行のエラーは"
+            "エラーレポートで確認してください。",
+        )
+        self.assertEqual(
+            import_job.error_counts, {"果物が見つかりませんでした": rows}
+        )
+
+        with import_job.error_report.open("r") as f:
+            self.assertEqual(len(list(csv.reader(f))), rows + 1)
+
+    def test_error_types_do_not_include_row_values(self):
+        """エラーの種類が行の値に関わらず決まった種類に分類されるかテスト"""
+        file_content = "\n".join(
+            [
+                "リンゴ,-1,250,2016-02-02 10:30",
+                "リンゴ,5,250,2016-02-31 10:30",
+                "リンゴ,5,250,2016-13-02 10:30",
+                "リンゴ,5",
+            ]
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile("test.csv", file_content, "text/csv")
+        self.client.post(self.sales_path, {"csv": csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertEqual(
+            import_job.error_counts,
+            {"個数に数値以外が入力されています": 1, "その他のエラー": 3},
+        )
+
+    def test_error_report_view_returns_csv(self):
+        """エラーレポートがCSVでダウンロードできるかテスト"""
+        self.client.post(self.sales_path, {"csv": self.csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        response = self.client.get(
+            reverse("mgmt:import_job", kwargs={"pk": import_job.pk})
+        )
+        error_report_url = response.json()["error_report_url"]
+        self.assertEqual(
+            error_report_url,
+            reverse("mgmt:import_job_errors", kwargs={"pk": import_job.pk}),
+        )
+        response = self.client.get(error_report_url)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment", response["Content-Disposition"])
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertIn("2,果物が見つかりませんでした,メロン", content)
+
+    def test_error_report_view_without_errors_returns_404(self):
+        """エラーの行がない場合、エラーレポートが404になるかテスト"""
+        csv_data = SimpleUploadedFile(
+            "test.csv", "リンゴ,3,300,2016-02-01 10:35".encode("utf-8")
+        )
+        self.client.post(self.sales_path, {"csv": csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertFalse(import_job.error_report)
+        response = self.client.get(
+            reverse("mgmt:import_job_errors", kwargs={"pk": import_job.pk})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_error_report_view_uses_expected_view(self):
+        """URLパスとビューがマッピングされているかテスト"""
+        view = resolve(reverse("mgmt:import_job_errors", kwargs={"pk": 1}))
+        self.assertEqual(
+            view.func.view_class, sales_view.ImportJobErrorReportView
+        )
+
+    def test_worker_runs_gzip_job(self):
+        """gzipで圧縮したCSVデータのジョブが実行されるかテスト"""
+        csv_data = SimpleUploadedFile(
+            "test.csv.gz", gzip.compress(self.csv_data.read())
+        )
+        self.client.post(self.sales_path, {"csv": csv_data})
+        call_command("run_import_worker", "--once", stdout=io.StringIO())
+        import_job = ImportJob.objects.get()
+        self.assertEqual(import_job.status, ImportJob.Status.DONE)
+        self.assertEqual(import_job.rows_processed, 3)
+        self.assertEqual(Sales.objects.count(), 2)
+        self.assertTrue(
+            import_job.error_report.name.endswith("/test_errors.csv")
+        )
@@ -0,0 +1,76 @@
+"""
+テストコードファイル
+
+- 一覧, 統計情報, CSVインポートのクエリがインデックスを使うか(EXPLAIN)
+"""
+import unittest
+
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from mgmt.models import DailySalesSummary, Fruit, MonthlySalesSummary, Sales
+from mgmt.views import fruit_view, sales_view
+
+
+@unittest.skipUnless(
+    connection.vendor == "sqlite",
+    "EXPLAIN QUERY PLANの出力形式がSQLite前提のため",
+)
+class IndexUsageTest(TestCase):
+    """クエリの実行計画のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        self.now = timezone.now()
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        Fruit.objects.all().delete()
+
+    def test_sales_list_uses_sale_date_desc_index(self):
+        """販売情報一覧が(販売日時, ID)の降順インデックスを使うかテスト"""
+        queryset = sales_view.SalesListView.queryset.order_by(
+            *sales_view.SalesListView.ordering
+        )
+        self.assertIn("sales_sale_date_id_desc_idx", queryset[:51].explain())
+
+    def test_sales_list_next_page_uses_sale_date_desc_index(self):
+        """販売情報一覧の次ページが(販売日時, ID)の降順インデックスを使うかテスト"""
+        queryset = sales_view.SalesListView.queryset.filter(
+            Q(sale_date__lte=self.now),
+            Q(sale_date__lt=self.now) | Q(pk__lt=100),
+        ).order_by(*sales_view.SalesListView.ordering)
+        self.assertIn("sales_sale_date_id_desc_idx", queryset[:51].explain())
+
+    def test_sales_by_fruit_and_period_uses_composite_index(self):
+        """果物と期間で絞り込んだSalesが(果物, 販売日時)インデックスを使うかテスト"""
+        queryset = Sales.objects.filter(
+            fruit=self.fruit,
+            sale_date__gte=self.now,
+            sale_date__lt=self.now,
+        )
+        self.assertIn("sales_fruit_sale_date_idx", queryset.explain())
+
+    def test_fruit_list_uses_partial_index(self):
+        """果物一覧が未削除の果物の部分インデックスを使うかテスト"""
+        queryset = fruit_view.FruitListView.queryset
+        self.assertIn("fruit_active_updated_at_idx", queryset.explain())
+
+    def test_fruit_name_lookup_uses_index(self):
+        """果物名での検索がインデックスを使うかテスト"""
+        explain = Fruit.objects.filter(name="リンゴ").explain()
+        self.assertIn("USING INDEX mgmt_fruit_name_", explain)
+
+    def test_statistics_uses_period_indexes(self):
+        """統計情報の期間での絞り込みが集計期間のインデックスを使うかテスト"""
+        for summary_model, index_name in (
+            (DailySalesSummary, "daily_summary_period_idx"),
+            (MonthlySalesSummary, "monthly_summary_period_idx"),
+        ):
+            queryset = summary_model.objects.filter(
+                period__gte=self.now.date(),
+            ).values("period", "fruit__name", "total", "quantity")
+            self.assertIn(index_name, queryset.explain())
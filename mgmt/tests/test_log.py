@@ -0,0 +1,129 @@
+"""
+テストコードファイル
+
+- バックグラウンドスレッドでのログファイルへの書き込み, ローテーション
+- JSON形式のログ
+"""
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import sys
+import tempfile
+
+from django.test import SimpleTestCase
+
+from mgmt.log import JSONFormatter, QueueFileHandler
+
+
+class QueueFileHandlerTest(SimpleTestCase):
+    """バックグラウンドスレッドでのログファイルへの書き込みのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filename = os.path.join(tmp_dir.name, "app.log")
+        self.logger = logging.getLogger("mgmt.tests.test_log")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def get_handler(self, **kwargs):
+        """ハンドラーを生成し、ロガーに追加"""
+        handler = QueueFileHandler(self.filename, **kwargs)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+
+    def test_write_log_on_close(self):
+        """キューに入れたログが停止時にファイルに書き込まれるかテスト"""
+        handler = self.get_handler()
+        self.logger.warning("テスト1")
+        self.logger.warning("テスト2")
+        handler.close()
+
+        with open(self.filename, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "テスト1\nテスト2\n")
+
+    def test_rotate_by_size(self):
+        """ファイルサイズを超えた場合、ローテーションされるかテスト"""
+        handler = self.get_handler(max_bytes=100, backup_count=2)
+
+        for i in range(30):
+            self.logger.warning("テスト%d", i)
+        handler.close()
+
+        self.assertTrue(os.path.exists(self.filename + ".1"))
+        self.assertTrue(os.path.exists(self.filename + ".2"))
+        self.assertFalse(os.path.exists(self.filename + ".3"))
+
+    def test_configure_with_dict_config(self):
+        """dictConfigの設定(独自の引数)でハンドラーを生成できるかテスト"""
+        configurator = logging.config.DictConfigurator(
+            {
+                "version": 1,
+                "handlers": {
+                    "file": {
+                        "class": "mgmt.log.QueueFileHandler",
+                        "filename": self.filename,
+                        "max_bytes": 100,
+                    },
+                },
+            }
+        )
+        handler = configurator.configure_handler(
+            configurator.config["handlers"]["file"]
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.logger.warning("テスト")
+        handler.close()
+
+        with open(self.filename, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "テスト\n")
+
+    def test_rotate_by_time(self):
+        """日時を指定した場合、日時でローテーションするハンドラーになるかテスト"""
+        handler = self.get_handler(when="midnight")
+        handler.close()
+        self.assertIsInstance(
+            handler.file_handler, logging.handlers.TimedRotatingFileHandler
+        )
+
+
+class JSONFormatterTest(SimpleTestCase):
+    """JSON形式のログのテスト"""
+
+    def test_format_json(self):
+        """ログが1行のJSONに変換されるかテスト"""
+        record = logging.makeLogRecord(
+            {
+                "name": "mgmt",
+                "levelname": "WARNING",
+                "msg": "CSVデータ%d行目",
+                "args": (2,),
+                "pathname": "forms.py",
+                "lineno": 10,
+            }
+        )
+        text = JSONFormatter().format(record)
+        self.assertNotIn("\n", text)
+        data = json.loads(text)
+        self.assertEqual(data["level"], "WARNING")
+        self.assertEqual(data["message"], "CSVデータ2行目")
+        self.assertEqual(data["lineno"], 10)
+        self.assertNotIn("exc_info", data)
+
+    def test_format_exception(self):
+        """例外がある場合、トレースバックが含まれるかテスト"""
+        try:
+            raise ValueError("テスト")
+        except ValueError:
+            record = logging.makeLogRecord(
+                {"msg": "エラー", "exc_info": sys.exc_info()}
+            )
+        data = json.loads(JSONFormatter().format(record))
+        self.assertIn("ValueError: テスト", data["exc_info"])
@@ -2,11 +2,16 @@
 テストコードファイル
 
 - ログイン
+- 認証ユーザーのキャッシュ
 """
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.test import TestCase
 from django.urls import resolve, reverse
 
+from mgmt.backends.auth import CachedModelBackend
+from mgmt.cache import get_user_cache_key
 from mgmt.views import login_view
 
 
@@ -65,3 +70,153 @@ class UserLoginTest(TestCase):
         self.client.force_login(self.user)
         response = self.client.get(self.login_path)
         self.assertRedirects(response, self.top_path)
+
+
+class CachedUserTest(TestCase):
+    """認証ユーザーのキャッシュのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.top_path = reverse("mgmt:top")
+        self.cache_key = get_user_cache_key(self.user.pk)
+        self.client.get(self.top_path)
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+
+    def test_cache_is_local_memory(self):
+        """テスト中のキャッシュがLocMemCache(ファイルと共有しない)かテスト"""
+        self.assertIsInstance(caches["default"], LocMemCache)
+
+    def test_user_is_cached(self):
+        """ログイン済みのリクエストでユーザーがキャッシュされるかテスト"""
+        user_data = cache.get(self.cache_key)
+        self.assertEqual(user_data["fields"]["id"], self.user.pk)
+        self.assertEqual(user_data["fields"]["username"], "test_user")
+        self.assertEqual(
+            user_data["session_auth_hash"],
+            self.user.get_session_auth_hash(),
+        )
+
+    def test_password_hash_is_not_cached(self):
+        """キャッシュにパスワードハッシュが含まれないかテスト"""
+        user_data = cache.get(self.cache_key)
+        self.assertNotIn("password", user_data["fields"])
+        self.assertNotIn(self.user.password, repr(user_data))
+
+    def test_cached_user_has_no_queries(self):
+        """キャッシュ済みの場合、ユーザーの取得でクエリを発行しないかテスト"""
+        backend = CachedModelBackend()
+
+        with self.assertNumQueries(0):
+            user = backend.get_user(self.user.pk)
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(
+                user.get_session_auth_hash(),
+                self.user.get_session_auth_hash(),
+            )
+
+    def test_staff_permissions_are_cached(self):
+        """スタッフの権限がキャッシュされ、クエリなしで判定できるかテスト"""
+        self.user.is_staff = True
+        self.user.user_permissions.add(
+            Permission.objects.get(codename="view_fruit")
+        )
+        self.user.save()
+        self.client.get(self.top_path)
+        user = CachedModelBackend().get_user(self.user.pk)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("mgmt.view_fruit"))
+            self.assertFalse(user.has_perm("mgmt.delete_fruit"))
+
+    def get_cached_staff_with_group(self):
+        """閲覧権限のグループに所属するスタッフをキャッシュして取得"""
+        self.user.is_staff = True
+        self.user.save()
+        group = Group.objects.create(name="viewer")
+        group.permissions.add(Permission.objects.get(codename="view_fruit"))
+        self.user.groups.add(group)
+        self.client.get(self.top_path)
+        self.assertIsNotNone(cache.get(self.cache_key))
+        return group
+
+    def assert_permission_revoked(self):
+        """閲覧権限が取り消され、キャッシュにも残っていないか検証"""
+        user = CachedModelBackend().get_user(self.user.pk)
+        self.assertFalse(user.has_perm("mgmt.view_fruit"))
+
+    def test_user_permission_remove_invalidates_cache(self):
+        """ユーザーの権限の削除で権限のキャッシュが削除されるかテスト"""
+        self.user.is_staff = True
+        self.user.save()
+        permission = Permission.objects.get(codename="view_fruit")
+        self.user.user_permissions.add(permission)
+        self.client.get(self.top_path)
+        self.user.user_permissions.remove(permission)
+        self.assert_permission_revoked()
+
+    def test_group_remove_invalidates_cache(self):
+        """グループからの脱退で権限のキャッシュが削除されるかテスト"""
+        group = self.get_cached_staff_with_group()
+        group.user_set.remove(self.user)
+        self.assert_permission_revoked()
+
+    def test_group_clear_invalidates_cache(self):
+        """所属グループのクリアで権限のキャッシュが削除されるかテスト"""
+        group = self.get_cached_staff_with_group()
+        group.user_set.clear()
+        self.assert_permission_revoked()
+
+    def test_group_permission_remove_invalidates_cache(self):
+        """グループの権限の削除で所属ユーザーのキャッシュが削除されるかテスト"""
+        group = self.get_cached_staff_with_group()
+        group.permissions.clear()
+        self.assert_permission_revoked()
+
+    def test_permission_group_remove_invalidates_cache(self):
+        """権限側からのグループの削除で所属ユーザーのキャッシュが削除されるかテスト"""
+        group = self.get_cached_staff_with_group()
+        Permission.objects.get(codename="view_fruit").group_set.remove(group)
+        self.assert_permission_revoked()
+
+    def test_group_delete_invalidates_cache(self):
+        """グループの削除で所属ユーザーのキャッシュが削除されるかテスト"""
+        group = self.get_cached_staff_with_group()
+        group.delete()
+        self.assert_permission_revoked()
+
+    def test_cached_user_saves_all_fields(self):
+        """キャッシュから復元したユーザーの保存で他のフィールドを失わないかテスト"""
+        user = CachedModelBackend().get_user(self.user.pk)
+        user.set_password("new_password")
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("new_password"))
+        self.assertEqual(self.user.username, "test_user")
+
+    def test_logout_deletes_cached_user(self):
+        """ログアウトでユーザーのキャッシュが削除されるかテスト"""
+        self.client.logout()
+        self.assertIsNone(cache.get(self.cache_key))
+
+    def test_password_change_logs_out(self):
+        """パスワード変更後は、変更前のセッションがログアウトされるかテスト"""
+        self.user.set_password("new_password")
+        self.user.save()
+        response = self.client.get(self.top_path)
+        self.assertEqual(response.status_code, 302)
+
+    def test_deactivated_user_logs_out(self):
+        """無効化したユーザーのセッションがログアウトされるかテスト"""
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.top_path)
+        self.assertEqual(response.status_code, 302)
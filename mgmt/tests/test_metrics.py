@@ -0,0 +1,178 @@
+"""
+テストコードファイル
+
+- メトリクス(計測, Prometheusのテキスト形式)
+"""
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from mgmt import metrics
+from mgmt.models import Fruit
+from mgmt.views import metrics_view
+
+
+class MetricsRenderTest(TestCase):
+    """メトリクスのテキスト形式のテスト"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """ヒストグラムのバケットが累積件数で出力されるかテスト"""
+        histogram = metrics.Histogram(
+            "test_histogram", "Test.", ("view",), (1, 5)
+        )
+        metrics.REGISTRY.remove(histogram)
+
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value, "mgmt:top")
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP test_histogram Test.",
+                "# TYPE test_histogram histogram",
+                'test_histogram_bucket{view="mgmt:top",le="1"} 2',
+                'test_histogram_bucket{view="mgmt:top",le="5"} 3',
+                'test_histogram_bucket{view="mgmt:top",le="+Inf"} 4',
+                'test_histogram_sum{view="mgmt:top"} 14.5',
+                'test_histogram_count{view="mgmt:top"} 4',
+            ],
+        )
+
+    def test_label_values_are_escaped(self):
+        """ラベルの値がエスケープされるかテスト"""
+        counter = metrics.Counter("test_counter", "Test.", ("path",))
+        metrics.REGISTRY.remove(counter)
+        counter.inc('a"b\\c\n')
+        self.assertEqual(
+            counter.render()[-1],
+            'test_counter{path="a\\"b\\\\c\\n"} 1',
+        )
+
+
+class MetricsViewTest(TestCase):
+    """メトリクスの計測, 取得のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        for metric in metrics.REGISTRY:
+            metric.clear()
+
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_login(self.user)
+        self.metrics_path = reverse("mgmt:metrics")
+
+    def get_metrics(self):
+        """メトリクスを行のリストで取得"""
+        response = self.client.get(self.metrics_path)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_uses_expected_view(self):
+        """URLパスとビューがマッピングされているかテスト"""
+        view = resolve(self.metrics_path)
+        self.assertEqual(view.func.view_class, metrics_view.MetricsView)
+
+    def test_metrics_path_is_prometheus_default(self):
+        """URLパスがPrometheusの既定値(/metrics)かテスト"""
+        self.assertEqual(self.metrics_path, "/metrics")
+
+    def test_forbidden_for_non_staff_user(self):
+        """スタッフ以外のユーザーの場合、403が返ってくるかテスト"""
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(self.metrics_path)
+        self.assertEqual(response.status_code, 403)
+
+    def test_forbidden_for_anonymous_user(self):
+        """未ログインでトークンが無い場合、403が返ってくるかテスト"""
+        self.client.logout()
+        response = self.client.get(self.metrics_path)
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN="test_token")
+    def test_allowed_with_token(self):
+        """METRICS_TOKENのBearerトークンで取得できるかテスト"""
+        self.client.logout()
+        response = self.client.get(
+            self.metrics_path, HTTP_AUTHORIZATION="Bearer test_token"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="test_token")
+    def test_forbidden_with_wrong_token(self):
+        """METRICS_TOKENと異なるトークンの場合、403が返ってくるかテスト"""
+        self.client.logout()
+        response = self.client.get(
+            self.metrics_path, HTTP_AUTHORIZATION="Bearer wrong_token"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_is_not_accepted(self):
+        """METRICS_TOKENが未設定の場合、空のトークンで取得できないかテスト"""
+        self.client.logout()
+        response = self.client.get(
+            self.metrics_path, HTTP_AUTHORIZATION="Bearer "
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_request_metrics_are_recorded(self):
+        """ビューごとのリクエスト数, クエリ数, サイズが記録されるかテスト"""
+        self.client.get(reverse("mgmt:top"))
+        lines = self.get_metrics()
+        labels = 'view="mgmt:top",method="GET"'
+        self.assertIn(
+            f'mgmt_http_requests_total{{{labels},status="200"}} 1',
+            lines,
+        )
+        self.assertIn(
+            f"mgmt_http_request_duration_seconds_count{{{labels}}} 1",
+            lines,
+        )
+        self.assertIn(f"mgmt_http_db_queries_count{{{labels}}} 1", lines)
+        self.assertNotIn(f"mgmt_http_db_queries_sum{{{labels}}} 0", lines)
+        self.assertIn(
+            f"mgmt_http_response_size_bytes_count{{{labels}}} 1",
+            lines,
+        )
+
+    def test_unknown_methods_are_recorded_as_other(self):
+        """任意のHTTPメソッドがmethod="other"にまとめて記録されるかテスト"""
+        for method in ("FOO1", "FOO2"):
+            self.client.generic(method, reverse("mgmt:top"))
+        lines = self.get_metrics()
+        self.assertIn(
+            'mgmt_http_requests_total{view="mgmt:top",method="other",'
+            'status="405"} 2',
+            lines,
+        )
+        self.assertFalse([line for line in lines if "FOO" in line])
+
+    def test_csv_rows_imported_are_counted(self):
+        """CSVインポートで保存, エラーになった行数が記録されるかテスト"""
+        Fruit.objects.create(name="リンゴ", price=100)
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        csv_data = SimpleUploadedFile(
+            "test.csv",
+            (
+                "リンゴ,3,300,2016-02-01 10:35\n"
+                "リンゴ,1,100,2016-02-01 10:36\n"
+                "メロン,1,100,2016-02-01 10:37"
+            ).encode("utf-8"),
+            "text/csv",
+        )
+
+        with self.settings(
+            IMPORT_JOB_RUNNER="eager", MEDIA_ROOT=media_root.name
+        ):
+            self.client.post(reverse("mgmt:sales"), {"csv": csv_data})
+        lines = self.get_metrics()
+        self.assertIn("mgmt_csv_rows_imported_total 2", lines)
+        self.assertIn("mgmt_csv_rows_failed_total 1", lines)
@@ -0,0 +1,231 @@
+"""
+テストコードファイル
+
+- レプリカへの読み込みの振り分け
+- 書き込み直後の読み込みのプライマリへの固定
+- SQLiteのレプリカの更新
+"""
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from mgmt.management.commands import refresh_replica
+from mgmt.middleware import ReplicaPinMiddleware
+from mgmt.models import Fruit, ImportJob, Sales
+from mgmt.routers import ReplicaRouter, replica_state
+
+
+@override_settings(REPLICA_DATABASE_ALIAS="replica")
+class ReplicaRouterTest(TestCase):
+    """レプリカへの読み込みの振り分けのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.router = ReplicaRouter()
+        self.state = {"use_primary": False, "written": False}
+        self.token = replica_state.set(self.state)
+
+    def tearDown(self):
+        """テスト後に状態を戻す"""
+        replica_state.reset(self.token)
+
+    def test_reporting_reads_use_replica(self):
+        """リクエスト中の販売情報, 販売集計の読み込みがレプリカになるかテスト"""
+        for model in (Sales, Fruit):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.router.db_for_read(model), "replica")
+
+    def test_other_reads_use_primary(self):
+        """ユーザー, CSVインポートジョブの読み込みがプライマリになるかテスト"""
+        for model in (User, ImportJob):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.router.db_for_read(model), "default")
+
+    def test_reads_outside_request_use_primary(self):
+        """リクエスト外の読み込みがプライマリになるかテスト"""
+        replica_state.set(None)
+        self.assertEqual(self.router.db_for_read(Sales), "default")
+
+    def test_reads_after_write_use_primary(self):
+        """書き込み後の読み込みがプライマリになるかテスト"""
+        self.assertEqual(self.router.db_for_write(Sales), "default")
+        self.assertTrue(self.state["written"])
+        self.assertEqual(self.router.db_for_read(Sales), "default")
+
+    def test_pinned_reads_use_primary(self):
+        """プライマリに固定したリクエストの読み込みがプライマリになるかテスト"""
+        self.state["use_primary"] = True
+        self.assertEqual(self.router.db_for_read(Sales), "default")
+
+    def test_migrate_only_primary(self):
+        """マイグレーションがプライマリのみに許可されるかテスト"""
+        self.assertTrue(self.router.allow_migrate("default", "mgmt"))
+        self.assertFalse(self.router.allow_migrate("replica", "mgmt"))
+
+
+@override_settings(REPLICA_DATABASE_ALIAS="replica", REPLICA_PIN_SECONDS=10)
+class ReplicaPinMiddlewareTest(TestCase):
+    """書き込み直後の読み込みのプライマリへの固定のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.factory = RequestFactory()
+        self.states = []
+
+    def get_response(self, write=False):
+        """リクエスト中の状態を記録し、writeの場合は書き込むビューを生成"""
+
+        def view(request):
+            if write:
+                ReplicaRouter().db_for_write(Sales)
+
+            self.states.append(dict(replica_state.get() or {}))
+            return HttpResponse()
+
+        return view
+
+    def test_write_sets_pin_cookie(self):
+        """販売情報を書き込んだ場合、固定用のCookieが設定されるかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_response(write=True))
+        response = middleware(self.factory.post("/sales/create/"))
+        cookie = response.cookies[ReplicaPinMiddleware.cookie_name]
+        self.assertEqual(cookie["max-age"], 10)
+        self.assertIsNone(replica_state.get())
+
+    def get_streaming_response(self):
+        """内容の生成中の状態を記録するストリーミングレスポンスのビューを生成"""
+
+        def iter_content():
+            self.states.append(dict(replica_state.get() or {}))
+            yield b""
+
+        def view(request):
+            return StreamingHttpResponse(iter_content())
+
+        return view
+
+    def test_streaming_response_keeps_state_until_close(self):
+        """ストリーミングレスポンスの内容の生成中も状態が残り、closeで戻るかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_streaming_response())
+        response = middleware(self.factory.get("/sales/export/"))
+        b"".join(response.streaming_content)
+        self.assertEqual(
+            self.states, [{"use_primary": False, "written": False}]
+        )
+        response.close()
+        self.assertIsNone(replica_state.get())
+
+    def test_unread_streaming_response_resets_state_on_close(self):
+        """内容を生成せずにcloseした場合も状態が戻るかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_streaming_response())
+        response = middleware(self.factory.get("/sales/export/"))
+        self.assertIsNotNone(replica_state.get())
+        response.close()
+        self.assertIsNone(replica_state.get())
+        self.assertEqual(self.states, [])
+
+    async def test_streaming_response_keeps_state_in_async(self):
+        """非同期の場合も、ストリーミングレスポンスの状態がcloseまで残るかテスト"""
+
+        async def get_response(request):
+            return await sync_to_async(self.get_streaming_response())(request)
+
+        middleware = ReplicaPinMiddleware(get_response)
+        response = await middleware(self.factory.get("/sales/export/"))
+        await sync_to_async(list, thread_sensitive=True)(response)
+        self.assertEqual(
+            self.states, [{"use_primary": False, "written": False}]
+        )
+        await sync_to_async(response.close, thread_sensitive=True)()
+        self.assertIsNone(replica_state.get())
+
+    def test_read_does_not_set_pin_cookie(self):
+        """読み込みのみの場合、固定用のCookieが設定されないかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_response())
+        response = middleware(self.factory.get("/sales/"))
+        self.assertNotIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+        self.assertFalse(self.states[0]["use_primary"])
+
+    def test_pin_cookie_uses_primary(self):
+        """固定用のCookieがある場合、プライマリから読み込むかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_response())
+        request = self.factory.get("/sales/")
+        request.COOKIES[ReplicaPinMiddleware.cookie_name] = "1"
+        middleware(request)
+        self.assertTrue(self.states[0]["use_primary"])
+
+    def test_unsafe_method_uses_primary(self):
+        """POSTの場合、プライマリから読み込むかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_response())
+        middleware(self.factory.post("/sales/"))
+        self.assertTrue(self.states[0]["use_primary"])
+
+    @override_settings(REPLICA_DATABASE_ALIAS="default")
+    def test_without_replica_does_nothing(self):
+        """レプリカを使わない場合、状態を設定しないかテスト"""
+        middleware = ReplicaPinMiddleware(self.get_response(write=True))
+        response = middleware(self.factory.post("/sales/create/"))
+        self.assertEqual(self.states, [{}])
+        self.assertNotIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+
+    def test_sales_create_sets_pin_cookie(self):
+        """販売情報の登録後、固定用のCookieが設定されるかテスト"""
+        user = User.objects.create_user(username="test", password="test")
+        fruit = Fruit.objects.create(name="リンゴ", price=100)
+        self.client.force_login(user)
+        response = self.client.post(
+            "/sales/create/",
+            {
+                "fruit": fruit.pk,
+                "quantity": 1,
+                "sale_date": "2023-03-01 10:00",
+            },
+        )
+        self.assertIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+
+
+class RefreshReplicaTest(TransactionTestCase):
+    """
+    SQLiteのレプリカの更新のテスト
+    ※バックアップAPIはコミット済みの内容を複製するため、
+      トランザクションで囲まないTransactionTestCaseを使う
+    """
+
+    def test_without_replica_raises_error(self):
+        """レプリカが設定されていない場合、エラーになるかテスト"""
+        with self.assertRaises(CommandError):
+            call_command("refresh_replica", stdout=io.StringIO())
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite only")
+    def test_copy_database(self):
+        """プライマリの内容がレプリカのファイルに複製されるかテスト"""
+        Fruit.objects.create(name="リンゴ", price=100)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_path = os.path.join(tmp_dir, "replica.sqlite3")
+            refresh_replica.Command().copy_database(target_path)
+            target = sqlite3.connect(target_path)
+
+            try:
+                names = target.execute(
+                    "SELECT name FROM mgmt_fruit"
+                ).fetchall()
+            finally:
+                target.close()
+
+        self.assertEqual(names, [("リンゴ",)])
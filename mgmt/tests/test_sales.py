@@ -1,18 +1,26 @@
 """
 テストコードファイル
 
-- 販売情報管理(一覧, 一覧[CSVインポート], 登録, 編集, 削除)
+- 販売情報管理(一覧, 一覧[CSVインポート], CSVエクスポート, 登録, 編集, 削除)
 """
 import datetime
+import gzip
+import io
+import tempfile
+import zipfile
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 from django.utils import timezone
 
-from mgmt.forms import SalesCSVForm
-from mgmt.models import Fruit, Sales
+from mgmt.forms import SalesCSVForm, SalesCSVRowValidator
+from mgmt.models import DailySalesSummary, Fruit, Sales
 from mgmt.views import sales_view
 
 
@@ -92,6 +100,25 @@ class SalesListTest(TestCase):
             timezone.localtime(self.sales.sale_date).strftime("%Y-%m-%d"),
         )
 
+    def test_query_count_does_not_grow_with_rows(self):
+        """
+        Salesの件数が増えてもクエリ数が一定かテスト
+        (Sales+果物, CSVインポートジョブ)
+        ※セッション, ユーザーは1回目の表示でキャッシュされる
+        """
+        self.client.get(self.sales_path)
+
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                self.client.get(self.sales_path)
+
+            for quantity in range(10):
+                Sales.objects.create(
+                    fruit=Fruit.objects.create(name="メロン", price=500),
+                    quantity=quantity,
+                    total=500 * quantity,
+                )
+
     def test_redirect_expected_page_when_logged_out(self):
         """未ログインの場合、ログインページにリダイレクトされるかテスト"""
         self.client.logout()
@@ -104,11 +131,129 @@ class SalesListTest(TestCase):
         )
 
 
+@mock.patch.object(sales_view.SalesListView, "paginate_by", 2)
+class SalesListPaginationTest(TestCase):
+    """販売情報管理(一覧)のキーセットページ分割のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        sale_date = timezone.now()
+        self.sales_list = [
+            Sales.objects.create(
+                fruit=self.fruit,
+                quantity=i,
+                total=100 * i,
+                sale_date=sale_date - datetime.timedelta(days=i // 2),
+            )
+            for i in range(5)
+        ]
+        self.newest_first = sorted(
+            self.sales_list,
+            key=lambda sales: (sales.sale_date, sales.pk),
+            reverse=True,
+        )
+        self.sales_path = reverse("mgmt:sales")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_first_page_shows_newest_sales(self):
+        """最初のページに新しい順でpaginate_by件表示されるかテスト"""
+        response = self.client.get(self.sales_path)
+        self.assertEqual(
+            list(response.context["sales_list"]),
+            self.newest_first[:2],
+        )
+        self.assertIsNone(response.context["previous_cursor"])
+        self.assertIsNotNone(response.context["next_cursor"])
+
+    def test_next_cursor_walks_all_sales(self):
+        """次ページのカーソルを辿ると全てのSalesが重複なく表示されるかテスト"""
+        response = self.client.get(self.sales_path)
+        shown = list(response.context["sales_list"])
+
+        while response.context["next_cursor"]:
+            response = self.client.get(
+                self.sales_path,
+                {"after": response.context["next_cursor"]},
+            )
+            shown += list(response.context["sales_list"])
+        self.assertEqual(shown, self.newest_first)
+
+    def test_previous_cursor_returns_to_previous_page(self):
+        """前ページのカーソルで1つ前のページに戻れるかテスト"""
+        first_page = self.client.get(self.sales_path)
+        second_page = self.client.get(
+            self.sales_path,
+            {"after": first_page.context["next_cursor"]},
+        )
+        response = self.client.get(
+            self.sales_path,
+            {"before": second_page.context["previous_cursor"]},
+        )
+        self.assertEqual(
+            list(response.context["sales_list"]),
+            self.newest_first[:2],
+        )
+
+    def test_out_of_range_cursor_shows_first_page(self):
+        """範囲外の日時, IDのカーソルの場合、最初のページが表示されるかテスト"""
+        for cursor in (
+            "99999999999999999999_1",
+            "-99999999999999999999_1",
+            "0_99999999999999999999",
+        ):
+            response = self.client.get(self.sales_path, {"after": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                list(response.context["sales_list"]),
+                self.newest_first[:2],
+            )
+
+    def test_deep_page_uses_keyset_instead_of_offset(self):
+        """後ろのページもOFFSETを使わず1クエリで取得されるかテスト"""
+        first_page = self.client.get(self.sales_path)
+        second_page = self.client.get(
+            self.sales_path,
+            {"after": first_page.context["next_cursor"]},
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(
+                self.sales_path,
+                {"after": second_page.context["next_cursor"]},
+            )
+        sales_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "mgmt_sales"')
+        ]
+        self.assertEqual(len(sales_queries), 1)
+        self.assertNotIn("OFFSET", sales_queries[0])
+
+
 class SalesListCSVImportTest(TestCase):
     """販売情報管理(一覧)CSVインポートのテスト"""
 
     def setUp(self):
         """テストデータの初期設定"""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(
+            IMPORT_JOB_RUNNER="eager",
+            MEDIA_ROOT=media_root.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
         self.user = User.objects.create_user(
             username="test_user",
             password="test_password",
@@ -298,6 +443,384 @@ class SalesListCSVImportTest(TestCase):
             ).replace(tzinfo=self.jst),
         )
 
+    def test_error_reports_line_number_of_unknown_fruit(self):
+        """マスタ未登録の果物の行番号がエラーメッセージに含まれるかテスト"""
+        file_content = (
+            "リンゴ,3,300,2016-02-01 10:35\n" "メロン,5,250,2016-02-02 10:30"
+        ).encode("utf-8")
+
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.is_valid()
+        form.save_csv(csv_data)
+        self.assertEqual(
+            form.errors["csv"],
+            ["CSVデータ2行目の果物が見つかりませんでした。"],
+        )
+
+    def test_row_error_logs_are_limited(self):
+        """行ごとのエラーログがrow_log_limit行までに抑えられるかテスト"""
+        file_content = "\n".join(
+            f"メロン,5,250,2016-02-02 10:{minute:02}" for minute in range(5)
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.row_log_limit = 2
+        form.is_valid()
+
+        with self.assertLogs(level="WARNING") as logs:
+            form.save_csv(csv_data)
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn(
+            "エラー5行のうち、3行のログを省略しました", logs.output[-1]
+        )
+        self.assertEqual(len(form.errors["csv"]), 5)
+
+    def test_fruit_lookup_queries_do_not_grow_with_rows(self):
+        """
+        CSVの行数が増えても果物検索のクエリが1回のままかテスト
+        ※重複判定前の果物の行ロック(バッチごと)は除く
+        """
+
+        for rows in (2, 200):
+            file_content = "\n".join(
+                [
+                    "リンゴ,3,300,2016-02-01 10:35",
+                    "オレンジ,5,250,2016-02-02 10:30",
+                ]
+                * (rows // 2)
+            ).encode("utf-8")
+            csv_data = SimpleUploadedFile(
+                self.csv_filename, file_content, self.content_type
+            )
+            form = SalesCSVForm({}, {"csv": csv_data})
+            form.is_valid()
+
+            with CaptureQueriesContext(connection) as context:
+                form.save_csv(csv_data)
+            fruit_queries = [
+                query
+                for query in context.captured_queries
+                if 'FROM "mgmt_fruit"' in query["sql"]
+                and '"mgmt_fruit"."id" IN' not in query["sql"]
+            ]
+            self.assertEqual(len(fruit_queries), 1)
+
+    def test_csv_data_saved_in_batches(self):
+        """CSVデータがbatch_size件ずつ分割してINSERTされるかテスト"""
+        file_content = "\n".join(
+            f"リンゴ,3,300,2016-02-01 10:{minute:02}" for minute in range(5)
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.batch_size = 2
+        form.is_valid()
+
+        with CaptureQueriesContext(connection) as context:
+            form.save_csv(csv_data)
+        sales_inserts = [
+            query
+            for query in context.captured_queries
+            if 'INTO "mgmt_sales"' in query["sql"]
+        ]
+        self.assertEqual(len(sales_inserts), 3)
+        self.assertEqual(Sales.objects.count(), 5)
+
+    def test_parallel_parsing_matches_serial_parsing(self):
+        """複数プロセスでのフォーマット結果と行番号が直列の場合と一致するかテスト"""
+        file_content = "\n".join(
+            [
+                "リンゴ,3,300,2016-02-01 10:35",
+                "メロン,5,250,2016-02-02 10:30",
+                "オレンジ,TEST,250,2016-02-02 10:30",
+                "オレンジ,5,250,2016-02-03 10:30",
+            ]
+            * 3
+        ).encode("utf-8")
+        results = []
+
+        for processes in (1, 2):
+            Sales.objects.all().delete()
+            csv_data = SimpleUploadedFile(
+                self.csv_filename, file_content, self.content_type
+            )
+            form = SalesCSVForm({}, {"csv": csv_data})
+            form.parse_chunk_size = 40
+            form.is_valid()
+
+            with self.settings(IMPORT_PARSE_PROCESSES=processes):
+                form.save_csv(csv_data)
+            results.append(
+                (
+                    list(form.errors["csv"]),
+                    form.rows_processed,
+                    form.rows_failed,
+                    list(
+                        Sales.objects.order_by("pk").values_list(
+                            "fruit", "quantity", "total", "sale_date"
+                        )
+                    ),
+                )
+            )
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(
+            results[1][0][-2:],
+            [
+                "CSVデータ10行目の果物が見つかりませんでした。",
+                "CSVデータ11行目の個数に数値以外が入力されています",
+            ],
+        )
+        self.assertEqual(len(results[1][3]), 2)
+
+    def test_reimport_same_csv_data_is_noop(self):
+        """同じCSVデータを再インポートしても販売情報が増えないかテスト"""
+        file_content = (
+            "リンゴ,3,300,2016-02-01 10:35\n" "オレンジ,5,250,2016-02-02 10:30"
+        ).encode("utf-8")
+
+        for _ in range(2):
+            csv_data = SimpleUploadedFile(
+                self.csv_filename, file_content, self.content_type
+            )
+            self.client.post(self.sales_path, {"csv": csv_data})
+        self.assertEqual(Sales.objects.count(), 2)
+        self.assertEqual(
+            DailySalesSummary.objects.aggregate(Sum("total"))["total__sum"],
+            550,
+        )
+
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.is_valid()
+
+        with CaptureQueriesContext(connection) as context:
+            form.save_csv(csv_data)
+        self.assertEqual(form.rows_skipped, 2)
+        self.assertFalse(
+            [
+                query
+                for query in context.captured_queries
+                if query["sql"].startswith("INSERT")
+            ]
+        )
+
+    def test_full_batch_stays_within_query_param_limit(self):
+        """batch_size行のバッチでも、クエリのパラメータ数がDBの上限以下かテスト"""
+        batch_size = SalesCSVForm.batch_size
+        sale_date = datetime.datetime(2016, 2, 1)
+        file_content = "\n".join(
+            "リンゴ,1,100,"
+            f"{sale_date + datetime.timedelta(minutes=minutes):%Y-%m-%d %H:%M}"
+            for minutes in range(batch_size)
+        ).encode("utf-8")
+        params_counts = []
+
+        def record_params_count(execute, sql, params, many, context):
+            if not many:
+                params_counts.append(len(params or ()))
+            return execute(sql, params, many, context)
+
+        for _ in range(2):
+            csv_data = SimpleUploadedFile(
+                self.csv_filename, file_content, self.content_type
+            )
+            form = SalesCSVForm({}, {"csv": csv_data})
+            form.is_valid()
+
+            with connection.execute_wrapper(record_params_count):
+                form.save_csv(csv_data)
+        self.assertEqual(Sales.objects.count(), batch_size)
+        self.assertEqual(form.rows_skipped, batch_size)
+
+        # 上限の無いDB(PostgreSQL)は分割しない
+        if connection.features.max_query_params is not None:
+            self.assertLessEqual(
+                max(params_counts), connection.features.max_query_params
+            )
+
+    def test_duplicate_rows_in_csv_data_are_skipped(self):
+        """CSVデータ内で重複する行が1件だけ登録されるかテスト"""
+        file_content = "\n".join(
+            ["リンゴ,3,300,2016-02-01 10:35"] * 3
+            + ["リンゴ,3,300,2016-02-01 10:36"]
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.batch_size = 2
+        form.is_valid()
+        form.save_csv(csv_data)
+        self.assertEqual(Sales.objects.count(), 2)
+        self.assertEqual(form.rows_skipped, 2)
+        self.assertEqual(
+            DailySalesSummary.objects.get(fruit=self.fruit_apple).count, 2
+        )
+
+    def get_zip_content(self, files):
+        """{ファイル名: 内容}の辞書からZIPファイルの内容を生成"""
+        buffer = io.BytesIO()
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, content in files.items():
+                archive.writestr(name, content)
+        return buffer.getvalue()
+
+    def test_import_gzip_csv_data(self):
+        """gzipで圧縮したCSVデータがインポートされるかテスト"""
+        file_content = gzip.compress(
+            (
+                "リンゴ,3,300,2016-02-01 10:35\n"
+                "オレンジ,5,250,2016-02-02 10:30"
+            ).encode("utf-8")
+        )
+        csv_data = SimpleUploadedFile("test.csv.gz", file_content)
+        self.client.post(self.sales_path, {"csv": csv_data})
+        self.assertEqual(
+            list(
+                Sales.objects.order_by("sale_date").values_list(
+                    "fruit__name", "quantity"
+                )
+            ),
+            [("リンゴ", 3), ("オレンジ", 5)],
+        )
+
+    def test_import_zip_with_multiple_csv_files(self):
+        """ZIPファイル内の複数のCSVファイルが格納順にインポートされるかテスト"""
+        file_content = self.get_zip_content(
+            {
+                "2016-02.csv": "リンゴ,3,300,2016-02-01 10:35",
+                "readme.txt": "説明",
+                "__MACOSX/._2016-03.csv": "",
+                "2016-03.csv": "メロン,5,250,2016-03-02 10:30\n"
+                "オレンジ,5,250,2016-03-02 10:30\n",
+            }
+        )
+        csv_data = SimpleUploadedFile("test.zip", file_content)
+        form = SalesCSVForm({}, {"csv": csv_data})
+        self.assertTrue(form.is_valid())
+        form.save_csv(csv_data)
+        self.assertEqual(Sales.objects.count(), 2)
+        self.assertEqual(form.rows_processed, 3)
+        self.assertEqual(
+            form.errors["csv"],
+            ["CSVデータ2行目の果物が見つかりませんでした。"],
+        )
+
+    def test_parallel_parsing_of_compressed_csv_data(self):
+        """圧縮したCSVデータを複数プロセスでフォーマットした結果が一致するかテスト"""
+        file_contents = {
+            "test.csv.gz": gzip.compress(
+                "リンゴ,3,300,2016-02-01 10:35\n"
+                "メロン,5,250,2016-02-02 10:30".encode("utf-8")
+            ),
+            "test.zip": self.get_zip_content(
+                {
+                    "a.csv": "リンゴ,3,300,2016-02-01 10:35",
+                    "b.csv": "メロン,5,250,2016-02-02 10:30",
+                }
+            ),
+        }
+
+        for filename, file_content in file_contents.items():
+            with self.subTest(filename=filename):
+                Sales.objects.all().delete()
+                csv_data = SimpleUploadedFile(filename, file_content)
+                form = SalesCSVForm({}, {"csv": csv_data})
+                form.parse_chunk_size = 10
+                form.is_valid()
+
+                with self.settings(IMPORT_PARSE_PROCESSES=2):
+                    form.save_csv(csv_data)
+                self.assertEqual(Sales.objects.count(), 1)
+                self.assertEqual(
+                    form.errors["csv"],
+                    ["CSVデータ2行目の果物が見つかりませんでした。"],
+                )
+
+    def test_invalid_compressed_file_is_invalid(self):
+        """gzip, ZIPの形式が不正な場合、バリデーションを通過しないかテスト"""
+        for filename, file_content in (
+            ("test.csv.gz", b"not gzip"),
+            ("test.txt.gz", gzip.compress("説明".encode("utf-8"))),
+            ("test.gz", gzip.compress(b"")),
+            ("test.zip", b"not zip"),
+            ("test.zip", self.get_zip_content({"readme.txt": "説明"})),
+            ("test.txt.bz2", b"BZh"),
+        ):
+            with self.subTest(filename=filename):
+                csv_data = SimpleUploadedFile(filename, file_content)
+                form = SalesCSVForm({}, {"csv": csv_data})
+                self.assertFalse(form.is_valid())
+
+    def import_with_engine(self, file_content, engine):
+        """IMPORT_ENGINEを指定してCSVデータを保存し、保存内容を取得"""
+        Sales.objects.all().delete()
+        DailySalesSummary.objects.all().delete()
+        csv_data = SimpleUploadedFile(
+            self.csv_filename, file_content, self.content_type
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.batch_size = 2
+        form.is_valid()
+
+        with self.settings(IMPORT_ENGINE=engine):
+            form.save_csv(csv_data)
+        sales_list = list(
+            Sales.objects.order_by("sale_date", "fruit").values_list(
+                "fruit", "quantity", "total", "sale_date", "import_hash"
+            )
+        )
+        summaries = list(
+            DailySalesSummary.objects.order_by("period", "fruit").values_list(
+                "fruit", "period", "total", "quantity", "count"
+            )
+        )
+        return sales_list, summaries, form.rows_failed, form.rows_skipped
+
+    def test_raw_engine_matches_orm_engine(self):
+        """IMPORT_ENGINE=rawの保存内容がormと一致するかテスト"""
+        file_content = "\n".join(
+            [
+                "リンゴ,3,300,2016-02-01 10:35",
+                "オレンジ,5,250,2016-02-01 23:30",
+                "リンゴ,3,300,2016-02-01 10:35",
+                "メロン,5,250,2016-02-02 10:30",
+                "リンゴ,1,100,2016-03-01 00:05",
+            ]
+        ).encode("utf-8")
+        orm_result = self.import_with_engine(file_content, "orm")
+        raw_result = self.import_with_engine(file_content, "raw")
+        self.assertEqual(raw_result, orm_result)
+        self.assertEqual(
+            raw_result[0][0][3],
+            datetime.datetime(2016, 2, 1, 10, 35, tzinfo=self.jst),
+        )
+
+    def test_raw_engine_uses_executemany(self):
+        """IMPORT_ENGINE=rawの場合、バッチごとに1回INSERTされるかテスト"""
+        file_content = "\n".join(
+            f"リンゴ,3,300,2016-02-01 10:{minute:02}" for minute in range(5)
+        ).encode("utf-8")
+
+        with CaptureQueriesContext(connection) as context:
+            self.import_with_engine(file_content, "raw")
+        sales_inserts = [
+            query
+            for query in context.captured_queries
+            if 'INTO "mgmt_sales"' in query["sql"]
+        ]
+        self.assertEqual(len(sales_inserts), 3)
+        self.assertEqual(Sales.objects.count(), 5)
+
     def allowed_file_type_is_valid_true(self):
         """許可されたファイル形式の場合は、バリデーションを通過することをテスト"""
         file_content = (
@@ -327,6 +850,220 @@ class SalesListCSVImportTest(TestCase):
         self.assertFalse(form.is_valid())
 
 
+class SalesCSVRowValidatorTest(TestCase):
+    """CSVデータの行のフォーマット(バリデーション)のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.fruit = Fruit(pk=1, name="リンゴ", price=100)
+        self.validator = SalesCSVRowValidator(
+            {"リンゴ": self.fruit, "オレンジ": None}
+        )
+        self.jst = datetime.timezone(datetime.timedelta(hours=9))
+
+    def test_validate_valid_record(self):
+        """正しい行がSales生成の為の引数に変換されるかテスト"""
+        format_csv = self.validator.validate(
+            ["リンゴ", "3", "300", "2016-02-01 10:35"]
+        )
+        self.assertEqual(
+            tuple(format_csv),
+            (
+                self.fruit,
+                3,
+                300,
+                datetime.datetime(2016, 2, 1, 10, 35, tzinfo=self.jst),
+            ),
+        )
+
+    def test_error_messages(self):
+        """不正な行のエラーメッセージが変わらないかテスト"""
+        for record, error_class, message in (
+            (
+                ["リンゴ", "TEST", "300", "2016-02-01 10:35"],
+                ValueError,
+                "個数に数値以外が入力されています",
+            ),
+            (
+                ["リンゴ", "3", "-300", "2016-02-01 10:35"],
+                ValueError,
+                "売り上げに数値以外が入力されています",
+            ),
+            (
+                ["リンゴ", "3", "300", "2016/02/01 10:35"],
+                ValueError,
+                "販売日時が YYYY-MM-DD HH:MM 形式になっていません",
+            ),
+            (
+                ["リンゴ", "3", "300", "2016-02-01 10:35\n"],
+                ValueError,
+                "販売日時が YYYY-MM-DD HH:MM 形式になっていません",
+            ),
+            (
+                ["リンゴ", "3", "300", "2016-13-01 10:35"],
+                ValueError,
+                "month must be in 1..12",
+            ),
+            (
+                ["メロン", "3", "300", "2016-02-01 10:35"],
+                Fruit.DoesNotExist,
+                "Fruit matching name='メロン' not found",
+            ),
+            (
+                ["オレンジ", "3", "300", "2016-02-01 10:35"],
+                Fruit.MultipleObjectsReturned,
+                "Multiple fruits matching name='オレンジ' found",
+            ),
+            (["リンゴ", "3"], IndexError, "list index out of range"),
+        ):
+            with self.subTest(record=record):
+                with self.assertRaisesMessage(error_class, message):
+                    self.validator.validate(record)
+
+    def test_parse_sale_date_matches_fromisoformat(self):
+        """販売日時の変換がfromisoformatと一致するかテスト"""
+        for value in (
+            "2016-02-01 10:35",
+            "2016-02-29 23:59",
+            "0001-01-01 00:00",
+            "２０１６-02-01 10:35",
+        ):
+            with self.subTest(value=value):
+                try:
+                    expected = datetime.datetime.fromisoformat(value).replace(
+                        tzinfo=self.jst
+                    )
+                except ValueError as e:
+                    with self.assertRaisesMessage(ValueError, str(e)):
+                        self.validator.parse_sale_date(value)
+                else:
+                    self.assertEqual(
+                        self.validator.parse_sale_date(value), expected
+                    )
+
+
+class SalesExportTest(TestCase):
+    """販売情報CSVエクスポートのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.fruit_apple = Fruit.objects.create(name="リンゴ", price=100)
+        self.fruit_orange = Fruit.objects.create(name="オレンジ", price=50)
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        for fruit, quantity, sale_date in (
+            (self.fruit_apple, 3, datetime.datetime(2016, 2, 1, 0, 35)),
+            (self.fruit_orange, 5, datetime.datetime(2016, 2, 2, 10, 30)),
+            (self.fruit_apple, 1, datetime.datetime(2016, 3, 1, 9, 0)),
+        ):
+            Sales.objects.create(
+                fruit=fruit,
+                quantity=quantity,
+                total=fruit.price * quantity,
+                sale_date=sale_date.replace(tzinfo=jst),
+            )
+        self.login_path = reverse("mgmt:login")
+        self.export_path = reverse("mgmt:sales_export")
+        self.expected_path = self.login_path + "?next=" + self.export_path
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def get_csv(self, params):
+        """エクスポートしたCSVを文字列で取得"""
+        response = self.client.get(self.export_path, params)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_uses_expected_view(self):
+        """URLパスとビューがマッピングされているかテスト"""
+        view = resolve(self.export_path)
+        self.assertEqual(view.func.view_class, sales_view.SalesExportView)
+
+    def test_redirect_expected_page_when_logged_out(self):
+        """未ログインの場合、ログインページにリダイレクトされるかテスト"""
+        self.client.logout()
+        response = self.client.get(self.export_path)
+        self.assertRedirects(
+            response,
+            self.expected_path,
+            status_code=302,
+            target_status_code=200,
+        )
+
+    def test_export_csv_in_import_format(self):
+        """CSVインポートと同じ形式(販売日時はJST)で出力されるかテスト"""
+        response = self.client.get(
+            self.export_path, {"from": "2016-02-01", "to": "2016-02-29"}
+        )
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="sales_20160201_20160229.csv"',
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content).decode("utf-8"),
+            "リンゴ,3,300,2016-02-01 00:35\r\n"
+            "オレンジ,5,250,2016-02-02 10:30\r\n",
+        )
+
+    def test_export_csv_with_fruit_filter(self):
+        """果物で絞り込めるかテスト"""
+        csv_text = self.get_csv(
+            {
+                "from": "2016-02-01",
+                "to": "2016-03-31",
+                "fruit": [self.fruit_apple.pk],
+            }
+        )
+        self.assertEqual(
+            csv_text,
+            "リンゴ,3,300,2016-02-01 00:35\r\n"
+            "リンゴ,1,100,2016-03-01 09:00\r\n",
+        )
+
+    def test_exported_csv_can_be_imported(self):
+        """エクスポートしたCSVがそのままインポートできるかテスト"""
+        csv_text = self.get_csv({"from": "2016-02-01", "to": "2016-03-31"})
+        csv_data = SimpleUploadedFile(
+            "test.csv", csv_text.encode("utf-8"), "text/csv"
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        self.assertTrue(form.is_valid())
+        form.save_csv(csv_data)
+        self.assertEqual(form.rows_failed, 0)
+        self.assertEqual(Sales.objects.count(), 6)
+
+    def test_export_csv_is_streamed_in_chunks(self):
+        """chunk_size行ごとに分割して送信されるかテスト"""
+        with mock.patch.object(sales_view.SalesExportView, "chunk_size", 1):
+            response = self.client.get(
+                self.export_path, {"from": "2016-02-01", "to": "2016-03-31"}
+            )
+            chunks = list(response.streaming_content)
+        self.assertEqual(len([chunk for chunk in chunks if chunk]), 3)
+
+    def test_invalid_parameters_return_400(self):
+        """不正な絞り込み条件の場合、ステータスコード400が返ってくるかテスト"""
+        response = self.client.get(
+            self.export_path, {"from": "2016-03-01", "to": "2016-02-01"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_dates_return_400(self):
+        """日時に変換できない期間の場合、ステータスコード400が返ってくるかテスト"""
+        response = self.client.get(
+            self.export_path, {"from": "9999-12-01", "to": "9999-12-31"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
 class SalesCreateTest(TestCase):
     """販売情報管理(登録)のテスト"""
 
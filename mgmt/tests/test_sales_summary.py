@@ -0,0 +1,175 @@
+"""
+テストコードファイル
+
+- 販売集計(日別, 月別)の更新, 再生成
+"""
+import datetime
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from mgmt.cache import get_statistics_cache_key
+from mgmt.models import DailySalesSummary, Fruit, MonthlySalesSummary, Sales
+
+
+class SalesSummaryTest(TestCase):
+    """販売集計の更新のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(
+            IMPORT_JOB_RUNNER="eager",
+            MEDIA_ROOT=media_root.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.fruit_apple = Fruit.objects.create(name="リンゴ", price=100)
+        self.fruit_orange = Fruit.objects.create(name="オレンジ", price=50)
+        self.jst = datetime.timezone(datetime.timedelta(hours=9))
+        self.sale_date = datetime.datetime(2023, 3, 1, 0, 30, tzinfo=self.jst)
+        self.sales_path = reverse("mgmt:sales")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def get_daily_summary(self, fruit):
+        """2023/03/01(JST)の日別販売集計を取得"""
+        return DailySalesSummary.objects.get(
+            fruit=fruit,
+            period=datetime.date(2023, 3, 1),
+        )
+
+    def get_monthly_summary(self, fruit):
+        """2023/03(JST)の月別販売集計を取得"""
+        return MonthlySalesSummary.objects.get(
+            fruit=fruit,
+            period=datetime.date(2023, 3, 1),
+        )
+
+    def test_create_adds_to_summaries(self):
+        """登録したSalesがTIME_ZONE基準の日別, 月別集計に加算されるかテスト"""
+        request = {
+            "fruit": self.fruit_apple.pk,
+            "quantity": 2,
+            "sale_date": self.sale_date,
+        }
+        self.client.post(reverse("mgmt:sales_create"), request)
+        self.client.post(reverse("mgmt:sales_create"), request)
+        daily_summary = self.get_daily_summary(self.fruit_apple)
+        monthly_summary = self.get_monthly_summary(self.fruit_apple)
+        self.assertEqual(
+            (daily_summary.total, daily_summary.quantity, daily_summary.count),
+            (400, 4, 2),
+        )
+        self.assertEqual(
+            (monthly_summary.total, monthly_summary.quantity),
+            (400, 4),
+        )
+
+    def test_update_moves_summaries(self):
+        """編集したSalesの編集前の値が差し引かれ、編集後の値が加算されるかテスト"""
+        sales = Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=3,
+            total=300,
+            sale_date=self.sale_date,
+        )
+        request = {
+            "fruit": self.fruit_orange.pk,
+            "quantity": 2,
+            "sale_date": self.sale_date,
+        }
+        self.client.post(
+            reverse("mgmt:sales_update", kwargs={"pk": sales.pk}),
+            request,
+        )
+        self.assertFalse(
+            DailySalesSummary.objects.filter(fruit=self.fruit_apple).exists()
+        )
+        self.assertEqual(self.get_daily_summary(self.fruit_orange).total, 100)
+        self.assertEqual(
+            self.get_monthly_summary(self.fruit_orange).quantity, 2
+        )
+
+    def test_delete_subtracts_from_summaries(self):
+        """削除したSalesが日別, 月別集計から差し引かれるかテスト"""
+        Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=1,
+            total=100,
+            sale_date=self.sale_date,
+        )
+        sales = Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=3,
+            total=300,
+            sale_date=self.sale_date,
+        )
+        self.client.post(reverse("mgmt:sales_delete", kwargs={"pk": sales.pk}))
+        self.assertEqual(self.get_daily_summary(self.fruit_apple).total, 100)
+        self.assertEqual(self.get_monthly_summary(self.fruit_apple).count, 1)
+
+    def test_csv_import_adds_to_summaries(self):
+        """CSVインポートしたSalesが日別, 月別集計に加算されるかテスト"""
+        file_content = (
+            "リンゴ,3,300,2023-03-01 00:30\n" "リンゴ,5,500,2023-03-01 10:30"
+        ).encode("utf-8")
+        csv_data = SimpleUploadedFile("test.csv", file_content, "text/csv")
+        self.client.post(self.sales_path, {"csv": csv_data})
+        self.assertEqual(self.get_daily_summary(self.fruit_apple).total, 800)
+        self.assertEqual(
+            self.get_monthly_summary(self.fruit_apple).quantity, 8
+        )
+
+    def test_rebuild_command_restores_summaries(self):
+        """再生成コマンドで販売集計がSalesから復元されるかテスト"""
+        Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=3,
+            total=300,
+            sale_date=self.sale_date,
+        )
+        Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=1,
+            total=100,
+            sale_date=self.sale_date - datetime.timedelta(hours=1),
+        )
+        DailySalesSummary.objects.all().delete()
+        MonthlySalesSummary.objects.all().delete()
+        call_command("rebuild_sales_summary", stdout=io.StringIO())
+        self.assertEqual(self.get_daily_summary(self.fruit_apple).total, 300)
+        self.assertEqual(
+            DailySalesSummary.objects.get(
+                fruit=self.fruit_apple,
+                period=datetime.date(2023, 2, 28),
+            ).total,
+            100,
+        )
+        self.assertEqual(self.get_monthly_summary(self.fruit_apple).total, 300)
+
+    def test_rebuild_command_invalidates_statistics_cache(self):
+        """再生成コマンドで販売統計情報のキャッシュが無効化されるかテスト"""
+        cache.clear()
+        cache_key = get_statistics_cache_key()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_sales_summary", stdout=io.StringIO())
+
+        self.assertNotEqual(get_statistics_cache_key(), cache_key)
@@ -4,12 +4,17 @@
 - 販売統計情報
 """
 import datetime
+from unittest import mock
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db.models import Sum
 from django.test import TestCase
 from django.urls import resolve, reverse
 
+from mgmt.cache import get_statistics_cache_key
+from mgmt.forms import SalesCSVForm
 from mgmt.models import Fruit, Sales
 from mgmt.views import statistics_view
 
@@ -67,6 +72,130 @@ class StatisticsTest(TestCase):
         )
 
 
+class StatisticsQueryCountTest(TestCase):
+    """販売統計情報のクエリ数のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.statistics_path = reverse("mgmt:statistics")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """
+        Salesと果物の件数が増えてもクエリ数が一定かテスト
+        (累計, 月別+果物, 日別+果物)
+        ※セッション, ユーザーはトップの表示でキャッシュされる
+        """
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        now = datetime.datetime.now(tz=jst)
+        self.client.get(reverse("mgmt:top"))
+
+        for _ in range(2):
+            with self.assertNumQueries(3):
+                self.client.get(self.statistics_path)
+
+            for days in range(10):
+                Sales.objects.create(
+                    fruit=Fruit.objects.create(name=f"果物{days}", price=100),
+                    quantity=1,
+                    total=100,
+                    sale_date=now - datetime.timedelta(days=days),
+                )
+
+
+class StatisticsCacheTest(TestCase):
+    """販売統計情報のキャッシュのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        self.fruit = Fruit.objects.create(name="リンゴ", price=100)
+        self.sales = Sales.objects.create(
+            fruit=self.fruit,
+            quantity=1,
+            total=100,
+        )
+        self.statistics_path = reverse("mgmt:statistics")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_repeated_page_load_does_not_aggregate(self):
+        """2回目以降の表示ではクエリが発行されないかテスト"""
+        self.client.get(self.statistics_path)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.statistics_path)
+        self.assertEqual(response.context["all_period_total"], 100)
+
+    def test_sales_write_invalidates_cache(self):
+        """Salesの登録でキャッシュが無効化されるかテスト"""
+        self.client.get(self.statistics_path)
+        Sales.objects.create(fruit=self.fruit, quantity=2, total=200)
+        response = self.client.get(self.statistics_path)
+        self.assertEqual(response.context["all_period_total"], 300)
+
+    def test_sales_delete_invalidates_cache(self):
+        """Salesの削除でキャッシュが無効化されるかテスト"""
+        self.client.get(self.statistics_path)
+        self.sales.delete()
+        response = self.client.get(self.statistics_path)
+        self.assertEqual(response.context["all_period_total"], 0)
+
+    def test_csv_import_invalidates_cache(self):
+        """CSVインポート(bulk_create)でキャッシュが無効化されるかテスト"""
+        self.client.get(self.statistics_path)
+        csv_data = SimpleUploadedFile(
+            "test.csv",
+            "リンゴ,3,300,2016-02-01 10:35".encode("utf-8"),
+            "text/csv",
+        )
+        form = SalesCSVForm({}, {"csv": csv_data})
+        form.is_valid()
+        form.save_csv(csv_data)
+        response = self.client.get(self.statistics_path)
+        self.assertEqual(response.context["all_period_total"], 400)
+
+    def test_fruit_rename_invalidates_cache(self):
+        """果物名の変更でキャッシュが無効化されるかテスト"""
+        self.client.get(self.statistics_path)
+        self.client.post(
+            reverse("mgmt:fruit_update", kwargs={"pk": self.fruit.pk}),
+            {"name": "青リンゴ", "price": 100},
+        )
+        response = self.client.get(self.statistics_path)
+        self.assertContains(response, "青リンゴ")
+
+    def test_cache_key_rolls_over_with_date(self):
+        """日付(TIME_ZONE基準)が変わるとキャッシュキーが変わるかテスト"""
+        cache_key = get_statistics_cache_key()
+
+        with mock.patch(
+            "mgmt.cache.timezone.localdate",
+            return_value=datetime.date(2000, 1, 1),
+        ):
+            self.assertNotEqual(get_statistics_cache_key(), cache_key)
+
+
 class StatisticsAllPeriodTest(TestCase):
     """販売統計情報(全期間)のテスト"""
 
@@ -418,3 +547,71 @@ class StatisticsDailyPeriodTest(TestCase):
         """日別の内訳の個数(2日前)の値が表示されるかテスト"""
         response = self.client.get(self.statistics_path)
         self.assertContains(response, self.sales_3.quantity)
+
+    def test_same_name_fruits_are_summed_in_breakdown(self):
+        """同名の果物(削除済みを含む)の内訳が名前ごとに合算されるかテスト"""
+        deleted_fruit = Fruit.objects.create(
+            name="リンゴ",
+            price=120,
+            is_deleted=True,
+        )
+        Sales.objects.create(
+            fruit=deleted_fruit,
+            quantity=2,
+            total=240,
+            sale_date=self.sales_1.sale_date,
+        )
+        response = self.client.get(self.statistics_path)
+        date = datetime.datetime.strftime(self.sales_1.sale_date, "%Y/%m/%d")
+        daily_sales = response.context["daily_sales"][date]
+        self.assertEqual(daily_sales["period_total"], 340)
+        self.assertEqual(
+            daily_sales["breakdown"]["リンゴ"],
+            {"total": 340, "quantity": 3},
+        )
+
+
+class StatisticsTimeZoneTest(TestCase):
+    """販売統計情報(TIME_ZONE基準での期間集計)のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        fruit_create_date = datetime.datetime(2022, 1, 1, tzinfo=jst)
+        self.fruit = Fruit.objects.create(
+            name="リンゴ",
+            price=100,
+            created_at=fruit_create_date,
+            updated_at=fruit_create_date,
+            is_deleted=False,
+        )
+        today = datetime.datetime.now(tz=jst).date()
+        self.sales = Sales.objects.create(
+            fruit=self.fruit,
+            quantity=7,
+            total=700,
+            sale_date=datetime.datetime.combine(
+                today, datetime.time(0, 30), tzinfo=jst
+            ),
+        )
+        self.statistics_path = reverse("mgmt:statistics")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_early_morning_sales_counted_in_jst_day(self):
+        """JSTの早朝(UTCでは前日)の販売が当日分として集計されるかテスト"""
+        response = self.client.get(self.statistics_path)
+        date = datetime.datetime.strftime(self.sales.sale_date, "%Y/%m/%d")
+        self.assertEqual(
+            response.context["daily_sales"][date]["breakdown"]["リンゴ"],
+            {"total": 700, "quantity": 7},
+        )
@@ -0,0 +1,202 @@
+"""
+テストコードファイル
+
+- 販売統計情報API(JSON)
+"""
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import resolve, reverse
+
+from mgmt.models import Fruit, Sales
+from mgmt.views import statistics_view
+
+
+class StatisticsAPITest(TestCase):
+    """販売統計情報APIのテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.client.force_login(self.user)
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        self.fruit_apple = Fruit.objects.create(name="リンゴ", price=100)
+        self.fruit_orange = Fruit.objects.create(name="オレンジ", price=50)
+        for fruit, quantity, sale_date in (
+            (self.fruit_apple, 1, datetime.datetime(2023, 3, 1, 0, 30)),
+            (self.fruit_apple, 2, datetime.datetime(2023, 3, 1, 0, 45)),
+            (self.fruit_orange, 3, datetime.datetime(2023, 3, 2, 10, 0)),
+            (self.fruit_apple, 4, datetime.datetime(2023, 4, 1, 9, 0)),
+        ):
+            Sales.objects.create(
+                fruit=fruit,
+                quantity=quantity,
+                total=fruit.price * quantity,
+                sale_date=sale_date.replace(tzinfo=jst),
+            )
+        self.login_path = reverse("mgmt:login")
+        self.api_path = reverse("mgmt:statistics_api")
+        self.expected_path = self.login_path + "?next=" + self.api_path
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+        Sales.objects.all().delete()
+        Fruit.objects.all().delete()
+
+    def test_uses_expected_view(self):
+        """URLパスとビューがマッピングされているかテスト"""
+        view = resolve(self.api_path)
+        self.assertEqual(
+            view.func.view_class,
+            statistics_view.StatisticsAPIView,
+        )
+
+    def test_redirect_expected_page_when_logged_out(self):
+        """未ログインの場合、ログインページにリダイレクトされるかテスト"""
+        self.client.logout()
+        response = self.client.get(self.api_path)
+        self.assertRedirects(
+            response,
+            self.expected_path,
+            status_code=302,
+            target_status_code=200,
+        )
+
+    def test_daily_statistics(self):
+        """日単位の集計結果(果物別の内訳)が返ってくるかテスト"""
+        response = self.client.get(
+            self.api_path,
+            {"from": "2023-03-01", "to": "2023-03-31"},
+        )
+        self.assertEqual(response.json()["total"], 450)
+        self.assertEqual(
+            response.json()["periods"],
+            [
+                {
+                    "period": "2023-03-01",
+                    "total": 300,
+                    "quantity": 3,
+                    "breakdown": [
+                        {"fruit": "リンゴ", "total": 300, "quantity": 3},
+                    ],
+                },
+                {
+                    "period": "2023-03-02",
+                    "total": 150,
+                    "quantity": 3,
+                    "breakdown": [
+                        {"fruit": "オレンジ", "total": 150, "quantity": 3},
+                    ],
+                },
+            ],
+        )
+
+    def test_hourly_statistics_in_jst(self):
+        """時間単位の集計がTIME_ZONE基準で区切られるかテスト"""
+        response = self.client.get(
+            self.api_path,
+            {"from": "2023-03-01", "to": "2023-03-01", "granularity": "hour"},
+        )
+        self.assertEqual(
+            [
+                (period["period"], period["total"])
+                for period in response.json()["periods"]
+            ],
+            [("2023-03-01T00:00:00+09:00", 300)],
+        )
+
+    def test_weekly_statistics(self):
+        """週単位(月曜始まり)で集計されるかテスト"""
+        response = self.client.get(
+            self.api_path,
+            {"from": "2023-03-01", "to": "2023-04-30", "granularity": "week"},
+        )
+        self.assertEqual(
+            [
+                (period["period"], period["total"])
+                for period in response.json()["periods"]
+            ],
+            [("2023-02-27", 450), ("2023-03-27", 400)],
+        )
+
+    def test_monthly_statistics_with_fruit_filter(self):
+        """月単位の集計を果物で絞り込めるかテスト"""
+        response = self.client.get(
+            self.api_path,
+            {
+                "from": "2023-03-01",
+                "to": "2023-04-30",
+                "granularity": "month",
+                "fruit": [self.fruit_apple.pk],
+            },
+        )
+        self.assertEqual(
+            [
+                (period["period"], period["total"])
+                for period in response.json()["periods"]
+            ],
+            [("2023-03-01", 300), ("2023-04-01", 400)],
+        )
+
+    def test_invalid_parameters_return_400(self):
+        """不正な絞り込み条件の場合、ステータスコード400が返ってくるかテスト"""
+        for params in (
+            {"from": "2023-03-31", "to": "2023-03-01"},
+            {"from": "2023-01-01", "to": "2023-03-01", "granularity": "hour"},
+            {"granularity": "year"},
+            {"from": "20230301"},
+        ):
+            response = self.client.get(self.api_path, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_dates_return_400(self):
+        """日時に変換できない期間の場合、ステータスコード400が返ってくるかテスト"""
+        for params in (
+            {"from": "9999-12-01", "to": "9999-12-31", "granularity": "hour"},
+            {"from": "9999-12-31", "to": "9999-12-31"},
+            {"from": "0001-01-01", "to": "0001-01-01"},
+        ):
+            response = self.client.get(self.api_path, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_default_from_does_not_overflow(self):
+        """期間の下限に近いtoだけ指定した場合、fromが下限になるかテスト"""
+        response = self.client.get(self.api_path, {"to": "0001-01-05"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_returns_304(self):
+        """ETagが一致する条件付きGETの場合、304が返ってくるかテスト"""
+        params = {"from": "2023-03-01", "to": "2023-03-31"}
+        response = self.client.get(self.api_path, params)
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.client.get(
+            self.api_path,
+            params,
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_sales_write_changes_etag(self):
+        """Salesの登録後は同じETagでも200が返ってくるかテスト"""
+        params = {"from": "2023-03-01", "to": "2023-03-31"}
+        etag = self.client.get(self.api_path, params)["ETag"]
+        Sales.objects.create(
+            fruit=self.fruit_apple,
+            quantity=1,
+            total=100,
+            sale_date=datetime.datetime(
+                2023, 3, 3, tzinfo=datetime.timezone.utc
+            ),
+        )
+        response = self.client.get(
+            self.api_path,
+            params,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 550)
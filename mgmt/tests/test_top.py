@@ -4,7 +4,7 @@
 - トップ
 """
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import resolve, reverse
 
 from mgmt.views import top_view
@@ -58,3 +58,47 @@ class TopTest(TestCase):
             status_code=302,
             target_status_code=200,
         )
+
+
+class TopQueryCountTest(TestCase):
+    """ログイン済みのリクエストごとのクエリ数のテスト"""
+
+    def setUp(self):
+        """テストデータの初期設定"""
+        self.user = User.objects.create_user(
+            username="test_user",
+            password="test_password",
+        )
+        self.top_path = reverse("mgmt:top")
+
+    def tearDown(self):
+        """テスト後に生成物を削除"""
+        User.objects.all().delete()
+
+    def test_first_request_loads_user_once(self):
+        """ログイン後の初回の表示ではユーザーのみ取得されるかテスト"""
+        self.client.force_login(self.user)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.top_path)
+
+    def test_repeated_request_does_not_query(self):
+        """2回目以降の表示ではセッション, ユーザーを取得しないかテスト"""
+        self.client.force_login(self.user)
+        self.client.get(self.top_path)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.top_path)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"
+    )
+    def test_signed_cookie_session_does_not_query(self):
+        """署名付きCookieのセッションでも2回目以降はクエリが無いかテスト"""
+        self.client.force_login(self.user)
+        self.client.get(self.top_path)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.top_path)
+        self.assertEqual(response.status_code, 200)
@@ -5,7 +5,11 @@ URLマッピング定義ファイル
 - トップ
 - 果物マスタ管理(一覧, 登録, 編集, 論理削除)
 - 販売情報管理(一覧, 登録, 編集, 削除)
+- 販売情報CSVエクスポート
+- CSVインポートジョブ(状態取得, エラーレポート)
 - 販売統計情報
+- 販売統計情報API(JSON)
+- メトリクス(Prometheus)
 - リダイレクト(404)
 """
 from django.urls import path, re_path
@@ -13,6 +17,7 @@ from django.urls import path, re_path
 from mgmt.views import (
     fruit_view,
     login_view,
+    metrics_view,
     redirect_view,
     sales_view,
     statistics_view,
@@ -72,11 +77,36 @@ urlpatterns = [
         sales_view.SalesDeleteView.as_view(),
         name="sales_delete",
     ),
+    path(
+        "sales/export/",
+        sales_view.SalesExportView.as_view(),
+        name="sales_export",
+    ),
+    path(
+        "sales/import/<int:pk>/",
+        sales_view.ImportJobStatusView.as_view(),
+        name="import_job",
+    ),
+    path(
+        "sales/import/<int:pk>/errors/",
+        sales_view.ImportJobErrorReportView.as_view(),
+        name="import_job_errors",
+    ),
     path(
         "statistics/",
         statistics_view.StatisticsListView.as_view(),
         name="statistics",
     ),
+    path(
+        "api/statistics/",
+        statistics_view.StatisticsAPIView.as_view(),
+        name="statistics_api",
+    ),
+    path(
+        "metrics",
+        metrics_view.MetricsView.as_view(),
+        name="metrics",
+    ),
     re_path(
         r"^.*$",
         redirect_view.NotFoundRedirectView.as_view(),
@@ -0,0 +1,70 @@
+"""
+ビュー定義ファイル
+
+- メトリクス(Prometheusのテキスト形式)
+"""
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.generic import View
+
+from mgmt.metrics import render_metrics
+
+
+class MetricsView(View):
+    """
+    メトリクスのビューを定義
+    ※METRICS_TOKENのBearerトークン, またはスタッフユーザーのみ取得可
+    """
+
+    def has_permission(self, request):
+        """
+        メトリクスの取得を許可するか判定
+
+        Parameters
+        ----------
+        request: WSGIRequest
+            GETリクエスト
+
+        Returns
+        -------
+        has_permission: bool
+            METRICS_TOKENと一致するBearerトークン, またはスタッフユーザーの
+            場合はTrue ※METRICS_TOKENが未設定の場合はスタッフユーザーのみ
+        """
+        if request.user.is_active and request.user.is_staff:
+            return True
+
+        scheme, _, token = request.headers.get("Authorization", "").partition(
+            " "
+        )
+        return (
+            bool(settings.METRICS_TOKEN)
+            and scheme.lower() == "bearer"
+            and hmac.compare_digest(
+                token.encode(), settings.METRICS_TOKEN.encode()
+            )
+        )
+
+    def get(self, request):
+        """
+        登録済みのメトリクスをPrometheusのテキスト形式で返す
+
+        Parameters
+        ----------
+        request: WSGIRequest
+            GETリクエスト
+
+        Returns
+        -------
+        http_response: HttpResponse
+            メトリクス ※許可されていない場合はステータスコード403
+        """
+        if not self.has_permission(request):
+            return HttpResponseForbidden()
+
+        return HttpResponse(
+            render_metrics(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,39 @@
+"""
+ミックスイン定義ファイル
+
+- 非同期ビューのログイン必須
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import AccessMixin
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """
+    非同期ビュー用のログイン必須ミックスインを定義
+    ※LoginRequiredMixinのdispatchは同期処理のため、非同期ビューでは使わない
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        ログイン済みの場合はハンドラを実行し、未ログインの場合は
+        ログイン画面にリダイレクト
+        ※request.userの取得(セッション, ユーザー)はDBを参照するため、
+          スレッドで実行する
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            リクエスト
+
+        Returns
+        -------
+        response: HttpResponse
+            レスポンス
+        """
+        is_authenticated = await sync_to_async(
+            lambda: request.user.is_authenticated
+        )()
+
+        if not is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
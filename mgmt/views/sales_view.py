@@ -2,39 +2,245 @@
 ビュー定義ファイル
 
 - 販売情報管理(一覧, 登録, 編集, 削除)
+- 販売情報CSVエクスポート
+- CSVインポートジョブ(状態取得, エラーレポート)
 """
+import csv
+import datetime
+import io
+import os
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, ListView, UpdateView
+from django.db.models import BigIntegerField, Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.views.generic import (
+    CreateView,
+    DeleteView,
+    ListView,
+    UpdateView,
+    View,
+)
 
-from mgmt.forms import SalesCSVForm, SalesForm
-from mgmt.models import Sales
+from mgmt.forms import SalesCSVForm, SalesFilterForm, SalesForm
+from mgmt.jobs import enqueue_import_job
+from mgmt.models import ImportJob, Sales
+from mgmt.views.mixins import AsyncLoginRequiredMixin
 
 
-class SalesListView(LoginRequiredMixin, ListView):
-    """販売情報管理(一覧)のビューを定義"""
+class SalesListView(AsyncLoginRequiredMixin, ListView):
+    """販売情報管理(一覧)のビューを定義(非同期)"""
 
     context_object_name = "sales_list"
     extra_context = {"table_headers": ["果物", "個数", "売り上げ", "販売日時", "", ""]}
-    queryset = Sales.objects.order_by("-sale_date")
+    ordering = ("-sale_date", "-pk")
+    paginate_by = 50
+    queryset = Sales.objects.select_related("fruit")
     template_name = "mgmt/sales.html"
 
-    def get_context_data(self, *args, **kwargs):
+    import_job_limit = 5
+
+    def encode_cursor(self, sales):
+        """
+        Salesの並び順の位置(販売日時, ID)をカーソル文字列に変換
+
+        Parameters
+        ----------
+        sales: Sales
+            Sales
+
+        Returns
+        -------
+        cursor: str
+            カーソル文字列(UNIX時間[マイクロ秒]_ID)
+        """
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        microseconds = (sales.sale_date - epoch) // datetime.timedelta(
+            microseconds=1
+        )
+        return f"{microseconds}_{sales.pk}"
+
+    def decode_cursor(self, cursor):
+        """
+        カーソル文字列を並び順の位置(販売日時, ID)に変換
+
+        Parameters
+        ----------
+        cursor: str
+            カーソル文字列(UNIX時間[マイクロ秒]_ID)
+
+        Returns
+        -------
+        position: tuple
+            (販売日時, ID) ※不正なカーソル(範囲外の日時, IDを含む)の場合はNone
+        """
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+        try:
+            microseconds, pk = (int(value) for value in cursor.split("_"))
+            sale_date = epoch + datetime.timedelta(microseconds=microseconds)
+        except (ValueError, OverflowError):
+            return None
+
+        if not 0 < pk <= BigIntegerField.MAX_BIGINT:
+            return None
+
+        return sale_date, pk
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        (販売日時, ID)のキーセットでページ分割(OFFSETを使わない)
+            after: 指定位置より古いページ
+            before: 指定位置より新しいページ
+            指定なし: 最新のページ
+
+        Parameters
+        ----------
+        queryset: QuerySet
+            新しい順に並べたSalesのクエリセット
+        page_size: int
+            1ページの件数
+
+        Returns
+        -------
+        pagination: tuple
+            (None, None, 表示するSalesリスト, 他ページの有無)
+        """
+        after = self.decode_cursor(self.request.GET.get("after", ""))
+        before = self.decode_cursor(self.request.GET.get("before", ""))
+
+        if before is not None:
+            sale_date, pk = before
+            sales_list = [
+                sales
+                async for sales in queryset.filter(
+                    Q(sale_date__gte=sale_date),
+                    Q(sale_date__gt=sale_date) | Q(pk__gt=pk),
+                ).order_by("sale_date", "pk")[: page_size + 1]
+            ]
+            has_previous = len(sales_list) > page_size
+            has_next = True
+            sales_list = sales_list[:page_size][::-1]
+        else:
+            if after is not None:
+                sale_date, pk = after
+                queryset = queryset.filter(
+                    Q(sale_date__lte=sale_date),
+                    Q(sale_date__lt=sale_date) | Q(pk__lt=pk),
+                )
+
+            sales_list = [sales async for sales in queryset[: page_size + 1]]
+            has_previous = after is not None
+            has_next = len(sales_list) > page_size
+            sales_list = sales_list[:page_size]
+
+        self.previous_cursor = (
+            self.encode_cursor(sales_list[0])
+            if has_previous and sales_list
+            else None
+        )
+        self.next_cursor = (
+            self.encode_cursor(sales_list[-1])
+            if has_next and sales_list
+            else None
+        )
+        return None, None, sales_list, has_previous or has_next
+
+    def paginate_queryset(self, queryset, page_size):
         """
-        SalesCSVFormをコンテキストに追加
+        apaginate_querysetで取得済みのページ分割結果を返す
+        ※get_context_dataは同期処理のため、DBは参照しない
+
+        Returns
+        -------
+        pagination: tuple
+            (None, None, 表示するSalesリスト, 他ページの有無)
+        """
+        return self.pagination
+
+    async def aget_context_data(self, form):
+        """
+        表示するSales、ページ移動用のカーソル、SalesCSVForm、
+        最近のCSVインポートジョブを取得してコンテキストを生成
+
+        Parameters
+        ----------
+        form: SalesCSVForm
+            表示するSalesCSVForm
 
         Returns
         -------
         context: dict
-            SalesCSVFormを追加したコンテキスト
+            カーソル、SalesCSVForm、最近のCSVインポートジョブを追加した
+            コンテキスト
         """
-        context = super().get_context_data(*args, **kwargs)
-        context["form"] = SalesCSVForm()
+        self.object_list = self.get_queryset()
+        self.pagination = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        import_jobs = ImportJob.objects.order_by("-created_at")
+        context = self.get_context_data()
+        context["previous_cursor"] = self.previous_cursor
+        context["next_cursor"] = self.next_cursor
+        context["form"] = form
+        context["import_jobs"] = [
+            import_job
+            async for import_job in import_jobs[: self.import_job_limit]
+        ]
         return context
 
-    def post(self, request):
+    async def get(self, request, *args, **kwargs):
+        """
+        販売情報の一覧を表示
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            GETリクエスト
+            after: 指定位置より古いページのカーソル
+            before: 指定位置より新しいページのカーソル
+
+        Returns
+        -------
+        template_response: TemplateResponse
+            販売情報管理(一覧)の画面
+        """
+        context = await self.aget_context_data(SalesCSVForm())
+        return self.render_to_response(context)
+
+    def get_csv_form(self, request):
         """
-        バリデーションに成功した場合は、CSVデータをDBに一括保存
+        POSTリクエストからSalesCSVFormを作成してバリデーション
+        ※multipartの解析, 圧縮ファイルの検証は同期処理のため、
+          sync_to_asyncでイベントループの外で呼び出す
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            POSTリクエスト
+
+        Returns
+        -------
+        form: SalesCSVForm
+            バリデーション済みのSalesCSVForm
+        """
+        form = SalesCSVForm(request.POST, request.FILES)
+        form.is_valid()
+        return form
+
+    async def post(self, request):
+        """
+        バリデーションに成功した場合は、CSVインポートジョブを登録
+        (CSVデータのDBへの一括保存はジョブで実行)
         バリデーションに失敗した場合は、エラーメッセージを表示
 
         期待するCSVデータ形式 ※複数行可
@@ -43,23 +249,21 @@ class SalesListView(LoginRequiredMixin, ListView):
 
         Parameters
         ----------
-        request: WSGIRequest
+        request: ASGIRequest
             POSTリクエスト
 
         Returns
         -------
-        http_response_redirect: HttpResponseRedirect
-            リダイレクト
+        template_response: TemplateResponse
+            販売情報管理(一覧)の画面
         """
-        form = SalesCSVForm(request.POST, request.FILES)
+        form = await sync_to_async(self.get_csv_form)(request)
 
         if form.is_valid():
-            csv_data = request.FILES["csv"]
-            form.save_csv(csv_data)
+            csv_data = form.cleaned_data["csv"]
+            await sync_to_async(enqueue_import_job)(csv_data)
 
-        self.object_list = self.get_queryset()
-        context = self.get_context_data()
-        context["form"] = form
+        context = await self.aget_context_data(form)
         return self.render_to_response(context)
 
 
@@ -126,3 +330,184 @@ class SalesDeleteView(LoginRequiredMixin, DeleteView):
 
     model = Sales
     success_url = reverse_lazy("mgmt:sales")
+
+
+class SalesExportView(LoginRequiredMixin, View):
+    """販売情報CSVエクスポートのビューを定義"""
+
+    chunk_size = 2000
+
+    def get_queryset(self, form):
+        """
+        絞り込み条件に合うSalesを(果物名, 個数, 売り上げ, 販売日時)で取得
+
+        Parameters
+        ----------
+        form: SalesFilterForm
+            検証済みの絞り込み条件
+
+        Returns
+        -------
+        queryset: QuerySet
+            販売日時の古い順に並べたSalesのクエリセット
+        """
+        start, end = form.get_datetime_range()
+        queryset = Sales.objects.filter(
+            sale_date__gte=start, sale_date__lt=end
+        )
+
+        if form.cleaned_data["fruit"]:
+            queryset = queryset.filter(fruit__in=form.cleaned_data["fruit"])
+
+        return queryset.order_by("sale_date", "pk").values_list(
+            "fruit__name", "quantity", "total", "sale_date"
+        )
+
+    def iter_csv(self, queryset):
+        """
+        Salesをchunk_size行ずつCSV文字列に変換して返す
+        ※サーバーサイドカーソルで読み込むため、件数に関わらずメモリ使用量は一定
+
+        Parameters
+        ----------
+        queryset: QuerySet
+            (果物名, 個数, 売り上げ, 販売日時)のクエリセット
+
+        Yields
+        ------
+        csv_chunk: str
+            CSVインポートと同じ形式のCSV文字列
+            ex) リンゴ,1,270,2016-02-01 10:35
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        current_timezone = timezone.get_current_timezone()
+        rows = queryset.iterator(chunk_size=self.chunk_size)
+
+        for i, (name, quantity, total, sale_date) in enumerate(rows, 1):
+            sale_date = sale_date.astimezone(current_timezone)
+            writer.writerow(
+                [name, quantity, total, sale_date.strftime("%Y-%m-%d %H:%M")]
+            )
+
+            if i % self.chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    def get(self, request):
+        """
+        絞り込み条件に合う販売情報をCSVでストリーミング返却
+
+        Parameters
+        ----------
+        request: WSGIRequest
+            GETリクエスト
+            from: 開始日(YYYY-MM-DD) ※既定値は当日を含む30日前
+            to: 終了日(YYYY-MM-DD) ※既定値は当日
+            fruit: 果物ID(複数指定可) ※既定値は全ての果物
+
+        Returns
+        -------
+        streaming_http_response: StreamingHttpResponse
+            販売情報のCSV ※絞り込み条件が不正な場合はステータスコード400
+        """
+        form = SalesFilterForm(request.GET)
+
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        filename = "sales_{}_{}.csv".format(
+            form.cleaned_data["from"].strftime("%Y%m%d"),
+            form.cleaned_data["to"].strftime("%Y%m%d"),
+        )
+        return StreamingHttpResponse(
+            self.iter_csv(self.get_queryset(form)),
+            content_type="text/csv; charset=utf-8",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            },
+        )
+
+
+class ImportJobStatusView(AsyncLoginRequiredMixin, View):
+    """
+    CSVインポートジョブ(状態取得)のビューを定義(非同期)
+    ※インポート完了までのポーリングを想定
+    """
+
+    async def get(self, request, pk):
+        """
+        CSVインポートジョブの状態をJSONで返す
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            GETリクエスト
+        pk: int
+            CSVインポートジョブのID
+
+        Returns
+        -------
+        json_response: JsonResponse
+            CSVインポートジョブの状態
+        """
+        try:
+            import_job = await ImportJob.objects.aget(pk=pk)
+        except ImportJob.DoesNotExist:
+            raise Http404("CSVインポートジョブが見つかりません")
+
+        return JsonResponse(
+            {
+                "id": import_job.pk,
+                "status": import_job.status,
+                "status_display": import_job.get_status_display(),
+                "is_active": import_job.is_active,
+                "rows_processed": import_job.rows_processed,
+                "rows_failed": import_job.rows_failed,
+                "rows_skipped": import_job.rows_skipped,
+                "throughput": import_job.throughput,
+                "error_messages": import_job.error_messages.splitlines(),
+                "error_counts": import_job.error_counts,
+                "error_report_url": (
+                    reverse("mgmt:import_job_errors", kwargs={"pk": pk})
+                    if import_job.error_report
+                    else None
+                ),
+            }
+        )
+
+
+class ImportJobErrorReportView(LoginRequiredMixin, View):
+    """CSVインポートジョブ(エラーレポート)のビューを定義"""
+
+    def get(self, request, pk):
+        """
+        CSVインポートジョブのエラーの行をCSVでダウンロード
+
+        Parameters
+        ----------
+        request: WSGIRequest
+            GETリクエスト
+        pk: int
+            CSVインポートジョブのID
+
+        Returns
+        -------
+        file_response: FileResponse
+            エラーレポート(行番号, エラー内容, 元の行)のCSV
+            ※エラーレポートがない場合はステータスコード404
+        """
+        import_job = get_object_or_404(ImportJob, pk=pk)
+
+        if not import_job.error_report:
+            raise Http404("エラーレポートが見つかりません")
+
+        return FileResponse(
+            import_job.error_report.open("rb"),
+            as_attachment=True,
+            filename=os.path.basename(import_job.error_report.name),
+            content_type="text/csv; charset=utf-8",
+        )
@@ -2,27 +2,43 @@
 ビュー定義ファイル
 
 - 販売統計情報
+- 販売統計情報API(JSON)
 """
 import datetime
+import hashlib
 
-from django.contrib.auth.mixins import LoginRequiredMixin
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import (
+    TruncDay,
+    TruncHour,
+    TruncMonth,
+    TruncWeek,
+)
+from django.http import JsonResponse
 from django.utils import timezone
-from django.views.generic import ListView
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.generic import TemplateView, View
 
-from mgmt.models import Sales
+from mgmt.cache import aget_sales_last_modified, get_statistics_cache_key
+from mgmt.forms import StatisticsQueryForm
+from mgmt.models import DailySalesSummary, MonthlySalesSummary, Sales
+from mgmt.views.mixins import AsyncLoginRequiredMixin
 
 
-class StatisticsListView(LoginRequiredMixin, ListView):
-    """販売統計情報のビューを定義"""
+class StatisticsListView(AsyncLoginRequiredMixin, TemplateView):
+    """販売統計情報のビューを定義(非同期)"""
 
-    context_object_name = "statistics_list"
     extra_context = {
         "monthly_table_headers": ["月", "売り上げ", "内訳"],
         "daily_table_headers": ["日", "売り上げ", "内訳"],
     }
-    model = Sales
     template_name = "mgmt/statistics.html"
 
+    statistics_cache_timeout = 60 * 60 * 24
+
     def get_target_start_month(self):
         """
         当月を含む3ヶ月前の年月日(月初)を取得
@@ -33,7 +49,7 @@ class StatisticsListView(LoginRequiredMixin, ListView):
         two_months_ago_first_day: date
             当月を含む3ヶ月前の年月日(月初)
         """
-        today = datetime.date.today()
+        today = timezone.localdate()
         current_month_first_day = today.replace(day=1)
         last_month_last_day = current_month_first_day - datetime.timedelta(
             days=1
@@ -44,14 +60,52 @@ class StatisticsListView(LoginRequiredMixin, ListView):
         )
         return two_months_ago_last_day.replace(day=1)
 
-    def get_monthly_sales(self, sales_list):
+    async def aget_period_sales(
+        self, summary_model, target_start_date, date_format
+    ):
         """
-        月別の販売統計情報を取得
+        期間別の販売統計情報を販売集計モデルから取得
+        ※期間の区切りはTIME_ZONE(Asia/Tokyo)基準
 
         Parameters
         ----------
-        sales_list: list
-            Salesリスト
+        summary_model: type
+            販売集計モデル(MonthlySalesSummary, DailySalesSummary)
+        target_start_date: date
+            集計開始日
+        date_format: str
+            期間の表示形式
+
+        Returns
+        -------
+        period_sales: dict
+            期間別の販売統計情報
+        """
+        summaries = (
+            summary_model.objects.filter(period__gte=target_start_date)
+            .values("period", "fruit__name", "total", "quantity")
+            .order_by("-period", "fruit__name")
+        )
+        period_sales = {}
+
+        async for summary in summaries.aiterator():
+            date = summary["period"].strftime(date_format)
+
+            if date not in period_sales:
+                period_sales[date] = {"period_total": 0, "breakdown": {}}
+
+            period_sales[date]["period_total"] += summary["total"]
+            # 同名の果物(削除済みを含む)は名前ごとに合算
+            breakdown = period_sales[date]["breakdown"].setdefault(
+                summary["fruit__name"], {"total": 0, "quantity": 0}
+            )
+            breakdown["total"] += summary["total"]
+            breakdown["quantity"] += summary["quantity"]
+        return period_sales
+
+    async def aget_monthly_sales(self):
+        """
+        月別の販売統計情報を取得
 
         Returns
         -------
@@ -59,100 +113,275 @@ class StatisticsListView(LoginRequiredMixin, ListView):
             月別の販売統計情報
         """
         target_start_month = self.get_target_start_month()
-        monthly_sales_list = [
-            sales
-            for sales in sales_list
-            if sales.sale_date.date() >= target_start_month
-        ]
-        monthly_sales = {}
-
-        for sales in monthly_sales_list:
-            date = datetime.datetime.strftime(sales.sale_date, "%Y/%m")
-            fruit_name = sales.fruit.name
-
-            if date not in monthly_sales:
-                monthly_sales[date] = {"period_total": 0, "breakdown": {}}
-
-            if fruit_name not in monthly_sales[date]["breakdown"]:
-                monthly_sales[date]["breakdown"][fruit_name] = {
-                    "total": 0,
-                    "quantity": 0,
-                }
-
-            monthly_sales[date]["period_total"] += sales.total
-            monthly_sales[date]["breakdown"][fruit_name][
-                "total"
-            ] += sales.total
-            monthly_sales[date]["breakdown"][fruit_name][
-                "quantity"
-            ] += sales.quantity
-        return monthly_sales
+        return await self.aget_period_sales(
+            MonthlySalesSummary, target_start_month, "%Y/%m"
+        )
 
-    def get_daily_sales(self, sales_list):
+    async def aget_daily_sales(self):
         """
         日別の販売統計情報を取得
 
-        Parameters
-        ----------
-        sales_list: list
-            Salesリスト
-
         Returns
         -------
         daily_sales: dict
             日別の販売統計情報
         """
-        target_start_date = datetime.date.today() - datetime.timedelta(days=2)
-        daily_sales_list = [
-            sales
-            for sales in sales_list
-            if sales.sale_date.date() >= target_start_date
-        ]
-        daily_sales = {}
-
-        for sales in daily_sales_list:
-            date = datetime.datetime.strftime(sales.sale_date, "%Y/%m/%d")
-            fruit_name = sales.fruit.name
-
-            if date not in daily_sales:
-                daily_sales[date] = {"period_total": 0, "breakdown": {}}
-
-            if fruit_name not in daily_sales[date]["breakdown"]:
-                daily_sales[date]["breakdown"][fruit_name] = {
-                    "total": 0,
-                    "quantity": 0,
-                }
-
-            daily_sales[date]["period_total"] += sales.total
-            daily_sales[date]["breakdown"][fruit_name]["total"] += sales.total
-            daily_sales[date]["breakdown"][fruit_name][
-                "quantity"
-            ] += sales.quantity
-        return daily_sales
+        target_start_date = timezone.localdate() - datetime.timedelta(days=2)
+        return await self.aget_period_sales(
+            DailySalesSummary, target_start_date, "%Y/%m/%d"
+        )
 
-    def get_context_data(self, *args, **kwargs):
+    async def aget_statistics(self):
         """
-        累計、月別、日別の販売統計情報をコンテキストに追加
+        累計、月別、日別の販売統計情報を集計
             累計: 全期間(合計金額)
             月別: 当月を含む過去3ヶ月間(販売統計情報)
             日別: 当日を含む過去3日間(販売統計情報)
 
         Returns
         -------
-        context: dict
-            累計、月別、日別の販売統計情報を追加したコンテキスト
+        statistics: dict
+            累計、月別、日別の販売統計情報
+        """
+        all_period_total = (
+            await MonthlySalesSummary.objects.aaggregate(
+                all_period_total=Sum("total")
+            )
+        )["all_period_total"]
+        return {
+            "all_period_total": all_period_total or 0,
+            "monthly_sales": await self.aget_monthly_sales(),
+            "daily_sales": await self.aget_daily_sales(),
+        }
+
+    async def get(self, request, *args, **kwargs):
+        """
+        累計、月別、日別の販売統計情報をコンテキストに追加して表示
+        ※集計結果は当日と販売データの最終更新日時ごとにキャッシュする
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            GETリクエスト
+
+        Returns
+        -------
+        template_response: TemplateResponse
+            販売統計情報の画面
+        """
+        context = self.get_context_data(**kwargs)
+        cache_key = get_statistics_cache_key(await aget_sales_last_modified())
+        statistics = await cache.aget(cache_key)
+
+        if statistics is None:
+            statistics = await self.aget_statistics()
+            await cache.aset(
+                cache_key, statistics, self.statistics_cache_timeout
+            )
+
+        context.update(statistics)
+        return self.render_to_response(context)
+
+
+def get_statistics_etag(request, last_modified):
+    """
+    販売統計情報APIのETagを生成
+    クエリパラメータ, 当日(TIME_ZONE基準), 販売データの最終更新日時から算出
+
+    Parameters
+    ----------
+    request: ASGIRequest
+        GETリクエスト
+    last_modified: datetime
+        販売データの最終更新日時
+
+    Returns
+    -------
+    etag: str
+        ETag
+    """
+    query = sorted(request.GET.lists())
+    source = (
+        f"{query}|{timezone.localdate().isoformat()}|"
+        f"{last_modified.timestamp()}"
+    )
+    return hashlib.md5(source.encode("utf-8")).hexdigest()
+
+
+class StatisticsAPIView(AsyncLoginRequiredMixin, View):
+    """
+    販売統計情報API(JSON)のビューを定義(非同期)
+    ※ダッシュボードからのポーリングを想定し、条件付きGETに対応する
+    """
+
+    statistics_cache_timeout = 60 * 60 * 24
+    trunc_functions = {
+        "hour": TruncHour,
+        "day": TruncDay,
+        "week": TruncWeek,
+        "month": TruncMonth,
+    }
+
+    def get_aggregated_rows(self, form):
+        """
+        集計単位, 果物ごとの販売統計情報をDBで集計
+        時間単位はSalesから、日, 週, 月単位は日別販売集計から集計する
+        ※期間の区切りはTIME_ZONE(Asia/Tokyo)基準
+
+        Parameters
+        ----------
+        form: StatisticsQueryForm
+            検証済みの絞り込み条件
+
+        Returns
+        -------
+        aggregated_rows: QuerySet
+            {bucket, fruit__name, sum_total, sum_quantity}のクエリセット
+        """
+        granularity = form.cleaned_data["granularity"]
+        fruits = form.cleaned_data["fruit"]
+
+        if granularity == "hour":
+            start, end = form.get_datetime_range()
+            queryset = Sales.objects.filter(
+                sale_date__gte=start,
+                sale_date__lt=end,
+            )
+            period_field = "sale_date"
+        else:
+            queryset = DailySalesSummary.objects.filter(
+                period__gte=form.cleaned_data["from"],
+                period__lte=form.cleaned_data["to"],
+            )
+            period_field = "period"
+
+        if fruits:
+            queryset = queryset.filter(fruit__in=fruits)
+
+        trunc = self.trunc_functions[granularity]
+        return (
+            queryset.annotate(bucket=trunc(period_field))
+            .values("bucket", "fruit__name")
+            .annotate(
+                sum_total=Sum("total"),
+                sum_quantity=Sum("quantity"),
+            )
+            .order_by("bucket", "fruit__name")
+        )
+
+    async def aget_statistics(self, form):
+        """
+        販売統計情報をJSONに変換できる形式で取得
+
+        Parameters
+        ----------
+        form: StatisticsQueryForm
+            検証済みの絞り込み条件
+
+        Returns
+        -------
+        statistics: dict
+            販売統計情報
+        """
+        periods = {}
+
+        async for row in self.get_aggregated_rows(form).aiterator():
+            bucket = row["bucket"]
+
+            if isinstance(bucket, datetime.datetime):
+                bucket = timezone.localtime(bucket)
+
+            period = periods.setdefault(
+                bucket.isoformat(),
+                {"total": 0, "quantity": 0, "breakdown": []},
+            )
+            period["total"] += row["sum_total"]
+            period["quantity"] += row["sum_quantity"]
+            period["breakdown"].append(
+                {
+                    "fruit": row["fruit__name"],
+                    "total": row["sum_total"],
+                    "quantity": row["sum_quantity"],
+                }
+            )
+        return {
+            "from": form.cleaned_data["from"].isoformat(),
+            "to": form.cleaned_data["to"].isoformat(),
+            "granularity": form.cleaned_data["granularity"],
+            "total": sum(period["total"] for period in periods.values()),
+            "periods": [
+                {"period": key, **period} for key, period in periods.items()
+            ],
+        }
+
+    async def get_json_response(self, request, etag):
+        """
+        絞り込み条件に応じた販売統計情報のJSONレスポンスを生成
+        ※集計結果はETagごとにキャッシュする
+        ※果物IDの検証はDBを参照するため、スレッドで実行する
+
+        Parameters
+        ----------
+        request: ASGIRequest
+            GETリクエスト
+        etag: str
+            ETag
+
+        Returns
+        -------
+        json_response: JsonResponse
+            販売統計情報 ※絞り込み条件が不正な場合はステータスコード400
+        """
+        form = StatisticsQueryForm(request.GET)
+
+        if not await sync_to_async(form.is_valid)():
+            return JsonResponse({"errors": form.errors}, status=400)
+
+        cache_key = f"mgmt:statistics-api:{etag}"
+        statistics = await cache.aget(cache_key)
+
+        if statistics is None:
+            statistics = await self.aget_statistics(form)
+            await cache.aset(
+                cache_key, statistics, self.statistics_cache_timeout
+            )
+        return JsonResponse(statistics)
+
+    async def get(self, request, *args, **kwargs):
         """
-        context = super().get_context_data(*args, **kwargs)
-        sales_list = context["object_list"]
+        絞り込み条件に応じた販売統計情報をJSONで返す
+        ※ETag/Last-Modifiedによる条件付きGETでは304を返す
+          (condition()デコレーターは同期ビュー専用のため、直接判定する)
 
-        for sales in sales_list:
-            sales.sale_date = timezone.localtime(sales.sale_date)
+        Parameters
+        ----------
+        request: ASGIRequest
+            GETリクエスト
+            from: 開始日(YYYY-MM-DD) ※既定値は当日を含む30日前
+            to: 終了日(YYYY-MM-DD) ※既定値は当日
+            granularity: 集計単位(hour, day, week, month) ※既定値はday
+            fruit: 果物ID(複数指定可) ※既定値は全ての果物
+
+        Returns
+        -------
+        json_response: JsonResponse
+            販売統計情報 ※絞り込み条件が不正な場合はステータスコード400
+        """
+        last_modified = await aget_sales_last_modified()
+        etag = get_statistics_etag(request, last_modified)
+        headers = {
+            "ETag": quote_etag(etag),
+            "Last-Modified": http_date(last_modified.timestamp()),
+        }
+        response = get_conditional_response(
+            request,
+            etag=headers["ETag"],
+            last_modified=int(last_modified.timestamp()),
+        )
 
-        all_period_total = sum(sales.total for sales in sales_list)
-        monthly_sales = self.get_monthly_sales(sales_list)
-        daily_sales = self.get_daily_sales(sales_list)
+        if response is None:
+            response = await self.get_json_response(request, etag)
 
-        context["all_period_total"] = all_period_total
-        context["monthly_sales"] = monthly_sales
-        context["daily_sales"] = daily_sales
-        return context
+        for header, value in headers.items():
+            response.headers.setdefault(header, value)
+        return response
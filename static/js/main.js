@@ -11,4 +11,22 @@ document.addEventListener("DOMContentLoaded", () => {
 
     displayCsvFilename.textContent = choseCsvFilename;
   });
+
+  const pollImportJob = (row) => {
+    fetch(row.dataset.importJobUrl)
+      .then((response) => response.json())
+      .then((importJob) => {
+        row.querySelectorAll("[data-import-job-field]").forEach((cell) => {
+          cell.textContent = importJob[cell.dataset.importJobField];
+        });
+
+        if (importJob.is_active) {
+          setTimeout(() => pollImportJob(row), 2000);
+        }
+      });
+  };
+
+  document
+    .querySelectorAll("[data-import-job-active='true']")
+    .forEach((row) => pollImportJob(row));
 });